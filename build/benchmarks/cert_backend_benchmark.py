@@ -0,0 +1,133 @@
+# Copyright (c) 2020 Intel Corporation.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Benchmark of the certificate generation of provision/gen_certs.py,
+   comparing the openssl subprocess backend with the in-process
+   cryptography one, for rsa & ecdsa keys. Certificates are generated in a
+   temporary directory.
+
+   Eg: python3 benchmarks/cert_backend_benchmark.py --apps 5 20 --jobs 4
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+import contextlib
+
+PROVISION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..', 'provision')
+# Combinations of backend & key type compared
+RUNS = [('openssl', 'rsa'), ('cryptography', 'rsa'),
+        ('cryptography', 'ecdsa')]
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silences the output of gen_certs & of the openssl commands
+    """
+    sys.stdout.flush()
+    saved = os.dup(1), os.dup(2)
+    with open(os.devnull, 'w') as devnull:
+        os.dup2(devnull.fileno(), 1)
+        os.dup2(devnull.fileno(), 2)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+
+
+def certs_config(num_apps):
+    """Client & pem server certificates of num_apps apps, as generated from
+       a docker-compose.yml by gen_certs
+    """
+    certs = [{"etcdserver": {"server_alt_name": ""}},
+             {"root": {"client_alt_name": ""}}]
+    for index in range(num_apps):
+        name = "App{:03d}".format(index)
+        certs.append({name: {"client_alt_name": ""}})
+        certs.append({name + "_Server": {"server_alt_name": ""}})
+    return {"certs": certs}
+
+
+def clean(work_dir):
+    for name in ["rootca", "Certificates", "server", "client"]:
+        shutil.rmtree(os.path.join(work_dir, name), ignore_errors=True)
+
+
+def parse_args():
+    """Parse command line arguments.
+    """
+    arg_parse = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parse.add_argument('--apps', nargs='+', type=int, default=[5, 20],
+                           help='Number of apps, each having a client & a '
+                           'server certificate')
+    arg_parse.add_argument('--jobs', type=int, default=1,
+                           help='Number of certificates generated '
+                           'concurrently')
+    arg_parse.add_argument('--key_length', default='3072',
+                           help='SSL_KEY_LENGTH of the rsa keys')
+    return arg_parse.parse_args()
+
+
+def main():
+    """main function
+    """
+    args = parse_args()
+    os.environ['SSL_KEY_LENGTH'] = args.key_length
+    os.environ.setdefault('HOST_IP', '127.0.0.1')
+    os.environ.setdefault('SSL_SAN_IP', '')
+
+    # gen_certs works in the current directory, captured when importing
+    work_dir = tempfile.mkdtemp()
+    shutil.copytree(os.path.join(PROVISION_DIR, 'config'),
+                    os.path.join(work_dir, 'config'))
+    os.chdir(work_dir)
+    sys.path.insert(0, PROVISION_DIR)
+    import gen_certs
+
+    print("{:>5} {:>6} {:>13} {:>6} {:>10} {:>10}".format(
+          "apps", "certs", "backend", "keys", "total (s)", "per cert"))
+    try:
+        for num_apps in args.apps:
+            opts = certs_config(num_apps)
+            num_certs = len(opts["certs"])
+            for backend, key_type in RUNS:
+                clean(work_dir)
+                gen_certs.set_backend(backend, key_type)
+                start = time.perf_counter()
+                with quiet():
+                    gen_certs.generate(opts, True, args.jobs)
+                elapsed = time.perf_counter() - start
+                print("{:>5} {:>6} {:>13} {:>6} {:>10.2f} {:>10.3f}".format(
+                      num_apps, num_certs, backend, key_type, elapsed,
+                      elapsed / num_certs))
+    finally:
+        os.chdir('/')
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
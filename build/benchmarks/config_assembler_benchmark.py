@@ -0,0 +1,173 @@
+# Copyright (c) 2020 Intel Corporation.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Benchmark of the eii_config.json assembly, comparing the previous
+   jsonmerge accumulation with ConfigAssembler. jsonmerge is only needed
+   for the comparison, its column is skipped if it isn't installed.
+
+   Eg: python3 benchmarks/config_assembler_benchmark.py --apps 10 50 200
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+from config_assembler import ConfigAssembler
+
+try:
+    from jsonmerge import merge
+except ImportError:
+    merge = None
+
+
+def app_config(app_index, instance):
+    """Generates a config.json similar to a VideoIngestion one
+    """
+    name = "App{:03d}{}".format(app_index, instance)
+    return {
+        "config": {
+            "encoding": {"type": "jpeg", "level": 95},
+            "ingestor": {
+                "type": "gstreamer",
+                "pipeline": "rtspsrc location=\"rtsp://localhost:{}/\" "
+                            "latency=100 ! rtph264depay ! h264parse ! "
+                            "appsink".format(8554 + instance),
+                "loop_video": True,
+                "queue_size": 10,
+                "poll_interval": 0.2
+            },
+            "max_workers": 4,
+            "udfs": [{"name": "pcb.pcb_filter", "type": "python",
+                      "scale_ratio": 4, "n_total_px": 300000}]
+        },
+        "interfaces": {
+            "Publishers": [{
+                "Name": "default" + str(instance),
+                "Type": "zmq_tcp",
+                "EndPoint": "0.0.0.0:{}".format(65000 + instance),
+                "Topics": ["camera{}_stream".format(instance)],
+                "AllowedClients": [name + "Analytics", "Visualizer"]
+            }],
+            "Servers": [{
+                "Name": "default" + str(instance),
+                "Type": "zmq_tcp",
+                "EndPoint": "0.0.0.0:{}".format(66000 + instance),
+                "AllowedClients": ["*"]
+            }]
+        }
+    }
+
+
+def app_fragments(num_apps, num_instances):
+    """Generates the etcd keys of every app, one dict per app
+    """
+    fragments = []
+    for app_index in range(num_apps):
+        data = {}
+        for i in range(num_instances):
+            head = app_config(app_index, i + 1)
+            app_name = "/App{:03d}{}".format(app_index, i + 1)
+            data[app_name + '/config'] = head['config']
+            data[app_name + '/interfaces'] = head['interfaces']
+        fragments.append(data)
+    return fragments
+
+
+def jsonmerge_assembly(global_env, fragments, num_instances):
+    """Previous json_parser behaviour, merging the app's accumulated keys
+       into the consolidated config after every instance
+    """
+    config_json = {'/GlobalEnv/': global_env}
+    for fragment in fragments:
+        data = {}
+        items = list(fragment.items())
+        for i in range(num_instances):
+            data.update(items[2*i:2*i+2])
+            config_json = merge(config_json, data)
+    return config_json
+
+
+def assembler_assembly(global_env, fragments):
+    """Single pass assembly with ConfigAssembler
+    """
+    assembler = ConfigAssembler()
+    assembler.add('/GlobalEnv/', global_env, 'common_config.json')
+    for index, fragment in enumerate(fragments):
+        assembler.add_fragment(fragment, str(index))
+    return assembler.config
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def parse_args():
+    """Parse command line arguments.
+    """
+    arg_parse = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parse.add_argument('--apps', nargs='+', type=int,
+                           default=[10, 50, 200],
+                           help='Number of apps to assemble')
+    arg_parse.add_argument('--instances', nargs='+', type=int,
+                           default=[1, 2, 4, 8, 16],
+                           help='Number of instances per app, ie: -v value')
+    arg_parse.add_argument('--jsonmerge_limit', type=int, default=0,
+                           help='Skip the jsonmerge run above this many '
+                           'apps x instances as it grows quadratically, '
+                           '0 to never skip')
+    return arg_parse.parse_args()
+
+
+def main():
+    """main function
+    """
+    args = parse_args()
+    global_env = {"PY_LOG_LEVEL": "INFO", "GO_LOG_LEVEL": "INFO"}
+    print("{:>6} {:>4} {:>14} {:>14} {:>9}".format(
+          "apps", "-v", "jsonmerge (s)", "assembler (s)", "speedup"))
+    for num_apps in args.apps:
+        for num_instances in args.instances:
+            fragments = app_fragments(num_apps, num_instances)
+            new_cfg, new_time = timed(assembler_assembly, global_env,
+                                      fragments)
+            skip = merge is None or (args.jsonmerge_limit and
+                                     num_apps * num_instances >
+                                     args.jsonmerge_limit)
+            if skip:
+                print("{:>6} {:>4} {:>14} {:>14.4f} {:>9}".format(
+                      num_apps, num_instances, "skipped", new_time, "-"))
+                continue
+            old_cfg, old_time = timed(jsonmerge_assembly, global_env,
+                                      fragments, num_instances)
+            if old_cfg != new_cfg:
+                print("Assembled config differs for {} apps with -v {}"
+                      .format(num_apps, num_instances))
+                sys.exit(1)
+            print("{:>6} {:>4} {:>14.4f} {:>14.4f} {:>8.1f}x".format(
+                  num_apps, num_instances, old_time, new_time,
+                  old_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -29,21 +29,42 @@ import subprocess
 import sys
 import re
 import copy
+import itertools
 import distutils.util as util
-from jsonmerge import merge
+from concurrent.futures import ProcessPoolExecutor
 from jsonschema import validate
 import ruamel.yaml
 import io
 from ruamel.yaml.comments import CommentedMap
+import builder_cache
+from builder_cache import BuildCache
+import config_assembler
+from config_assembler import ConfigAssembler, ConfigConflictError
+import service_model
+from service_model import ServiceModel, COMPOSE_FILE, CONFIG_FILE, K8S_FILE
+import instance_template
+from instance_template import InstanceTemplate, INSTANCE_PLACEHOLDER, \
+    DIGITS, index_parts
+import port_allocator
+from port_allocator import PortAllocator, BOUND, parse_port_range, \
+    host_bound_ports
 
 DOCKER_COMPOSE_PATH = './docker-compose.yml'
+BUILD_CACHE_DIR = './.builder_cache'
 SCAN_DIR = ".."
 dev_mode = False
 # Initializing multi instance related variables
 num_multi_instances = 0
 override_apps_list, override_k8s_apps_list = ([] for _ in range(2))
 dev_override_list, app_list, k8s_app_list = ([] for _ in range(3))
-used_ports_dict = {"send_ports":[], "recv_ports":[], "srvc_ports":[] }
+# Ports of the multi instance k8s services
+used_ports = PortAllocator()
+# Ports bound on the host, skipped by the allocations if scanned
+host_ports = []
+# Process pool generating the service fragments, None for serial builds
+worker_pool = None
+# Files of the services, loaded once per run & shared by all the stages
+services = ServiceModel()
 
 
 def source_env(file):
@@ -106,101 +127,72 @@ def generate_valid_filename(path):
     return path
 
 
-def increment_rtsp_port(appname, config, i):
-    """Method to increment rtsp port number in
-       gstreamer pipeline if required
+def add_rtsp_port_slot(template, appname, config):
+    """Method to add the slot incrementing rtsp port number
+       in gstreamer pipeline if required
 
+    :param template: multi instance config template
+    :type template: InstanceTemplate
     :param appname: app name
     :type appname: str
     :param config: app config
     :type config: dict
-    :param i: multi instance value
-    :type i: int
-    :return: updated app config
-    :rtype: dict
     """
     # Increment port number for RTSP stream pipelines if
     # increment_rtsp_port is set to true
     if appname == 'VideoIngestion' and \
        builder_cfg['increment_rtsp_port'] is True:
-        if 'rtspsrc' in config['config']['ingestor']['pipeline']:
-            port = config['config']['ingestor']['pipeline'].\
-                split(":", 2)[2].split("/")[0]
-            new_port = str(int(port) + i)
-            config['config']['ingestor']['pipeline'] =\
-                config['config']['ingestor']['pipeline'].\
-                replace(port, new_port)
+        pipeline = config['config']['ingestor']['pipeline']
+        if 'rtspsrc' in pipeline:
+            port = pipeline.split(":", 2)[2].split("/")[0]
+            template.add(['config', 'ingestor', 'pipeline'], 'offset',
+                         pipeline.split(port), int(port))
 
-    return config
 
+def add_multi_instance_interfaces_slots(template, config, bm_apps_list):
+    """Add the slots generating multi instance interfaces
+       for a given config
 
-def create_multi_instance_interfaces(config, i, bm_apps_list):
-    """Generate multi instance interfaces for a given config
-
+    :param template: multi instance config template
+    :type template: InstanceTemplate
     :param config: app config
     :type config: json
-    :param i: number of instance
-    :type i: int
     :param bm_apps_list: multi instance required apps
     :type bm_apps_list: list
-    :return: updated app config
-    :rtype: dict
     """
     # Iterating through interfaces key, value pairs
     for k, v in config["interfaces"].items():
-        for x in config["interfaces"][k]:
+        for j, x in enumerate(v):
+            path = ["interfaces", k, j]
             # Updating Name section of all interfaces
             if "Name" in x.keys():
-                x["Name"] = x["Name"] + str(i+1)
+                template.add(path + ["Name"], 'suffix', x["Name"])
             # Updating Topics section of all interfaces
             if "Topics" in x.keys():
                 for index, topic in enumerate(x["Topics"]):
-                    if bool(re.search(r'\d', x["Topics"][index])):
-                        x["Topics"][index] = re.sub(r'\d+', str(i+1),
-                                                    x["Topics"][index])
-                    else:
-                        x["Topics"][index] = x["Topics"][index] +\
-                                                str(i+1)
+                    template.add(path + ["Topics", index], 'index',
+                                 index_parts(topic))
             # Updating AllowedClients section of all interfaces
             if "AllowedClients" in x.keys():
-                for index, topic in enumerate(x["AllowedClients"]):
-                    if x["AllowedClients"][index] in bm_apps_list:
-                        # Update AllowedClients AppName if they are not
-                        # in subscriber list
-                        if x["AllowedClients"][index] not in subscriber_list:
-                            if bool(re.search(r'\d', x["AllowedClients"][index])):
-                                x["AllowedClients"][index] = \
-                                    re.sub(r'\d+', str(i+1),
-                                        x["AllowedClients"][index])
-                            else:
-                                x["AllowedClients"][index] = \
-                                    x["AllowedClients"][index] + str(i+1)
-            # Updating PublisherAppName section of all interfaces
-            if "PublisherAppName" in x.keys():
-                if x["PublisherAppName"] in bm_apps_list:
-                    if bool(re.search(r'\d', x["PublisherAppName"])):
-                        x["PublisherAppName"] = re.sub(r'\d+', str(i+1),
-                                                       x["PublisherAppName"])
-                    else:
-                        x["PublisherAppName"] = x["PublisherAppName"] +\
-                                                      str(i+1)
-            # Updating ServerAppName section of all interfaces
-            if "ServerAppName" in x.keys():
-                if x["ServerAppName"] in bm_apps_list:
-                    if bool(re.search(r'\d', x["ServerAppName"])):
-                        x["ServerAppName"] = re.sub(r'\d+', str(i+1),
-                                                    x["ServerAppName"])
-                    else:
-                        x["ServerAppName"] = x["ServerAppName"] +\
-                                                      str(i+1)
+                for index, client in enumerate(x["AllowedClients"]):
+                    # Update AllowedClients AppName if they are not
+                    # in subscriber list
+                    if client in bm_apps_list and \
+                       client not in subscriber_list:
+                        template.add(path + ["AllowedClients", index],
+                                     'index', index_parts(client))
+            # Updating PublisherAppName & ServerAppName section
+            # of all interfaces
+            for key in ["PublisherAppName", "ServerAppName"]:
+                if key in x.keys() and x[key] in bm_apps_list:
+                    template.add(path + [key], 'index', index_parts(x[key]))
             # Updating Type section of all interfaces
             if "Type" in x.keys():
                 if "tcp" in x["Type"]:
                     # If tcp mode, increment port numbers
                     port = x["EndPoint"].split(':')[1]
-                    new_port = str(int(port) + (i))
-                    x["EndPoint"] = x["EndPoint"].replace(port, new_port)
-    return config
+                    template.add(path + ["EndPoint"], 'offset',
+                                 x["EndPoint"].split(port), int(port))
 
 
 def create_multi_subscribe_interface(head, temp, client_type):
@@ -220,65 +212,242 @@ def create_multi_subscribe_interface(head, temp, client_type):
     # Loop over all available subscribers/clients
     for j in range(len(head["interfaces"][client_type])):
         client = head["interfaces"][client_type][j]
-        # For every subscriber/client, create multiple instances
-        # & update required parameters
+        # For every subscriber/client, analyse the parameters to be
+        # updated once & create multiple instances
+        template = InstanceTemplate(client, share=True)
+        # Updating name of subscriber/client instance
+        template.add(["Name"], 'suffix', client["Name"])
+        # Updating PublisherAppName of subscriber instance
+        if "PublisherAppName" in client.keys():
+            template.add(["PublisherAppName"], 'suffix',
+                         client["PublisherAppName"])
+        # Updating ServerAppName of client instance
+        if "ServerAppName" in client.keys():
+            template.add(["ServerAppName"], 'suffix', client["ServerAppName"])
+        # Updating Topics of subscriber instance
+        if "Topics" in client.keys():
+            template.add(["Topics", 0], 'index',
+                         index_parts(client["Topics"][0]))
+        # Updating EndPoint if mode is tcp
+        if ":" in client["EndPoint"]:
+            port = client["EndPoint"].split(":")[1]
+            template.add(["EndPoint"], 'offset',
+                         client["EndPoint"].split(port), int(port))
+        # Appending client multi instances
         for i in range(num_multi_instances):
-            cli_instance = copy.deepcopy(client)
-            # Updating name of subscriber/client instance
-            cli_instance["Name"] = client["Name"] + str(i+1)
-            # Updating PublisherAppName of subscriber instance
-            if "PublisherAppName" in client.keys():
-                cli_instance["PublisherAppName"] = client["PublisherAppName"] + str(i+1)
-            # Updating ServerAppName of client instance
-            if "ServerAppName" in client.keys():
-                cli_instance["ServerAppName"] = client["ServerAppName"] + str(i+1)
-            # Updating Topics of subscriber instance
-            if "Topics" in client.keys():
-                if bool(re.search(r'\d', client["Topics"][0])):
-                    cli_instance["Topics"][0] = re.sub(r'\d+', str(i+1),
-                                                client["Topics"][0])
-                else:
-                    cli_instance["Topics"][0] = client["Topics"][0] + str(i+1)
-            # Updating EndPoint if mode is tcp
-            if ":" in client["EndPoint"]:
-                port = client["EndPoint"].split(":")[1]
-                new_port = str(int(port)+i)
-                cli_instance["EndPoint"] = client["EndPoint"].replace(port, new_port)
-            # Appending client multi instances
-            temp["interfaces"][client_type].append(cli_instance)
+            temp["interfaces"][client_type].append(template.instance(i + 1))
         # Remove existing instances
         temp["interfaces"][client_type].remove(client)
     return temp
 
 
-def fetch_appname(app_path):
-    """Fetches AppName from docker-compose.yml file
-       in the directory specified in app_path
+def start_worker_pool(args):
+    """Starts the process pool generating the service fragments
+       if more than one job is requested. The workers are forked,
+       inheriting the builder globals set up before the pool starts
+
+    :param args: cli args
+    :type args: argparse
+    """
+    global worker_pool
+    if args.jobs > 1:
+        worker_pool = ProcessPoolExecutor(max_workers=args.jobs)
+
+
+def run_service_func(func, service, *func_args):
+    """Calls func in a worker process, returning the service along with
+       the result so the files it loaded are not loaded again
+
+    :param func: top level function called as func(service, *func_args)
+    :type func: function
+    :param service: service to call func for
+    :type service: Service
+    :return: result of func, service
+    :rtype: tuple
+    """
+    return func(service, *func_args), service
+
+
+def map_services(func, app_services, func_args):
+    """Calls func for every service, in the worker pool if started
 
+    :param func: top level function called as func(service, *func_args)
+    :type func: function
+    :param app_services: list of services
+    :type app_services: list
+    :param func_args: arguments common to all the calls
+    :type func_args: list
+    :return: results of func in the order of app_services
+    :rtype: list
+    """
+    if worker_pool is None or len(app_services) < 2:
+        return [func(service, *func_args) for service in app_services]
+    results = []
+    for result, service in worker_pool.map(
+            run_service_func, itertools.repeat(func), app_services,
+            *[itertools.repeat(a) for a in func_args]):
+        services.update(service)
+        results.append(result)
+    return results
+
+
+def generate_fragments(stage, app_services, file_names, func, func_args,
+                       extra=None):
+    """Fetches the fragment of every service from the build cache and
+       generates the missing ones with func. Fragments are always
+       returned in the order of app_services so the merged output
+       doesn't depend on the number of jobs
+
+    :param stage: builder stage the fragments belong to
+    :type stage: str
+    :param app_services: list of services
+    :type app_services: list
+    :param file_names: input files of the fragments in the service
+                       directory, the first one naming the fragment
+    :type file_names: list
+    :param func: top level function called as func(service, *func_args)
+    :type func: function
+    :param func_args: arguments common to all the calls
+    :type func_args: list
+    :param extra: state the fragments depend on
+    :type extra: object
+    :return: list of fragments
+    :rtype: list
+    """
+    fragments = {}
+    missing = {}
+    for service in app_services:
+        paths = [service.path + '/' + f for f in file_names]
+        name = paths[0]
+        if name in fragments or name in missing:
+            continue
+        fragment = build_cache.get(stage, name, paths, extra)
+        if fragment is not None:
+            fragments[name] = fragment
+        else:
+            missing[name] = (service, paths)
+    generated = map_services(func, [service for service, _ in
+                                    missing.values()], func_args)
+    for (name, (_, paths)), fragment in zip(missing.items(), generated):
+        build_cache.put(stage, name, paths, fragment, extra)
+        fragments[name] = fragment
+    return [fragments[service.path + '/' + file_names[0]]
+            for service in app_services]
+
+
+def add_config_fragment(assembler, data, app_path):
+    """Adds the etcd keys generated for an app to the consolidated
+       config, exits if they conflict with another app's keys
+
+    :param assembler: consolidated config assembler
+    :type assembler: ConfigAssembler
+    :param data: etcd keys generated for the app
+    :type data: dict
     :param app_path: path of the app
     :type app_path: str
-    :return: AppName of service if found, None for common/video
-             empty string otherwise
-    :rtype: str
     """
-    if os.path.isdir(app_path):
-        with open(app_path+'/docker-compose.yml', 'rb') as infile:
-            data = ruamel.yaml.round_trip_load(infile,
-                                            preserve_quotes=True)
-            # Iterate through the yaml file and
-            # return AppName if found
-            for x in data:
-                if x == 'services':
-                    for y in data[x]:
-                        if "environment" in data[x][y]:
-                            # If environment sections exists,
-                            # raise Exception if AppName not found
-                            if "AppName" not in data[x][y]["environment"]:
-                                raise Exception("AppName not found")
-                            return data[x][y]["environment"]["AppName"]
-                        # For common/video case
-                        return None
-    return ""
+    try:
+        assembler.add_fragment(data, app_path)
+    except ConfigConflictError as err:
+        print("Failed to create consolidated config json: {}".format(err))
+        sys.exit(1)
+
+
+def generate_config_fragment(service, args, bm_apps_list):
+    """Generates the etcd keys of an app, creating its multi instance
+       config & interfaces if required
+
+    :param service: service of the app
+    :type service: Service
+    :param args: cli args
+    :type args: argparse
+    :param bm_apps_list: multi instance required apps
+    :type bm_apps_list: list
+    :return: dict of etcd key, value pairs
+    :rtype: dict
+    """
+    app_path = service.path
+    data = {}
+    # Creating multi instance config if num_multi_instances > 1
+    if num_multi_instances > 1:
+        dirname = app_path.split("/")[-1]
+        # Fetching AppName for all services
+        app_name = service.app_name
+        if args.override_directory is not None:
+            if args.override_directory in app_path:
+                dirname = app_path.split("/")[-2]
+        # Ignoring EtcdUI & common/video service to not create multi instance
+        # TODO: Support AzureBridge multi instance creation if applicable
+        if app_name not in subscriber_list and dirname != "video" and dirname != "EtcdUI" and "AzureBridge" not in app_path:
+            # Analysing the config once for all the instances
+            template = InstanceTemplate(service.config, share=True)
+            # Increments rtsp port number if required
+            add_rtsp_port_slot(template, app_name, service.config)
+            # Create multi instance interfaces
+            add_multi_instance_interfaces_slots(template, service.config,
+                                                bm_apps_list)
+            for i in range(num_multi_instances):
+                head = template.instance(i + 1)
+                # merge config of multi instance config
+                if 'config' in head.keys():
+                    data['/' + app_name + str(i+1) + '/config'] = \
+                        head['config']
+                # merge interfaces of multi instance config
+                if 'interfaces' in head.keys():
+                    data['/' + app_name + str(i+1) +
+                         '/interfaces'] = \
+                        head['interfaces']
+        # This condition is to handle not creating multi instance for 
+        # subscriber services
+        else:
+            head = service.config
+            temp = copy.deepcopy(head)
+            # merge interfaces of multi instance config
+            if 'interfaces' in head.keys():
+                if "Subscribers" in head["interfaces"]:
+                    # Generate multi subscribe interface
+                    temp = create_multi_subscribe_interface(head, temp, "Subscribers")
+                if "Clients" in head["interfaces"]:
+                    # Generate multi client interface
+                    temp = create_multi_subscribe_interface(head, temp, "Clients")
+                # This is to handle empty interfaces cases like EtcdUI
+                data['/' + app_name + '/config'] = head['config']
+                data['/' + app_name + '/interfaces'] = temp['interfaces']
+    # This condition is to handle the default non multi instance flow
+    else:
+        # Merging config & interfaces from all services
+        head = service.config
+        # Fetching AppName for all services
+        app_name = service.app_name
+        if 'config' in head.keys():
+            data['/' + app_name + '/config'] = head['config']
+        if 'interfaces' in head.keys():
+            data['/' + app_name + '/interfaces'] = head['interfaces']
+    return data
+
+
+def claim_config_ports(allocator, data):
+    """Claims the tcp ports of the Publishers & Servers of an app's
+       instances, reporting the ones used by more than one interface
+
+    :param allocator: port allocator
+    :type allocator: PortAllocator
+    :param data: etcd keys of the app's instances
+    :type data: dict
+    """
+    for key, value in data.items():
+        if not key.endswith('/interfaces'):
+            continue
+        for interface_type in ['Publishers', 'Servers']:
+            for interface in value.get(interface_type, []):
+                endpoint = interface.get('EndPoint')
+                if "tcp" in interface.get('Type', "") and \
+                   isinstance(endpoint, str) and ":" in endpoint:
+                    owner = "{} {} {}".format(key.split('/')[1],
+                                              interface_type[:-1],
+                                              interface.get('Name'))
+                    allocator.claim(endpoint.split(":")[-1], 'send_ports',
+                                    owner)
 
 
 def json_parser(app_list, args):
@@ -292,11 +461,10 @@ def json_parser(app_list, args):
     """
 
     # Fetching GlobalEnv config
+    assembler = ConfigAssembler()
     with open('./common_config.json', "rb") as infile:
-        data = {}
         head = json.load(infile)
-        data['/GlobalEnv/'] = head
-        config_json = data
+        assembler.add('/GlobalEnv/', head, 'common_config.json')
 
     # Removing duplicates from app list
     app_list = list(dict.fromkeys(app_list))
@@ -320,102 +488,33 @@ def json_parser(app_list, args):
         bm_apps_list.append(bm_appname)
 
     eii_config_path = "./provision/config/eii_config.json"
-    for app_path in app_list:
-        data = {}
-        # Creating multi instance config if num_multi_instances > 1
-        if num_multi_instances > 1:
-            dirname = app_path.split("/")[-1]
-            # Fetching AppName for all services
-            app_name = fetch_appname(app_path)
-            if args.override_directory is not None:
-                if args.override_directory in app_path:
-                    dirname = app_path.split("/")[-2]
-            # Ignoring EtcdUI & common/video service to not create multi instance
-            # TODO: Support AzureBridge multi instance creation if applicable
-            if app_name not in subscriber_list and dirname != "video" and dirname != "EtcdUI" and "AzureBridge" not in app_path:
-                for i in range(num_multi_instances):
-                    with open(app_path + '/config.json', "rb") as infile:
-                        head = json.load(infile)
-                        # Increments rtsp port number if required
-                        head = increment_rtsp_port(app_name, head, i)
-                        # Create multi instance interfaces
-                        head = \
-                            create_multi_instance_interfaces(head,
-                                                            i,
-                                                            bm_apps_list)
-                        # merge config of multi instance config
-                        if 'config' in head.keys():
-                            data['/' + app_name + str(i+1) + '/config'] = \
-                                head['config']
-                        # merge interfaces of multi instance config
-                        if 'interfaces' in head.keys():
-                            data['/' + app_name + str(i+1) +
-                                '/interfaces'] = \
-                                head['interfaces']
-                        # merge multi instance generated json to eii config
-                        config_json = merge(config_json, data)
-            # This condition is to handle not creating multi instance for 
-            # subscriber services
-            else:
-                with open(app_path + '/config.json', "rb") as infile:
-                    head = json.load(infile)
-                    temp = copy.deepcopy(head)
-                    # merge interfaces of multi instance config
-                    if 'interfaces' in head.keys():
-                        if "Subscribers" in head["interfaces"]:
-                            # Generate multi subscribe interface
-                            temp = create_multi_subscribe_interface(head, temp, "Subscribers")
-                            data['/' + app_name + '/config'] = head['config']
-                            data['/' + app_name + '/interfaces'] = temp['interfaces']
-                            config_json = merge(config_json, data)
-                        if "Clients" in head["interfaces"]:
-                            # Generate multi client interface
-                            temp = create_multi_subscribe_interface(head, temp, "Clients")
-                            data['/' + app_name + '/config'] = head['config']
-                            data['/' + app_name + '/interfaces'] = temp['interfaces']
-                            config_json = merge(config_json, data)
-                        # This is to handle empty interfaces cases like EtcdUI
-                        data['/' + app_name + '/config'] = head['config']
-                        data['/' + app_name + '/interfaces'] = temp['interfaces']
-                        config_json = merge(config_json, data)
-        # This condition is to handle the default non multi instance flow
-        else:
-            with open(app_path + '/config.json', "rb") as infile:
-                # Merging config & interfaces from all services
-                head = json.load(infile)
-                # Fetching AppName for all services
-                app_name = fetch_appname(app_path)
-                if 'config' in head.keys():
-                    data['/' + app_name + '/config'] = head['config']
-                if 'interfaces' in head.keys():
-                    data['/' + app_name + '/interfaces'] = head['interfaces']
-                # Merging individual app configs & interfaces into one json
-                config_json = merge(config_json, data)
+    fragments = generate_fragments('config',
+                                   [services.get(app_path)
+                                    for app_path in app_list],
+                                   [CONFIG_FILE, COMPOSE_FILE],
+                                   generate_config_fragment,
+                                   [args, bm_apps_list], bm_apps_list)
+    config_ports = PortAllocator()
+    reserve_ports(config_ports)
+    for app_path, data in zip(app_list, fragments):
+        # Adding individual app configs & interfaces into one json
+        add_config_fragment(assembler, data, app_path)
+        claim_config_ports(config_ports, data)
+    report_port_conflicts(config_ports, 'config')
 
     # Writing consolidated json into desired location
     with open(eii_config_path, "w") as json_file:
-        json_file.write(json.dumps(config_json, sort_keys=True, indent=4))
+        json_file.write(assembler.dumps())
         print("Successfully created consolidated config json at {}".format(
               eii_config_path))
 
-def k8s_yaml_remove_secrets(yaml_data):
-    """This method takes input as a yml data and removes
-       the secrets from volume mounts and envs and returns
-       non-secrets yml data of k8s yml file
+def remove_k8s_secrets(yaml_dict):
+    """This method removes the secrets from volume mounts
+       and envs of a k8s deployment yml dict
 
-    :param yaml_data: Yaml value
-    :type yaml_data: str
+    :param yaml_dict: k8s deployment yml dict
+    :type yaml_dict: dict
     """
-    string_io_data = io.StringIO(yaml_data)
-    if "---" in yaml_data:
-        yaml_data_list = yaml_data.split("---")
-        string_io_data = io.StringIO(yaml_data_list[1])
-    yaml_prod = ruamel.yaml.round_trip_load(string_io_data,
-                                            preserve_quotes=True)
-    yaml_dict = dict()
-    for k, v in yaml_prod.items():
-        yaml_dict[k] = v
-
     vol_removal_list = []
     for d in yaml_dict['spec']['template']['spec']['volumes']:
         if 'cert' in d['name']:
@@ -435,6 +534,27 @@ def k8s_yaml_remove_secrets(yaml_data):
     for r in con_vol_removal_list:
         yaml_dict['spec']['template']['spec']['containers'][0]['volumeMounts'].remove(r)
 
+
+def k8s_yaml_remove_secrets(yaml_data):
+    """This method takes input as a yml data and removes
+       the secrets from volume mounts and envs and returns
+       non-secrets yml data of k8s yml file
+
+    :param yaml_data: Yaml value
+    :type yaml_data: str
+    """
+    string_io_data = io.StringIO(yaml_data)
+    if "---" in yaml_data:
+        yaml_data_list = yaml_data.split("---")
+        string_io_data = io.StringIO(yaml_data_list[1])
+    yaml_prod = ruamel.yaml.round_trip_load(string_io_data,
+                                            preserve_quotes=True)
+    yaml_dict = dict()
+    for k, v in yaml_prod.items():
+        yaml_dict[k] = v
+
+    remove_k8s_secrets(yaml_dict)
+
     kube_yaml = ruamel.yaml.round_trip_dump(yaml_dict)
 
     if "---" in yaml_data:
@@ -443,324 +563,399 @@ def k8s_yaml_remove_secrets(yaml_data):
     return kube_yaml
 
 
-def get_available_port(curr_port, ports_dict):
-    """Method to recursively check for available
-       ports in provided ports_dict
+def reserve_ports(allocator):
+    """Reserves the reserved_ports of builder_config.json & the ports
+       bound on the host, if scanned, in a port allocator
+
+    :param allocator: port allocator
+    :type allocator: PortAllocator
+    """
+    for value in builder_cfg.get('reserved_ports', []):
+        first, last = parse_port_range(value)
+        allocator.reserve(first, last, 'reserved_ports of builder_config.json')
+    for port in host_ports:
+        allocator.reserve(port, port, 'host', BOUND)
+
+
+def report_port_conflicts(allocator, stage):
+    """Prints the port conflicts found by a port allocator
+
+    :param allocator: port allocator
+    :type allocator: PortAllocator
+    :param stage: stage the ports were allocated for
+    :type stage: str
+    """
+    for conflict in allocator.conflicts:
+        print("WARNING: {} port conflict: {}".format(stage, conflict))
+
+
+def allocate_port(curr_port, pool, owner=None):
+    """Allocates the next available port of a multi instance
 
     :param curr_port: port to be replaced
     :type curr_port: str
-    :param ports_dict: dict to check available ports
-    :type ports_dict: dict
+    :param pool: send_ports, recv_ports or srvc_ports
+    :type pool: str
+    :param owner: instance the port is allocated to, for reporting conflicts
+    :type owner: str
     :return: next available port
     :rtype: str
     """
-    # Check if port is not available, recursively check for
-    # next available port
-    if curr_port in ports_dict:
-        return get_available_port(str(int(curr_port)+1), ports_dict)
-    # If port is available, append it to non-available ports dict
-    # and return
-    else:
-        ports_dict.append(curr_port)
-        return curr_port
+    return used_ports.allocate(curr_port, pool, owner)
 
 
-def multi_instance_k8s_deployment(yaml_dict, i):
-    """Method to update multi instance k8s yml for
-       deployment section
+def add_multi_instance_k8s_deployment_slots(template, index):
+    """Method to add the slots of the deployment section
+       of a multi instance k8s yml
 
-    :param yaml_dict: k8s yaml dict
-    :type yaml_dict: dict
-    :param i: index of multi instance
-    :type i: int
-    :return: updated yml_dict
-    :rtype: dict
+    :param template: multi instance k8s yml template
+    :type template: InstanceTemplate
+    :param index: index of the deployment section in the template
+    :type index: int
     """
+    yaml_dict = template.document[index]
+    # Update deployment section app name
+    template.add([index, "metadata", "labels", "app"], 'suffix',
+                 yaml_dict["metadata"]["labels"]["app"])
+    template.add([index, "metadata", "name"], 'suffix',
+                 yaml_dict["metadata"]["name"])
     # Updating appname
-    yaml_dict["spec"]["selector"]["matchLabels"]["app"] = yaml_dict["spec"]["selector"]["matchLabels"]["app"] + str(i+1)
-    yaml_dict["spec"]["template"]["metadata"]["labels"]["app"] = yaml_dict["spec"]["template"]["metadata"]["labels"]["app"] + str(i+1)
-    yaml_dict["spec"]["template"]["spec"]["containers"][0]["name"] = yaml_dict["spec"]["template"]["spec"]["containers"][0]["name"] + str(i+1)
+    template.add([index, "spec", "selector", "matchLabels", "app"], 'suffix',
+                 yaml_dict["spec"]["selector"]["matchLabels"]["app"])
+    template.add([index, "spec", "template", "metadata", "labels", "app"],
+                 'suffix',
+                 yaml_dict["spec"]["template"]["metadata"]["labels"]["app"])
+    container_path = [index, "spec", "template", "spec", "containers", 0]
+    container = yaml_dict["spec"]["template"]["spec"]["containers"][0]
+    template.add(container_path + ["name"], 'suffix', container["name"])
 
     # Updating volume mount part of k8s yaml dict
-    volume_mount_dict = yaml_dict["spec"]["template"]["spec"]["containers"][0]["volumeMounts"]
-    for v in range(len(volume_mount_dict)):
+    for v, volume_mount in enumerate(container["volumeMounts"]):
+        name = volume_mount["name"]
+        mount_path = volume_mount["mountPath"]
+        is_cert = "cert" in name and "ca-cert" not in name
+        is_key = "key" in name and "ca-cert" not in name
         # Update cert section
-        if "cert" in volume_mount_dict[v]["name"] and "ca-cert" not in volume_mount_dict[v]["name"]:
-            cert_temp = volume_mount_dict[v]["mountPath"].split('_cert')[0]
-            new_cert = re.sub(r'\d+', '', cert_temp) + str(i+1) + '_cert'
-            volume_mount_dict[v]["mountPath"] = new_cert
-            volume_mount_dict[v]["name"] = volume_mount_dict[v]["name"] + str(i+1)
-        # Update key section
-        if "key" in volume_mount_dict[v]["name"] and "ca-cert" not in volume_mount_dict[v]["name"]:
-            key_temp = volume_mount_dict[v]["mountPath"].split('_key')[0]
-            new_key = re.sub(r'\d+', '', key_temp) + str(i+1) + '_key'
-            volume_mount_dict[v]["mountPath"] = new_key
-            volume_mount_dict[v]["name"] = volume_mount_dict[v]["name"] + str(i+1)
+        if is_cert:
+            prefix = DIGITS.sub('', mount_path.split('_cert')[0])
+            suffix = '_cert'
+        # Update key section, of the mount path updated by the cert
+        # section if both apply. Digits of the instance number are
+        # stripped again in that case.
+        if is_key:
+            if is_cert:
+                mount_path = prefix + suffix
+            prefix = DIGITS.sub('', mount_path.split('_key')[0])
+            suffix = '_key'
+        if is_cert or is_key:
+            path = container_path + ["volumeMounts", v]
+            template.add(path + ["mountPath"], 'strip', prefix, suffix)
+            template.add(path + ["name"], 'suffix', name, is_cert + is_key)
+
     # Updating env part of k8s yaml dict
-    env_dict = yaml_dict["spec"]["template"]["spec"]["containers"][0]["env"]
-    for v in range(len(env_dict)):
+    for v, env in enumerate(container["env"]):
+        path = container_path + ["env", v]
         # Update AppName
-        if env_dict[v]["name"] == "AppName":
-            env_dict[v]["value"] = env_dict[v]["value"] + str(i+1)
+        if env["name"] == "AppName":
+            template.add(path + ["value"], 'suffix', env["value"])
         # Update CONFIGMGR_CERT & CONFIGMGR_KEY section
-        if env_dict[v]["name"] == "CONFIGMGR_CERT" or env_dict[v]["name"] == "CONFIGMGR_KEY":
-            app_name = env_dict[v]["value"].split("/")[-1].split("_")[0]
-            new_app_name = app_name + str(i+1)
-            env_dict[v]["value"] = env_dict[v]["value"].replace(app_name, new_app_name)
+        if env["name"] == "CONFIGMGR_CERT" or env["name"] == "CONFIGMGR_KEY":
+            app_name = env["value"].split("/")[-1].split("_")[0]
+            template.add(path + ["value"], 'replace',
+                         env["value"].split(app_name), app_name)
         # Update tcp ports section
-        if "ENDPOINT" in env_dict[v]["name"] and ":" in env_dict[v]["value"]:
+        if "ENDPOINT" in env["name"] and ":" in env["value"]:
             # Updating ports for PUBLISHER/SERVER ENDPOINTS
-            if "SERVER" in env_dict[v]["name"] or "PUBLISHER" in env_dict[v]["name"]:
-                port = env_dict[v]["value"].split(":")[-1]
-                new_port = get_available_port(port, used_ports_dict["send_ports"])
-                env_dict[v]["value"] = env_dict[v]["value"].replace(port, new_port)
+            send = "SERVER" in env["name"] or "PUBLISHER" in env["name"]
             # Updating ports, appname for SUBSCRIBER/CLIENT ENDPOINTS
-            if "SUBSCRIBER" in env_dict[v]["name"] or "CLIENT" in env_dict[v]["name"]:
-                port = env_dict[v]["value"].split(":")[-1]
-                new_port = get_available_port(port, used_ports_dict["recv_ports"])
-                env_dict[v]["value"] = env_dict[v]["value"].replace(port, new_port)
-                # Update appnames in ENDPOINTS
-                appname = env_dict[v]["value"].split(":")[0]
-                env_dict[v]["value"] = env_dict[v]["value"].replace(appname, appname + str(i+1))
-                # Update endpoint name if it has a unique name
-                if env_dict[v]["name"].count("_") > 1:
-                    ep_name = env_dict[v]["name"].split("_")[1]
-                    env_dict[v]["name"] = env_dict[v]["name"].replace(ep_name, ep_name + str(i+1))
-    # Updating volumes section of k8s yaml dict
-    volume_dict = yaml_dict["spec"]["template"]["spec"]["volumes"]
-    for v in range(len(volume_dict)):
-        # Update cert section
-        if "cert" in volume_dict[v]["name"] and "ca-cert" not in volume_dict[v]["name"]:
-            volume_dict[v]["name"] = volume_dict[v]["name"] + str(i+1)
-            app_name = volume_dict[v]["secret"]["secretName"].split("-")[0]
-            new_app_name = app_name + str(i+1)
-            volume_dict[v]["secret"]["secretName"] = volume_dict[v]["secret"]["secretName"].replace(app_name, new_app_name)
-        # Update key section
-        if "key" in volume_dict[v]["name"]:
-            volume_dict[v]["name"] = volume_dict[v]["name"] + str(i+1)
-            app_name = volume_dict[v]["secret"]["secretName"].split("-")[0]
-            new_app_name = app_name + str(i+1)
-            volume_dict[v]["secret"]["secretName"] = volume_dict[v]["secret"]["secretName"].replace(app_name, new_app_name)
-    return yaml_dict
-
+            recv = "SUBSCRIBER" in env["name"] or "CLIENT" in env["name"]
+            if send or recv:
+                template.add(path + ["value"], 'endpoint', env["value"],
+                             send, recv)
+            # Update endpoint name if it has a unique name
+            if recv and env["name"].count("_") > 1:
+                ep_name = env["name"].split("_")[1]
+                template.add(path + ["name"], 'replace',
+                             env["name"].split(ep_name), ep_name)
 
-def create_multi_subscribe_k8s_yml(k8s_path, dev_mode):
+    # Updating volumes section of k8s yaml dict
+    volumes_path = [index, "spec", "template", "spec", "volumes"]
+    for v, volume in enumerate(yaml_dict["spec"]["template"]["spec"]["volumes"]):
+        # Update cert & key section
+        is_cert = "cert" in volume["name"] and "ca-cert" not in volume["name"]
+        is_key = "key" in volume["name"]
+        if is_cert or is_key:
+            path = volumes_path + [v]
+            template.add(path + ["name"], 'suffix', volume["name"],
+                         is_cert + is_key)
+            template.add(path + ["secret", "secretName"], 'secret',
+                         volume["secret"]["secretName"], is_cert + is_key)
+
+
+def create_multi_subscribe_k8s_yml(file_contents, dev_mode, app_name):
     """Method to create multi subscribe instance k8s yml
 
-    :param k8s_path: path of yml dict
-    :type k8s_path: str
+    :param file_contents: content of the k8s yml
+    :type file_contents: str
     :param dev_mode: dev mode variable
     :type dev_mode: bool
+    :param app_name: name of the app, for reporting port conflicts
+    :type app_name: str
     :return: multi subscribe instance k8s yml
     :rtype: str
     """
     merged_yaml = ""
     data = ""
-    with open(k8s_path) as yaml_file:
-        file_contents = yaml_file.read()
-        string_io_data = io.StringIO(file_contents)
-        # Create multi instance if app has both service & deployment section
-        if "---" in file_contents:
-            yaml_data_list = file_contents.split("---")
-            string_io_data_one = io.StringIO(yaml_data_list[0])
-            string_io_data = io.StringIO(yaml_data_list[1])
-            yaml_prod_srvc = ruamel.yaml.round_trip_load(string_io_data_one,
-                                                        preserve_quotes=True)
-            yaml_prod = ruamel.yaml.round_trip_load(string_io_data,
-                                                    preserve_quotes=True)
-
-            # dict to update service section
-            yaml_dict_srvc = dict()
-            for k, v in yaml_prod_srvc.items():
-                yaml_dict_srvc[k] = v
-
-            # dict to update deployment section
-            yaml_dict = dict()
-            for k, v in yaml_prod.items():
-                yaml_dict[k] = v
-
-            env_dict = yaml_dict["spec"]["template"]["spec"]["containers"][0]["env"]
-
-            for v in range(len(env_dict)):
-                # Update tcp ports section
-                if "ENDPOINT" in env_dict[v]["name"] and ":" in env_dict[v]["value"]:
-                    # Updating ports, appname for SUBSCRIBER/CLIENT ENDPOINTS
-                    if "SUBSCRIBER" in env_dict[v]["name"] or "CLIENT" in env_dict[v]["name"]:
-                        for i in range(num_multi_instances):
-                            # Create a CommentedMap() to store updated values
-                            new_env_dict = CommentedMap()
-                            # Update ports
-                            port = env_dict[v]["value"].split(":")[-1]
-                            new_port = get_available_port(port, used_ports_dict["recv_ports"])
-                            # Update appname in endpoint
-                            appname = env_dict[v]["value"].split(":")[0]
-                            temp_value = env_dict[v]["value"].replace(port, new_port)
-                            new_env_dict["value"] = temp_value.replace(appname, appname + str(i+1))
-                            # Update endpoint name if it has a unique name
-                            if env_dict[v]["name"].count("_") > 1:
-                                ep_name = env_dict[v]["name"].split("_")[1]
-                                new_env_dict['name'] = env_dict[v]["name"].replace(ep_name, ep_name + str(i+1))
-                            # Append CommentedMap() to CommentedSeq()
-                            env_dict.append(new_env_dict)
-                        # Condition to remove recv_ports last few entries if multiple
-                        # subscribers are subcribing to same publisher
-                        used_ports_dict["recv_ports"] = \
-                            used_ports_dict["recv_ports"][:len(used_ports_dict["recv_ports"])-num_multi_instances]
-                        del env_dict[v]
-
-            # Merging deployment section updates
-            kube_yaml = ruamel.yaml.round_trip_dump(yaml_dict)
-            # Merging service section updates
-            kube_yml_srvc = ruamel.yaml.round_trip_dump(yaml_dict_srvc)
-            # Creating final k8s yml
-            data = kube_yml_srvc + "---\n" + kube_yaml
-        # Create multi instance if app has only deployment section
-        else:
-            yaml_prod = ruamel.yaml.round_trip_load(string_io_data,
+    string_io_data = io.StringIO(file_contents)
+    # Create multi instance if app has both service & deployment section
+    if "---" in file_contents:
+        yaml_data_list = file_contents.split("---")
+        string_io_data_one = io.StringIO(yaml_data_list[0])
+        string_io_data = io.StringIO(yaml_data_list[1])
+        yaml_prod_srvc = ruamel.yaml.round_trip_load(string_io_data_one,
                                                     preserve_quotes=True)
-            # dict to update deployment section
-            yaml_dict = dict()
-            for k, v in yaml_prod.items():
-                yaml_dict[k] = v
-
-            env_dict = yaml_dict["spec"]["template"]["spec"]["containers"][0]["env"]
-
-            for v in range(len(env_dict)):
-                # Update tcp ports section
-                if "ENDPOINT" in env_dict[v]["name"] and ":" in env_dict[v]["value"]:
-                    # Updating ports, appname for SUBSCRIBER/CLIENT ENDPOINTS
-                    if "SUBSCRIBER" in env_dict[v]["name"] or "CLIENT" in env_dict[v]["name"]:
-                        for i in range(num_multi_instances):
-                            # Create a CommentedMap() to store updated values
-                            new_env_dict = CommentedMap()
-                            # Update ports
-                            port = env_dict[v]["value"].split(":")[-1]
-                            new_port = get_available_port(port, used_ports_dict["recv_ports"])
-                            # Update appname in endpoint
-                            appname = env_dict[v]["value"].split(":")[0]
-                            temp_value = env_dict[v]["value"].replace(port, new_port)
-                            new_env_dict["value"] = temp_value.replace(appname, appname + str(i+1))
-                            # Update endpoint name if it has a unique name
-                            if env_dict[v]["name"].count("_") > 1:
-                                ep_name = env_dict[v]["name"].split("_")[1]
-                                new_env_dict['name'] = env_dict[v]["name"].replace(ep_name, ep_name + str(i+1))
-                            # Append CommentedMap() to CommentedSeq()
-                            env_dict.append(new_env_dict)
-                        # Condition to remove recv_ports last few entries if multiple
-                        # subscribers are subcribing to same publisher
-                        used_ports_dict["recv_ports"] = \
-                            used_ports_dict["recv_ports"][:len(used_ports_dict["recv_ports"])-num_multi_instances]
-                        del env_dict[v]
-
-            # Merging deployment section updates
-            kube_yaml = ruamel.yaml.round_trip_dump(yaml_dict)
-            # Creating final k8s yml
-            data = kube_yaml
-        # Updating yml based on dev_mode
-        if dev_mode:
-            merged_yaml = merged_yaml + "---\n" + k8s_yaml_remove_secrets(data)
-        else:
-            merged_yaml = merged_yaml + "---\n" + data
+        yaml_prod = ruamel.yaml.round_trip_load(string_io_data,
+                                                preserve_quotes=True)
+
+        # dict to update service section
+        yaml_dict_srvc = dict()
+        for k, v in yaml_prod_srvc.items():
+            yaml_dict_srvc[k] = v
+
+        # dict to update deployment section
+        yaml_dict = dict()
+        for k, v in yaml_prod.items():
+            yaml_dict[k] = v
+
+        env_dict = yaml_dict["spec"]["template"]["spec"]["containers"][0]["env"]
+
+        for v in range(len(env_dict)):
+            # Update tcp ports section
+            if "ENDPOINT" in env_dict[v]["name"] and ":" in env_dict[v]["value"]:
+                # Updating ports, appname for SUBSCRIBER/CLIENT ENDPOINTS
+                if "SUBSCRIBER" in env_dict[v]["name"] or "CLIENT" in env_dict[v]["name"]:
+                    new_ports = []
+                    for i in range(num_multi_instances):
+                        # Create a CommentedMap() to store updated values
+                        new_env_dict = CommentedMap()
+                        # Update ports
+                        port = env_dict[v]["value"].split(":")[-1]
+                        new_port = allocate_port(port, "recv_ports", app_name)
+                        new_ports.append(new_port)
+                        # Update appname in endpoint
+                        appname = env_dict[v]["value"].split(":")[0]
+                        temp_value = env_dict[v]["value"].replace(port, new_port)
+                        new_env_dict["value"] = temp_value.replace(appname, appname + str(i+1))
+                        # Update endpoint name if it has a unique name
+                        if env_dict[v]["name"].count("_") > 1:
+                            ep_name = env_dict[v]["name"].split("_")[1]
+                            new_env_dict['name'] = env_dict[v]["name"].replace(ep_name, ep_name + str(i+1))
+                        # Append CommentedMap() to CommentedSeq()
+                        env_dict.append(new_env_dict)
+                    # Releasing the recv_ports allocated if multiple
+                    # subscribers are subcribing to same publisher
+                    used_ports.release(new_ports, "recv_ports")
+                    del env_dict[v]
+
+        # Merging deployment section updates
+        kube_yaml = ruamel.yaml.round_trip_dump(yaml_dict)
+        # Merging service section updates
+        kube_yml_srvc = ruamel.yaml.round_trip_dump(yaml_dict_srvc)
+        # Creating final k8s yml
+        data = kube_yml_srvc + "---\n" + kube_yaml
+    # Create multi instance if app has only deployment section
+    else:
+        yaml_prod = ruamel.yaml.round_trip_load(string_io_data,
+                                                preserve_quotes=True)
+        # dict to update deployment section
+        yaml_dict = dict()
+        for k, v in yaml_prod.items():
+            yaml_dict[k] = v
+
+        env_dict = yaml_dict["spec"]["template"]["spec"]["containers"][0]["env"]
+
+        for v in range(len(env_dict)):
+            # Update tcp ports section
+            if "ENDPOINT" in env_dict[v]["name"] and ":" in env_dict[v]["value"]:
+                # Updating ports, appname for SUBSCRIBER/CLIENT ENDPOINTS
+                if "SUBSCRIBER" in env_dict[v]["name"] or "CLIENT" in env_dict[v]["name"]:
+                    new_ports = []
+                    for i in range(num_multi_instances):
+                        # Create a CommentedMap() to store updated values
+                        new_env_dict = CommentedMap()
+                        # Update ports
+                        port = env_dict[v]["value"].split(":")[-1]
+                        new_port = allocate_port(port, "recv_ports", app_name)
+                        new_ports.append(new_port)
+                        # Update appname in endpoint
+                        appname = env_dict[v]["value"].split(":")[0]
+                        temp_value = env_dict[v]["value"].replace(port, new_port)
+                        new_env_dict["value"] = temp_value.replace(appname, appname + str(i+1))
+                        # Update endpoint name if it has a unique name
+                        if env_dict[v]["name"].count("_") > 1:
+                            ep_name = env_dict[v]["name"].split("_")[1]
+                            new_env_dict['name'] = env_dict[v]["name"].replace(ep_name, ep_name + str(i+1))
+                        # Append CommentedMap() to CommentedSeq()
+                        env_dict.append(new_env_dict)
+                    # Releasing the recv_ports allocated if multiple
+                    # subscribers are subcribing to same publisher
+                    used_ports.release(new_ports, "recv_ports")
+                    del env_dict[v]
+
+        # Merging deployment section updates
+        kube_yaml = ruamel.yaml.round_trip_dump(yaml_dict)
+        # Creating final k8s yml
+        data = kube_yaml
+    # Updating yml based on dev_mode
+    if dev_mode:
+        merged_yaml = merged_yaml + "---\n" + k8s_yaml_remove_secrets(data)
+    else:
+        merged_yaml = merged_yaml + "---\n" + data
 
     return merged_yaml
 
 
-def create_multi_instance_k8s_yml(k8s_path, dev_mode, i):
+def create_multi_instance_k8s_template(file_contents):
+    """Method to analyse a k8s yml once for all its multi instances
+
+    :param file_contents: content of the k8s yml
+    :type file_contents: str
+    :return: multi instance k8s yml template
+    :rtype: InstanceTemplate
+    """
+    documents = []
+    # Create multi instance if app has both service & deployment section
+    if "---" in file_contents:
+        yaml_data_list = file_contents.split("---")
+        documents.append(ruamel.yaml.round_trip_load(yaml_data_list[0],
+                                                     preserve_quotes=True))
+        documents.append(ruamel.yaml.round_trip_load(yaml_data_list[1],
+                                                     preserve_quotes=True))
+    # Create multi instance if app has only deployment section
+    else:
+        documents.append(ruamel.yaml.round_trip_load(file_contents,
+                                                     preserve_quotes=True))
+    template = InstanceTemplate(documents)
+
+    if len(documents) > 1:
+        yaml_dict_srvc = documents[0]
+        # Updating app name
+        template.add([0, 'metadata', 'name'], 'suffix',
+                     yaml_dict_srvc['metadata']['name'])
+        template.add([0, 'spec', 'selector', 'app'], 'suffix',
+                     yaml_dict_srvc['spec']['selector']['app'])
+        # Updating ports in service section, in the order they are
+        # allocated
+        port_slot = None
+        for v, port_dict in enumerate(yaml_dict_srvc['spec']['ports']):
+            path = [0, 'spec', 'ports', v]
+            # Update port
+            if "port" in port_dict:
+                if "$" not in str(port_dict['port']):
+                    port_slot = template.add(path + ['port'], 'alloc',
+                                             str(port_dict['port']),
+                                             'srvc_ports')
+                # Update targetPort if it exists
+                if "targetPort" in port_dict:
+                    if "$" not in str(port_dict['targetPort']):
+                        if port_slot is None:
+                            raise Exception("No port allocated for the "
+                                            "targetPort of {}".format(
+                                                yaml_dict_srvc['metadata']
+                                                ['name']))
+                        template.add(path + ['targetPort'], 'ref',
+                                     port_slot)
+                # Update nodePort if it exists
+                if "nodePort" in port_dict:
+                    if "$" not in str(port_dict['nodePort']):
+                        port_slot = template.add(path + ['nodePort'],
+                                                 'alloc',
+                                                 str(port_dict['nodePort']),
+                                                 'srvc_ports')
+
+    # Update deployment section
+    add_multi_instance_k8s_deployment_slots(template, len(documents) - 1)
+    return template
+
+
+def create_multi_instance_k8s_yml(template, dev_mode, i, app_name):
     """Method to create multi instance k8s yml
 
-    :param k8s_path: path of yml dict
-    :type k8s_path: str
+    :param template: multi instance k8s yml template
+    :type template: InstanceTemplate
     :param dev_mode: dev mode variable
     :type dev_mode: bool
     :param i: index of multi instance
     :type i: int
+    :param app_name: name of the app, for reporting port conflicts
+    :type app_name: str
     :return: multi instance k8s yml
     :rtype: str
     """
-    merged_yaml = ""
-    data = ""
-    with open(k8s_path) as yaml_file:
-        file_contents = yaml_file.read()
-        string_io_data = io.StringIO(file_contents)
-        # Create multi instance if app has both service & deployment section
-        if "---" in file_contents:
-            yaml_data_list = file_contents.split("---")
-            string_io_data_one = io.StringIO(yaml_data_list[0])
-            string_io_data = io.StringIO(yaml_data_list[1])
-            yaml_prod_srvc = ruamel.yaml.round_trip_load(string_io_data_one,
-                                                        preserve_quotes=True)
-            yaml_prod = ruamel.yaml.round_trip_load(string_io_data,
-                                                    preserve_quotes=True)
-
-            # dict to update service section
-            yaml_dict_srvc = dict()
-            for k, v in yaml_prod_srvc.items():
-                yaml_dict_srvc[k] = v
-            # Updating app name
-            yaml_dict_srvc['metadata']['name'] = yaml_dict_srvc['metadata']['name'] + str(i+1)
-            yaml_dict_srvc['spec']['selector']['app'] = yaml_dict_srvc['spec']['selector']['app'] + str(i+1)
-            # Updating ports in service section
-            ports_dict = yaml_dict_srvc['spec']['ports']
-            for v in range(len(ports_dict)):
-                # Update port
-                if "port" in ports_dict[v]:
-                    if "$" not in str(ports_dict[v]['port']):
-                        port = ports_dict[v]['port']
-                        new_port = get_available_port(str(port), used_ports_dict['srvc_ports'])
-                        ports_dict[v]['port'] = int(new_port)
-                    # Update targetPort if it exists
-                    if "targetPort" in ports_dict[v]:
-                        if "$" not in str(ports_dict[v]['targetPort']):
-                            ports_dict[v]['targetPort'] = int(new_port)
-                    # Update nodePort if it exists
-                    if "nodePort" in ports_dict[v]:
-                        if "$" not in str(ports_dict[v]['nodePort']):
-                            port = ports_dict[v]['nodePort']
-                            new_port = get_available_port(str(port), used_ports_dict['srvc_ports'])
-                            ports_dict[v]['nodePort'] = int(new_port)
-
-            # dict to update deployment section
-            yaml_dict = dict()
-            for k, v in yaml_prod.items():
-                yaml_dict[k] = v
-
-            # Update deployment section app name
-            yaml_dict["metadata"]["labels"]["app"] = yaml_dict["metadata"]["labels"]["app"] + str(i+1)
-            yaml_dict["metadata"]["name"] = yaml_dict["metadata"]["name"] + str(i+1)
-            # Update deployment section
-            yaml_dict = multi_instance_k8s_deployment(yaml_dict, i)
-
-            # Merging deployment section updates
-            kube_yaml = ruamel.yaml.round_trip_dump(yaml_dict)
-            # Merging service section updates
-            kube_yml_srvc = ruamel.yaml.round_trip_dump(yaml_dict_srvc)
-            # Creating final k8s yml
-            data = kube_yml_srvc + "---\n" + kube_yaml
-        # Create multi instance if app has only deployment section
-        else:
-            yaml_prod = ruamel.yaml.round_trip_load(string_io_data,
-                                                    preserve_quotes=True)
-            # dict to update deployment section
-            yaml_dict = dict()
-            for k, v in yaml_prod.items():
-                yaml_dict[k] = v
-            # Update deployment section app name
-            yaml_dict["metadata"]["labels"]["app"] = yaml_dict["metadata"]["labels"]["app"] + str(i+1)
-            yaml_dict["metadata"]["name"] = yaml_dict["metadata"]["name"] + str(i+1)
-            # Update deployment section
-            yaml_dict = multi_instance_k8s_deployment(yaml_dict, i)
-
-            # Merging deployment section updates
-            kube_yaml = ruamel.yaml.round_trip_dump(yaml_dict)
-            # Creating final k8s yml
-            data = kube_yaml
-        # Updating yml based on dev_mode
+    owner = app_name + str(i + 1)
+    documents = template.instance(
+        i + 1, lambda port, pool: allocate_port(port, pool, owner))
+    # dict to update deployment section
+    yaml_dict = dict()
+    for k, v in documents[-1].items():
+        yaml_dict[k] = v
+    # Updating yml based on dev_mode
+    if dev_mode:
+        remove_k8s_secrets(yaml_dict)
+    # Merging deployment section updates
+    data = ruamel.yaml.round_trip_dump(yaml_dict)
+    if len(documents) > 1:
+        # dict to update service section
+        yaml_dict_srvc = dict()
+        for k, v in documents[0].items():
+            yaml_dict_srvc[k] = v
+        # Merging service section updates
+        kube_yml_srvc = ruamel.yaml.round_trip_dump(yaml_dict_srvc)
+        # Creating final k8s yml
+        data = kube_yml_srvc + "---\n" + data
+
+    return "---\n" + data
+
+
+def generate_k8s_fragment(service, dev_mode, args):
+    """Generates the k8s yml of an app, creating its multi
+       instance deployments if required
+
+    :param service: service of the app
+    :type service: Service
+    :param dev_mode: Dev Mode key
+    :type dev_mode: bool
+    :param args: cli args
+    :type args: argparse
+    :return: k8s yml of the app
+    :rtype: str
+    """
+    kube_yaml = service.path + '/' + K8S_FILE
+    app_name = kube_yaml.split("/")[-2]
+    if args.override_directory is not None:
+        if args.override_directory in kube_yaml:
+            app_name = kube_yaml.split("/")[-3]
+    app_yaml = ""
+    # Generating multi instance for Publishers/Servers
+    if num_multi_instances > 1 and app_name not in subscriber_list.keys():
+        # Analysing the k8s yml once for all the instances
+        template = create_multi_instance_k8s_template(service.k8s_manifest)
+        for i in range(num_multi_instances):
+            multi_instance_yml = create_multi_instance_k8s_yml(template, dev_mode, i,
+                                                               app_name)
+            app_yaml = app_yaml + "---\n" + multi_instance_yml
+    # Generating multi instance for Subscribers/Clients
+    elif num_multi_instances > 1 and app_name in subscriber_list.keys():
+        multi_instance_yml = create_multi_subscribe_k8s_yml(service.k8s_manifest, dev_mode,
+                                                            app_name)
+        app_yaml = app_yaml + "---\n" + multi_instance_yml
+    else:
+        data = service.k8s_manifest
         if dev_mode:
-            merged_yaml = merged_yaml + "---\n" + k8s_yaml_remove_secrets(data)
+            app_yaml = app_yaml + "---\n" + k8s_yaml_remove_secrets(data)
         else:
-            merged_yaml = merged_yaml + "---\n" + data
-
-    return merged_yaml
+            app_yaml = app_yaml + "---\n" + data
+    return app_yaml
 
 
 def k8s_yaml_merger(app_list, dev_mode, args):
@@ -777,27 +972,36 @@ def k8s_yaml_merger(app_list, dev_mode, args):
     # Iterate through app_list & merge k8s yaml
     # and create multi instance yaml if multi
     # instance is required
-    for kube_yaml in app_list:
-        app_name = kube_yaml.split("/")[-2]
-        if args.override_directory is not None:
-            if args.override_directory in kube_yaml:
-                app_name = kube_yaml.split("/")[-3]
-        # Generating multi instance for Publishers/Servers
-        if num_multi_instances > 1 and app_name not in subscriber_list.keys():
-            for i in range(num_multi_instances):
-                multi_instance_yml = create_multi_instance_k8s_yml(kube_yaml, dev_mode, i)
-                merged_yaml = merged_yaml + "---\n" + multi_instance_yml
-        # Generating multi instance for Subscribers/Clients
-        elif num_multi_instances > 1 and app_name in subscriber_list.keys():
-            multi_instance_yml = create_multi_subscribe_k8s_yml(kube_yaml, dev_mode)
-            merged_yaml = merged_yaml + "---\n" + multi_instance_yml
-        else:
-            with open(kube_yaml) as yaml_file:
-                data = yaml_file.read()
-                if dev_mode:
-                    merged_yaml = merged_yaml + "---\n" + k8s_yaml_remove_secrets(data)
-                else:
-                    merged_yaml = merged_yaml + "---\n" + data
+    if num_multi_instances > 1:
+        # Multi instance ports are allocated from the ones used by the
+        # previous apps, so these fragments are generated in order
+        for kube_yaml in app_list:
+            # Re-using the app's k8s fragment if neither its input nor the
+            # ports allocated by the previous apps changed
+            ports_before = used_ports.state()
+            cached = build_cache.get('k8s', kube_yaml, [kube_yaml],
+                                     ports_before)
+            if cached is not None:
+                app_yaml, ports_after, conflicts = cached
+                used_ports.restore(ports_after)
+                used_ports.conflicts.extend(conflicts)
+            else:
+                num_conflicts = len(used_ports.conflicts)
+                app_yaml = generate_k8s_fragment(
+                    services.get(os.path.dirname(kube_yaml)), dev_mode, args)
+                build_cache.put('k8s', kube_yaml, [kube_yaml],
+                                (app_yaml, used_ports.state(),
+                                 used_ports.conflicts[num_conflicts:]),
+                                ports_before)
+            merged_yaml = merged_yaml + app_yaml
+        report_port_conflicts(used_ports, 'k8s')
+    else:
+        fragments = generate_fragments('k8s',
+                                       [services.get(os.path.dirname(path))
+                                        for path in app_list],
+                                       [K8S_FILE], generate_k8s_fragment,
+                                       [dev_mode, args])
+        merged_yaml = "".join(fragments)
 
     k8s_service_yaml = './k8s/eii-k8s-deploy.yml'
     with open(k8s_service_yaml, 'w') as final_yaml:
@@ -812,8 +1016,9 @@ def create_multi_instance_yml_dict(data, i):
 
     :param data: input yaml
     :type data: ordered dict
-    :param i: number of required instances
-    :type i: int
+    :param i: instance number, INSTANCE_PLACEHOLDER to rename the
+              services of a multi instance template
+    :type i: int or str
     :return: updated yaml dict
     :rtype: ordered dict
     """
@@ -889,6 +1094,48 @@ def create_multi_instance_yml_dict(data, i):
     return temp
 
 
+def generate_compose_fragment(service, file_to_pick, args):
+    """Loads the compose file of an app, creating its multi
+       instance services if required
+
+    :param service: service of the app
+    :type service: Service
+    :param file_to_pick: yml file to be picked
+    :type file_to_pick: str
+    :param args: cli args var
+    :type args: argparse
+    :return: list of yaml dicts to be merged
+    :rtype: list
+    """
+    app_path = service.path
+    fragment = []
+    data = service.yaml(file_to_pick)
+
+    # Create multi instance compose if num_multi_instances is > 1
+    if num_multi_instances > 1:
+        appname = app_path.split("/")[-1]
+        if args.override_directory is not None:
+            if args.override_directory in app_path:
+                appname = app_path.split("/")[-2]
+        # Create single instance only for services in subscriber_list and 
+        # for corner case of common/video, create multi instance otherwise
+        # TODO: Support AzureBridge multi instance creation if applicable
+        if appname not in subscriber_list.keys() and appname != "video" and appname != "common" and appname != "AzureBridge":
+            # Renaming the services once for all the instances
+            template = InstanceTemplate(
+                create_multi_instance_yml_dict(data, INSTANCE_PLACEHOLDER))
+            template.add_placeholder_slots()
+            for i in range(num_multi_instances):
+                fragment.append(template.instance(i+1))
+        # To create single instance for subscriber services
+        else:
+            fragment.append(data)
+    # To create single instance
+    else:
+        fragment.append(data)
+    return fragment
+
+
 def update_yml_dict(app_list, file_to_pick, dev_mode, args):
     """Method to consolidate yml dicts and generate the
        combined yml dict. Picks the yml file specified by
@@ -908,37 +1155,26 @@ def update_yml_dict(app_list, file_to_pick, dev_mode, args):
 
     # Load the common docker-compose.yml
     yaml_files_dict = []
-    with open('common-docker-compose.yml', 'r') as docker_compose_file:
-        data = ruamel.yaml.round_trip_load(docker_compose_file,
-                                           preserve_quotes=True)
-        yaml_files_dict.append(data)
-
-    # Load the required yaml files
-    app_list.extend(override_apps_list)
-    for k in app_list:
-        with open(k + '/' + file_to_pick, 'r') as docker_compose_file:
+    common_compose = 'common-docker-compose.yml'
+    fragment = build_cache.get('compose', common_compose, [common_compose])
+    if fragment is None:
+        with open(common_compose, 'r') as docker_compose_file:
             data = ruamel.yaml.round_trip_load(docker_compose_file,
                                                preserve_quotes=True)
+            fragment = [data]
+        build_cache.put('compose', common_compose, [common_compose], fragment)
+    yaml_files_dict.extend(fragment)
 
-            # Create multi instance compose if num_multi_instances is > 1
-            if num_multi_instances > 1:
-                appname = k.split("/")[-1]
-                if args.override_directory is not None:
-                    if args.override_directory in k:
-                        appname = k.split("/")[-2]
-                # Create single instance only for services in subscriber_list and 
-                # for corner case of common/video, create multi instance otherwise
-                # TODO: Support AzureBridge multi instance creation if applicable
-                if appname not in subscriber_list.keys() and appname != "video" and appname != "common" and appname != "AzureBridge":
-                    for i in range(num_multi_instances):
-                        data_two = create_multi_instance_yml_dict(data, i+1)
-                        yaml_files_dict.append(data_two)
-                # To create single instance for subscriber services
-                else:
-                    yaml_files_dict.append(data)
-            # To create single instance
-            else:
-                yaml_files_dict.append(data)
+    # Load the required yaml files. Fragments are cached before being
+    # merged below, since the merge and the dev mode clean up mutate them
+    # in place.
+    app_list.extend(override_apps_list)
+    fragments = generate_fragments('compose',
+                                   [services.get(k) for k in app_list],
+                                   [file_to_pick], generate_compose_fragment,
+                                   [file_to_pick, args])
+    for fragment in fragments:
+        yaml_files_dict.extend(fragment)
 
     # Updating final yaml dict
     yaml_dict = yaml_files_dict[0]
@@ -1089,6 +1325,9 @@ def yaml_parser(args):
                 dev_mode = util.strtobool(dev_mode)
                 break
 
+    # Starting the worker pool once all the services are known
+    start_worker_pool(args)
+
     yml_dict = update_yml_dict(app_list, 'docker-compose.yml', dev_mode, args)
 
     with open(DOCKER_COMPOSE_PATH, 'w') as docker_compose_file:
@@ -1139,6 +1378,21 @@ def parse_args():
                            'of benchmarking configs to be present in'
                            'each app directory.\
                            Eg: python3.6 builder.py -d benchmarking')
+    arg_parse.add_argument('--no-cache', dest='no_cache',
+                           action='store_true',
+                           help='Regenerate all the service fragments '
+                           'instead of re-using the ones cached in '
+                           '{} from previous runs'.format(BUILD_CACHE_DIR))
+    arg_parse.add_argument('--scan-host-ports', dest='scan_host_ports',
+                           action='store_true',
+                           help='Skip the tcp ports already bound on this '
+                           'host when allocating the multi instance ports '
+                           'and report the services using them')
+    arg_parse.add_argument('-j', '--jobs', type=int, default=1,
+                           help='Optional number of worker processes '
+                           'generating the service fragments, 1 to '
+                           'generate them serially.\
+                           Eg: python3.6 builder.py -j 4')
     return arg_parse.parse_args()
 
 
@@ -1166,5 +1420,39 @@ if __name__ == '__main__':
     if int(args.video_pipeline_instances) > 1:
         num_multi_instances = int(args.video_pipeline_instances)
 
+    # Reserving the ports not to be allocated to the multi instances
+    try:
+        if args.scan_host_ports:
+            host_ports = sorted(host_bound_ports())
+        reserve_ports(used_ports)
+    except Exception as e:
+        print("Exception Occured reserving ports {}".format(e))
+        sys.exit(1)
+
+    # Initializing the build cache, fragments are re-used only if the
+    # builder, its config, .env & cli args are unchanged
+    cache_args = {k: v for k, v in vars(args).items()
+                  if k not in ['no_cache', 'jobs']}
+    build_cache = BuildCache(BUILD_CACHE_DIR,
+                             [__file__, builder_cache.__file__,
+                              config_assembler.__file__,
+                              service_model.__file__,
+                              instance_template.__file__,
+                              port_allocator.__file__,
+                              'builder_config.json', '.env',
+                              'common_config.json'],
+                             [cache_args, ruamel.yaml.__version__,
+                              host_ports],
+                             read_cache=not args.no_cache)
+
     # Start yaml parser
     yaml_parser(args)
+    if worker_pool is not None:
+        worker_pool.shutdown()
+    print("Build cache: {} fragments re-used, {} regenerated".format(
+          build_cache.hits, build_cache.misses))
+    reads, parses = services.stats()
+    print("Service files: {} read, {} parsed ({})".format(
+          sum(reads.values()), sum(parses.values()),
+          ", ".join("{}: {}/{}".format(f, reads[f], parses[f])
+                    for f in sorted(reads))))
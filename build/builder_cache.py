@@ -0,0 +1,153 @@
+# Copyright (c) 2020 Intel Corporation.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Persistent cache of the per-service fragments generated by builder.py
+"""
+import os
+import json
+import hashlib
+import pickle
+
+
+class BuildCache:
+    """On-disk cache of builder fragments keyed by content hashes
+
+    Every fragment is stored under its stage (compose, config, k8s) and
+    name (usually the input file path) along with the key it was generated
+    for. The key is derived from the content of the fragment's input files,
+    the global build context (builder sources, builder_config.json, .env,
+    cli args) and any extra state the fragment depends on, so a stale
+    fragment is never returned.
+    """
+
+    def __init__(self, cache_dir, context_files, context_values,
+                 read_cache=True):
+        """Constructor
+
+        :param cache_dir: directory to store the fragments in
+        :type cache_dir: str
+        :param context_files: files every fragment depends on
+        :type context_files: list
+        :param context_values: json serializable values every fragment
+                               depends on, eg: cli args
+        :type context_values: list
+        :param read_cache: if False, cached fragments are ignored and
+                           regenerated ones overwrite them
+        :type read_cache: bool
+        """
+        self.cache_dir = cache_dir
+        self.read_cache = read_cache
+        self.hits = 0
+        self.misses = 0
+        self._digests = {}
+        self.context_hash = self._hash([self.file_digest(f)
+                                        for f in context_files] +
+                                       list(context_values))
+
+    def file_digest(self, path):
+        """Returns the sha256 digest of the content of a file. Digests are
+           memoized as inputs are not expected to change during a run
+
+        :param path: path of the file
+        :type path: str
+        :return: hex digest, empty string if file does not exist
+        :rtype: str
+        """
+        if path not in self._digests:
+            try:
+                with open(path, 'rb') as infile:
+                    self._digests[path] = \
+                        hashlib.sha256(infile.read()).hexdigest()
+            except FileNotFoundError:
+                self._digests[path] = ""
+        return self._digests[path]
+
+    @staticmethod
+    def _hash(values):
+        """Returns sha256 hex digest of json serializable values
+
+        :param values: values to be hashed
+        :type values: list
+        :return: hex digest
+        :rtype: str
+        """
+        return hashlib.sha256(json.dumps(values, sort_keys=True,
+                                         default=str).encode()).hexdigest()
+
+    def _fragment_key(self, paths, extra):
+        return self._hash([self.context_hash,
+                           [[p, self.file_digest(p)] for p in paths],
+                           extra])
+
+    def _fragment_path(self, stage, name):
+        name_hash = hashlib.sha1(name.encode()).hexdigest()
+        return os.path.join(self.cache_dir, stage, name_hash + '.pickle')
+
+    def get(self, stage, name, paths, extra=None):
+        """Fetches a cached fragment
+
+        :param stage: builder stage the fragment belongs to
+        :type stage: str
+        :param name: name of the fragment
+        :type name: str
+        :param paths: input files of the fragment
+        :type paths: list
+        :param extra: json serializable state the fragment depends on
+        :type extra: object
+        :return: cached fragment, None if missing or stale
+        :rtype: object
+        """
+        if self.read_cache:
+            try:
+                with open(self._fragment_path(stage, name), 'rb') as infile:
+                    entry = pickle.load(infile)
+                if entry['key'] == self._fragment_key(paths, extra):
+                    self.hits += 1
+                    return entry['fragment']
+            except (OSError, EOFError, KeyError, TypeError,
+                    pickle.UnpicklingError):
+                pass
+        self.misses += 1
+        return None
+
+    def put(self, stage, name, paths, fragment, extra=None):
+        """Stores a generated fragment. Failing to write the cache is not
+           fatal for the build
+
+        :param stage: builder stage the fragment belongs to
+        :type stage: str
+        :param name: name of the fragment
+        :type name: str
+        :param paths: input files of the fragment
+        :type paths: list
+        :param fragment: picklable fragment
+        :type fragment: object
+        :param extra: json serializable state the fragment depends on
+        :type extra: object
+        """
+        fragment_path = self._fragment_path(stage, name)
+        entry = {'key': self._fragment_key(paths, extra),
+                 'fragment': fragment}
+        try:
+            os.makedirs(os.path.dirname(fragment_path), exist_ok=True)
+            with open(fragment_path + '.tmp', 'wb') as outfile:
+                pickle.dump(entry, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(fragment_path + '.tmp', fragment_path)
+        except (OSError, pickle.PicklingError) as err:
+            print("Failed to write build cache for {}: {}".format(name, err))
@@ -0,0 +1,85 @@
+# Copyright (c) 2020 Intel Corporation.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Single pass assembler for the consolidated eii_config.json
+"""
+import json
+
+
+class ConfigConflictError(Exception):
+    """Raised when two services define the same etcd key differently
+    """
+    pass
+
+
+class ConfigAssembler:
+    """Assembles the consolidated etcd config one key at a time
+
+    Every etcd key (/GlobalEnv/, /<AppName>/config, /<AppName>/interfaces)
+    is inserted once, so the cost of assembling the config grows linearly
+    with the number of apps and instances.
+    """
+
+    def __init__(self):
+        """Constructor
+        """
+        self.config = {}
+        self.sources = {}
+
+    def add(self, key, value, source):
+        """Inserts an etcd key into the consolidated config
+
+        :param key: etcd key, eg: /VideoIngestion/config
+        :type key: str
+        :param value: value of the key
+        :type value: dict
+        :param source: service path the key was generated from
+        :type source: str
+        :raises ConfigConflictError: if key was already added by another
+                                     service with a different value
+        """
+        if key in self.config:
+            # Same service picked up more than once, nothing to do
+            if self.config[key] == value:
+                return
+            raise ConfigConflictError(
+                "Duplicate key {} generated from {} and {}, check the "
+                "AppName of these services".format(key, self.sources[key],
+                                                   source))
+        self.config[key] = value
+        self.sources[key] = source
+
+    def add_fragment(self, fragment, source):
+        """Inserts all the etcd keys generated for a service
+
+        :param fragment: dict of etcd key, value pairs
+        :type fragment: dict
+        :param source: service path the fragment was generated from
+        :type source: str
+        """
+        for key, value in fragment.items():
+            self.add(key, value, source)
+
+    def dumps(self):
+        """Serializes the consolidated config
+
+        :return: consolidated config json
+        :rtype: str
+        """
+        return json.dumps(self.config, sort_keys=True, indent=4)
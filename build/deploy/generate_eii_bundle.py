@@ -23,12 +23,226 @@
 import subprocess
 import json
 import sys
+import os
+import io
+import pwd
+import grp
+import gzip
+import shutil
+import tarfile
+import hashlib
 import argparse
 import yaml
 
 USER = "eiiuser:eiiuser"
 
 
+class _HashingReader:
+    """File wrapper computing the sha256 of the data read
+    """
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.sha256.update(data)
+        return data
+
+
+class BundleArchive:
+    """Streams files into a compressed tar archive in a single pass, without
+       staging copies, and records their sha256 in a manifest written in the
+       archive and next to it, so that nodes can update only the changed
+       files. Archives are reproducible: entries are sorted, and timestamps
+       (SOURCE_DATE_EPOCH, 0 by default) and owners are fixed. pigz and the
+       in process gzip compress differently, so the same archive is only
+       produced again by the same compressor.
+    """
+    MANIFEST = "manifest.json"
+
+    def __init__(self, name, compression="gzip", jobs=None, owner=None):
+        '''
+            name is the top directory of the archive, compression is gzip
+            or zstd, run by pigz or zstd with jobs threads (all cpus by
+            default). Without pigz, gzip runs in process on one thread.
+            owner is the "user:group" owning the files, root by default.
+        '''
+        self.name = name
+        self.compression = compression
+        self.jobs = jobs or os.cpu_count()
+        self.mtime = int(os.environ.get("SOURCE_DATE_EPOCH", 0))
+        self.owner = owner
+        self.user, self.group = (owner or "root:root").split(":")
+        try:
+            self.uid = pwd.getpwnam(self.user).pw_uid
+            self.gid = grp.getgrnam(self.group).gr_gid
+        except KeyError:
+            self.uid = self.gid = 0
+        # Path in the archive -> (source file path or content, mode)
+        self.entries = {}
+        self.dirs = {""}
+
+    @property
+    def tar_file(self):
+        '''
+            File name of the archive
+        '''
+        if self.compression == "zstd":
+            return self.name + ".tar.zst"
+        return self.name + ".tar.gz"
+
+    def add_bytes(self, arcname, data, mode=0o644):
+        '''
+            Adds a file of the given content
+        '''
+        self.entries[arcname] = (data, mode)
+
+    def add_file(self, arcname, path, mode=None):
+        '''
+            Adds a file, with the mode of the source file by default
+        '''
+        if mode is None:
+            mode = os.stat(path).st_mode & 0o7777
+        self.entries[arcname] = (path, mode)
+
+    def add_tree(self, arcname, path, exclude=()):
+        '''
+            Adds a directory recursively, excluding the given paths relative
+            to it
+        '''
+        if not os.path.isdir(path):
+            raise FileNotFoundError("No such directory: " + path)
+        for root, _, files in os.walk(path):
+            rel = os.path.relpath(root, path)
+            self.dirs.add(os.path.normpath(os.path.join(arcname, rel)))
+            for name in files:
+                if os.path.normpath(os.path.join(rel, name)) in exclude:
+                    continue
+                self.add_file(os.path.normpath(os.path.join(arcname, rel,
+                                                            name)),
+                              os.path.join(root, name))
+
+    def _all_dirs(self):
+        dirs = set(self.dirs)
+        for arcname in list(self.dirs) + list(self.entries):
+            parent = os.path.dirname(arcname)
+            while parent not in dirs:
+                dirs.add(parent)
+                parent = os.path.dirname(parent)
+        return sorted(dirs)
+
+    def _tarinfo(self, arcname, mode, size=0, dirtype=False):
+        info = tarfile.TarInfo(os.path.join(self.name, arcname)
+                               if arcname else self.name)
+        info.type = tarfile.DIRTYPE if dirtype else tarfile.REGTYPE
+        info.mode = mode
+        info.size = size
+        info.mtime = self.mtime
+        info.uid, info.gid = self.uid, self.gid
+        info.uname, info.gname = self.user, self.group
+        return info
+
+    def _compressor(self, output):
+        '''
+            Returns the stream compressing into output, and the compressing
+            process or None when compressing in process
+        '''
+        if self.compression == "zstd":
+            if shutil.which("zstd") is None:
+                raise Exception("zstd not found")
+            cmd = ["zstd", "-q", "-c", "-T{}".format(self.jobs)]
+        elif shutil.which("pigz") is not None:
+            # -n leaves out the file name and time, for reproducible archives
+            cmd = ["pigz", "-n", "-c", "-p", str(self.jobs)]
+        else:
+            return gzip.GzipFile(filename="", mode="wb", fileobj=output,
+                                 compresslevel=6, mtime=self.mtime), None
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=output)
+        return proc.stdin, proc
+
+    def _write_tar(self, stream):
+        '''
+            Streams the entries and the manifest into stream, returns the
+            manifest and its json data
+        '''
+        manifest = {}
+        with tarfile.open(fileobj=stream, mode="w|",
+                          format=tarfile.PAX_FORMAT) as tar:
+            for arcname in self._all_dirs():
+                tar.addfile(self._tarinfo(arcname, 0o755, dirtype=True))
+            for arcname in sorted(self.entries):
+                source, mode = self.entries[arcname]
+                if isinstance(source, bytes):
+                    src = io.BytesIO(source)
+                    size = len(source)
+                else:
+                    src = open(source, "rb")
+                    size = os.fstat(src.fileno()).st_size
+                with src:
+                    reader = _HashingReader(src)
+                    tar.addfile(self._tarinfo(arcname, mode, size), reader)
+                manifest[arcname] = {
+                    "sha256": reader.sha256.hexdigest(),
+                    "size": size,
+                    "mode": "{:04o}".format(mode)
+                }
+            data = json.dumps({"files": manifest}, indent=4,
+                              sort_keys=True).encode()
+            tar.addfile(self._tarinfo(self.MANIFEST, 0o644, len(data)),
+                        io.BytesIO(data))
+        return manifest, data
+
+    def write(self):
+        '''
+            Writes the archive and its manifest, returns the manifest
+        '''
+        tmp_file = self.tar_file + ".tmp"
+        proc = None
+        try:
+            with open(tmp_file, "wb") as output:
+                stream, proc = self._compressor(output)
+                try:
+                    manifest, data = self._write_tar(stream)
+                finally:
+                    # Closing the stream lets the compressing process finish
+                    stream.close()
+                if proc is not None and proc.wait() != 0:
+                    raise Exception("Compressing {} failed".format(
+                        self.tar_file))
+            os.replace(tmp_file, self.tar_file)
+        finally:
+            if proc is not None and proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+        with open(self.name + "." + self.MANIFEST, "wb") as manifest_file:
+            manifest_file.write(data)
+        return manifest
+
+    def extract(self):
+        '''
+            Writes the bundle folder
+        '''
+        for arcname in self._all_dirs():
+            os.makedirs(os.path.join(self.name, arcname), exist_ok=True)
+        for arcname, (source, mode) in self.entries.items():
+            path = os.path.join(self.name, arcname)
+            if isinstance(source, bytes):
+                with open(path, "wb") as dest:
+                    dest.write(source)
+            else:
+                shutil.copyfile(source, path)
+            os.chmod(path, mode)
+        if self.owner is None:
+            return
+        for root, _, files in os.walk(self.name):
+            shutil.chown(root, self.user, self.group)
+            for name in files:
+                shutil.chown(os.path.join(root, name), self.user, self.group)
+
+
 class EiiBundleGenerator:
     """EiiBundleGenerator class
     """
@@ -66,6 +280,17 @@ class EiiBundleGenerator:
                 env_dict[env_val[0]] = env_val[1].rstrip()
         return env_dict
 
+    @classmethod
+    def get_worker_env(cls, filepath):
+        '''
+            This method returns the content of the .env file
+            for the worker nodes
+        '''
+        with open(filepath, 'r') as env_file:
+            envdata = env_file.read()
+        return envdata.replace("ETCD_NAME=master",
+                               "ETCD_NAME=worker").encode()
+
     def generate_docker_composeyml(self):
         '''
             This method helps to generate the docker-compose yaml
@@ -100,10 +325,20 @@ class EiiBundleGenerator:
         except Exception as err:
             print("Exception Occured", err)
 
+    def write_bundle(self, archive):
+        '''
+            write_bundle writes the bundle archive streaming the
+            files into it, and the bundle folder if requested
+        '''
+        shutil.rmtree(archive.name, ignore_errors=True)
+        archive.write()
+        if self.bundle_folder is not False:
+            archive.extract()
+
     def generate_eii_bundle(self):
         '''
-            generate_eii_bundle helps to execute set of pre
-            commands which are required for Bundle and finally
+            generate_eii_bundle helps to collect the files
+            which are required for Bundle and finally
             it generates the bundle
         '''
 
@@ -111,80 +346,45 @@ class EiiBundleGenerator:
             print("Please Check the Docker Regsitry Address in \
                 'DOCKER_REGISTRY' env of build/.env file")
             sys.exit(0)
-        eii_cert_dir = "./" + self.bundle_tag_name + "/provision/Certificates/"
-        cmdlist = []
-        cmdlist.append(["rm", "-rf", self.bundle_tag_name])
-        cmdlist.append(["mkdir", "-p", self.bundle_tag_name])
-        cmdlist.append(["cp", "../.env", self.bundle_tag_name])
-        cmdlist.append(["mv", "docker-compose.yml", self.bundle_tag_name])
-        if self.env["DEV_MODE"] == "false":
-            for service in self.config['services'].keys():
-                servicename =\
-                    self.config['services'][service]['environment']['AppName']
-                service_dir = eii_cert_dir + servicename
-                cmdlist.append(["mkdir", "-p", service_dir])
-                cert_dir = "../provision/Certificates/" + servicename
-                cmdlist.append(["cp", "-rf", cert_dir, eii_cert_dir])
-
-            cmdlist.append(["cp", "-rf", "../provision/Certificates/ca",
-                            eii_cert_dir])
-            ca_key_file = eii_cert_dir + "ca/ca_key.pem"
-            cmdlist.append(["rm", ca_key_file])
+        eii_cert_dir = "provision/Certificates/"
+        archive = BundleArchive(self.bundle_tag_name, self.compression,
+                                self.jobs, USER)
         try:
-            for cmd in cmdlist:
-                subprocess.check_output(cmd)
-            env = open(self.bundle_tag_name + "/.env", "r+")
-            envdata = env.read()
-            newenvdata = envdata.replace("ETCD_NAME=master",
-                                         "ETCD_NAME=worker")
-            env.write(newenvdata)
-            env.close()
-            cmdlist = []
-            tar_file = self.bundle_tag_name + ".tar.gz"
-            cmdlist.append(["chown", "-R", USER, self.bundle_tag_name])
-            cmdlist.append(["tar", "-czvf", tar_file, self.bundle_tag_name])
-            if self.bundle_folder is False:
-                cmdlist.append(["rm", "-rf", self.bundle_tag_name])
-
-            for cmd in cmdlist:
-                subprocess.check_output(cmd)
+            archive.add_bytes(".env", self.get_worker_env("../.env"))
+            archive.add_file("docker-compose.yml", "docker-compose.yml")
+            if self.env["DEV_MODE"] == "false":
+                for service in self.config['services'].keys():
+                    servicename =\
+                        self.config['services'][service]['environment']['AppName']
+                    cert_dir = "../provision/Certificates/" + servicename
+                    archive.add_tree(eii_cert_dir + servicename, cert_dir)
+
+                # The CA key stays on the master node
+                archive.add_tree(eii_cert_dir + "ca",
+                                 "../provision/Certificates/ca",
+                                 exclude=("ca_key.pem",))
+            self.write_bundle(archive)
+            os.remove("docker-compose.yml")
             print("Bundle Generated Succesfully")
         except Exception as err:
             print("Exception Occured ", str(err))
 
     def generate_provision_bundle(self):
         '''
-            generate_eii_provision bundle helps to execute set of pre
-            commands which are required for provision Bundle and finally
+            generate_eii_provision bundle helps to collect the files
+            which are required for provision Bundle and finally
             it generates the bundle
         '''
         provision_tag_name = 'eii_provisioning'
-        eii_provision_dir = "./" + provision_tag_name + "/provision/"
-        cmdlist = []
-        cmdlist.append(["rm", "-rf", provision_tag_name])
-        cmdlist.append(["mkdir", "-p", provision_tag_name])
-        cmdlist.append(["cp", "../.env", provision_tag_name])
-        cmdlist.append(["mkdir", "-p", eii_provision_dir])
-        cmdlist.append(["cp", "-f", "../provision/provision.sh",
-                        eii_provision_dir])
-        cmdlist.append(["chmod", "+x", eii_provision_dir + "provision.sh"])
+        archive = BundleArchive(provision_tag_name, self.compression,
+                                self.jobs)
         try:
-            for cmd in cmdlist:
-                subprocess.check_output(cmd)
-            env = open(provision_tag_name + "/.env", "r+")
-            envdata = env.read()
-            newenvdata = envdata.replace("ETCD_NAME=master",
-                                         "ETCD_NAME=worker")
-            env.write(newenvdata)
-            env.close()
-            cmdlist = []
-            tar_file = provision_tag_name + ".tar.gz"
-            cmdlist.append(["tar", "-czvf", tar_file, provision_tag_name])
-            if self.bundle_folder is False:
-                cmdlist.append(["rm", "-rf", provision_tag_name])
-
-            for cmd in cmdlist:
-                subprocess.check_output(cmd)
+            archive.add_bytes(".env", self.get_worker_env("../.env"))
+            provision_script = "../provision/provision.sh"
+            archive.add_file("provision/provision.sh", provision_script,
+                             os.stat(provision_script).st_mode & 0o7777 |
+                             0o111)
+            self.write_bundle(archive)
             print("Provisioning Bundle Generated Succesfully")
         except Exception as err:
             print("Exception Occured ", str(err))
@@ -195,6 +395,8 @@ class EiiBundleGenerator:
         self.bundle_tag_name = args.bundle_tag_name
         self.docker_file_path = args.compose_file_path
         self.bundle_folder = args.bundle_folder
+        self.compression = args.compression
+        self.jobs = args.jobs
         self.generate_docker_composeyml()
 
         if args.provisioning:
@@ -224,6 +426,18 @@ if __name__ == '__main__':
                         '--provisioning',
                         action='store_true',
                         help='Generates provisioning bundle')
+    parser.add_argument('-c',
+                        '--compression',
+                        choices=['gzip', 'zstd'],
+                        default='gzip',
+                        help='Bundle compression, gzip runs multi-threaded\
+                        when pigz is installed')
+    parser.add_argument('-j',
+                        '--jobs',
+                        type=int,
+                        default=None,
+                        help='Number of compression threads, all the cpus\
+                        by default')
 
     arg = parser.parse_args()
     eiiBundle = EiiBundleGenerator()
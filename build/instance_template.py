@@ -0,0 +1,248 @@
+# Copyright (c) 2020 Intel Corporation.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Templates stamping out the multi instance copies of a service's
+   documents
+"""
+import re
+import copy
+import pickle
+
+DIGITS = re.compile(r'\d+')
+# Stands for the instance number in documents renamed once for all the
+# instances. It is a decimal digit for the digit stripping done on names,
+# but never one found in the services' files.
+INSTANCE_PLACEHOLDER = '\u0660'
+
+
+def index_parts(value):
+    """Splits a name around its digit groups, which get replaced by the
+       instance number. Names without digits get it appended instead
+
+    :param value: name, eg: camera1_stream
+    :type value: str
+    :return: parts to be joined with the instance number
+    :rtype: list
+    """
+    if DIGITS.search(value):
+        return DIGITS.split(value)
+    return [value, '']
+
+
+def _suffix(n, values, allocate, base, count=1):
+    return base + str(n) * count
+
+
+def _index(n, values, allocate, parts):
+    return str(n).join(parts)
+
+
+def _strip(n, values, allocate, prefix, suffix):
+    return prefix + str(n) + suffix
+
+
+def _replace(n, values, allocate, parts, old):
+    return (old + str(n)).join(parts)
+
+
+def _offset(n, values, allocate, parts, port):
+    return str(port + n - 1).join(parts)
+
+
+def _alloc(n, values, allocate, port, pool):
+    return int(allocate(port, pool))
+
+
+def _ref(n, values, allocate, index):
+    return values[index]
+
+
+def _endpoint(n, values, allocate, value, send, recv):
+    if send:
+        port = value.split(":")[-1]
+        value = value.replace(port, allocate(port, "send_ports"))
+    if recv:
+        port = value.split(":")[-1]
+        value = value.replace(port, allocate(port, "recv_ports"))
+        # Update appnames in ENDPOINTS
+        appname = value.split(":")[0]
+        value = value.replace(appname, appname + str(n))
+    return value
+
+
+def _secret(n, values, allocate, value, count):
+    for _ in range(count):
+        app_name = value.split("-")[0]
+        value = value.replace(app_name, app_name + str(n))
+    return value
+
+
+# Typed substitution slots, computing the value of a slot for the
+# instance number n from what was extracted when analysing the document
+SLOT_KINDS = {
+    # <base><n>
+    'suffix': _suffix,
+    # digit groups of the name replaced by <n>, see index_parts()
+    'index': _index,
+    # <prefix><n><suffix>
+    'strip': _strip,
+    # occurrences of old replaced by <old><n>
+    'replace': _replace,
+    # occurrences of port replaced by port + n - 1
+    'offset': _offset,
+    # next port available in a pool, from the allocate callback
+    'alloc': _alloc,
+    # value of a previous slot of the same instance
+    'ref': _ref,
+    # k8s endpoint env, its port allocated & appname updated
+    'endpoint': _endpoint,
+    # k8s secret name, its appname updated count times
+    'secret': _secret,
+}
+
+
+class InstanceTemplate:
+    """A document analysed once into substitution slots, from which the
+       multi instance copies are stamped out
+
+    A slot is the path of a value (or of a mapping key) in the document,
+    the kind of substitution and the arguments extracted when analysing the
+    document. Slots are evaluated in the order they were added, so port
+    allocations happen in the same order for every instance.
+    """
+
+    def __init__(self, document, share=False):
+        """Constructor
+
+        :param document: analysed document
+        :type document: object
+        :param share: if True, parts of the document without slots are
+                      shared by the instances instead of being copied.
+                      Only suitable for documents not modified afterwards
+                      and not dumped as yml, which would emit anchors for
+                      the shared parts
+        :type share: bool
+        """
+        self.document = document
+        self.share = share
+        self.slots = []
+        self._pickled = None
+        if not share:
+            # Unpickling a round trip document is cheaper than deep
+            # copying it and keeps its comments & formatting intact
+            self._pickled = pickle.dumps(document,
+                                         protocol=pickle.HIGHEST_PROTOCOL)
+
+    def add(self, path, kind, *args):
+        """Adds a slot replacing the value at path
+
+        :param path: keys & indexes leading to the value
+        :type path: list
+        :param kind: kind of substitution, key of SLOT_KINDS
+        :type kind: str
+        :return: index of the slot, to be referred by a 'ref' slot
+        :rtype: int
+        """
+        self.slots.append((tuple(path), kind, args, False))
+        return len(self.slots) - 1
+
+    def add_key(self, path, kind, *args):
+        """Adds a slot renaming the mapping key at path, keeping its
+           position in the mapping
+
+        :param path: keys & indexes leading to the key
+        :type path: list
+        :param kind: kind of substitution, key of SLOT_KINDS
+        :type kind: str
+        :return: index of the slot
+        :rtype: int
+        """
+        self.slots.append((tuple(path), kind, args, True))
+        return len(self.slots) - 1
+
+    def add_placeholder_slots(self):
+        """Adds a slot for every key and string value of the document
+           containing INSTANCE_PLACEHOLDER
+        """
+        self._add_placeholder_slots(self.document, ())
+
+    def _add_placeholder_slots(self, node, path):
+        # Keys are renamed after the values below them, whose paths go
+        # through the placeholder keys
+        if isinstance(node, dict):
+            for key, value in node.items():
+                self._add_placeholder_slots(value, path + (key,))
+                if isinstance(key, str) and INSTANCE_PLACEHOLDER in key:
+                    self.add_key(path + (key,), 'index',
+                                 key.split(INSTANCE_PLACEHOLDER))
+        elif isinstance(node, list):
+            for index, value in enumerate(node):
+                self._add_placeholder_slots(value, path + (index,))
+        elif isinstance(node, str) and INSTANCE_PLACEHOLDER in node:
+            self.add(path, 'index', node.split(INSTANCE_PLACEHOLDER))
+
+    def instance(self, n, allocate=None):
+        """Stamps out an instance of the document
+
+        :param n: instance number, starting from 1
+        :type n: int
+        :param allocate: callback allocating a port, called as
+                         allocate(port, pool) & returning the port
+                         allocated as a str, for the 'alloc' & 'endpoint'
+                         slots
+        :type allocate: function
+        :return: instance of the document
+        :rtype: object
+        """
+        if self.share:
+            document = copy.copy(self.document)
+        else:
+            document = pickle.loads(self._pickled)
+        copies = {}
+        values = []
+        for path, kind, args, is_key in self.slots:
+            value = SLOT_KINDS[kind](n, values, allocate, *args)
+            values.append(value)
+            container = self._container(document, path[:-1], copies)
+            if is_key:
+                self._rename(container, path[-1], value)
+            else:
+                container[path[-1]] = value
+        return document
+
+    def _container(self, document, path, copies):
+        node = document
+        for depth, key in enumerate(path):
+            if not self.share:
+                node = node[key]
+                continue
+            # Copying the shared containers leading to the slot
+            prefix = path[:depth + 1]
+            if prefix not in copies:
+                copies[prefix] = copy.copy(node[key])
+                node[key] = copies[prefix]
+            node = copies[prefix]
+        return node
+
+    @staticmethod
+    def _rename(mapping, key, new_key):
+        position = list(mapping).index(key)
+        value = mapping[key]
+        del mapping[key]
+        mapping.insert(position, new_key, value)
@@ -0,0 +1,264 @@
+# Copyright (c) 2020 Intel Corporation.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Port allocator of the multi instance services
+"""
+import glob
+from collections import namedtuple
+
+# Initial size of the bitmaps, which grow past it as the services' configs
+# may use port numbers above 65535
+BITMAP_SIZE = 65536
+# Classes of ports, allocated independently of each other
+POOLS = ('send_ports', 'recv_ports', 'srvc_ports')
+
+# States of a port in the bitmap of a pool
+FREE = 0
+ALLOCATED = 1
+RESERVED = 2
+BOUND = 3
+STATE_NAMES = {ALLOCATED: 'allocated', RESERVED: 'reserved',
+               BOUND: 'bound on the host'}
+
+# LISTEN state of the sockets in /proc/net/tcp & /proc/net/tcp6
+TCP_LISTEN = '0A'
+
+
+class PortConflict(namedtuple('PortConflict',
+                              ['pool', 'port', 'owner', 'holder',
+                               'state', 'allocated'])):
+    """A port requested while already in use
+
+    owner requested port, held by holder in the given state. allocated is
+    the port given instead, None if the port was only claimed.
+    """
+
+    def __str__(self):
+        if self.allocated is None:
+            action = "is used anyway"
+        else:
+            action = "moved to {}".format(self.allocated)
+        return "Port {} of {} is {} ({}), {}".format(
+            self.port, self.owner, STATE_NAMES[self.state], self.holder,
+            action)
+
+
+def parse_port_range(value):
+    """Parses a port or a port range of the builder config
+
+    :param value: port or range, eg: 65000 or "65000-65010"
+    :type value: int or str
+    :return: first, last port of the range
+    :rtype: tuple
+    """
+    first, _, last = str(value).partition('-')
+    first = int(first)
+    last = int(last) if last else first
+    if not 0 < first <= last:
+        raise Exception("Invalid port range {}".format(value))
+    return first, last
+
+
+def host_bound_ports(proc_files=None):
+    """Returns the tcp ports listened to on this host
+
+    :param proc_files: /proc/net tables to read, all the tcp ones by default
+    :type proc_files: list
+    :return: ports in LISTEN state
+    :rtype: set
+    """
+    if proc_files is None:
+        proc_files = glob.glob('/proc/net/tcp*')
+    ports = set()
+    for proc_file in proc_files:
+        with open(proc_file, 'r') as infile:
+            # Skipping the header, columns are: sl local_address
+            # rem_address st ...
+            next(infile, None)
+            for line in infile:
+                fields = line.split()
+                if len(fields) > 3 and fields[3] == TCP_LISTEN:
+                    ports.add(int(fields[1].rsplit(':', 1)[1], 16))
+    return ports
+
+
+class PortAllocator:
+    """Allocates the ports of the multi instance services
+
+    Every pool has a bitmap of the ports, so checking a port is a
+    lookup and finding the next free one is a single scan done in C by
+    bytearray.find(). Allocations from the same requested port resume from
+    where the previous one stopped, so allocating n instances of a port
+    costs O(n) instead of O(n^2).
+    """
+
+    def __init__(self, pools=POOLS):
+        """Constructor
+
+        :param pools: names of the pools of ports
+        :type pools: tuple
+        """
+        self.pools = {pool: bytearray(BITMAP_SIZE) for pool in pools}
+        self.allocated = {pool: set() for pool in pools}
+        # Who reserved, claimed or bound a port, for reporting conflicts
+        self.holders = {pool: {} for pool in pools}
+        # First port left to check for a requested port, per pool
+        self.hints = {pool: {} for pool in pools}
+        self.conflicts = []
+
+    def reserve(self, first, last, holder, state=RESERVED):
+        """Reserves a range of ports in all the pools, so they are never
+           allocated
+
+        :param first: first port of the range
+        :type first: int
+        :param last: last port of the range, included
+        :type last: int
+        :param holder: reason of the reservation, used in conflicts
+        :type holder: str
+        :param state: RESERVED or BOUND
+        :type state: int
+        """
+        for pool, ports in self.pools.items():
+            self._grow(pool, last)
+            ports[first:last + 1] = bytes([state]) * (last - first + 1)
+            self.allocated[pool].difference_update(range(first, last + 1))
+            self.hints[pool].clear()
+            if last - first < 64:
+                for port in range(first, last + 1):
+                    self.holders[pool][port] = holder
+            else:
+                self.holders[pool][(first, last)] = holder
+
+    def allocate(self, port, pool, owner=None):
+        """Allocates the first free port of a pool from the requested one
+
+        :param port: requested port
+        :type port: str or int
+        :param pool: name of the pool
+        :type pool: str
+        :param owner: service requesting the port, reported if a reserved
+                      or bound port had to be skipped
+        :type owner: str
+        :return: allocated port
+        :rtype: str
+        """
+        requested = int(port)
+        ports = self.pools[pool]
+        start = self.hints[pool].get(requested, requested)
+        self._grow(pool, start)
+        free = ports.find(FREE, start)
+        if free == -1:
+            free = len(ports)
+            self._grow(pool, free)
+        # Ports skipped only because they were reserved or bound are
+        # reported, the instances of a service skipping each other is
+        # what allocating them is for
+        for state in (RESERVED, BOUND):
+            skipped = ports.find(state, requested, free)
+            if skipped != -1:
+                self.conflicts.append(PortConflict(
+                    pool, skipped, owner or pool, self._holder(pool, skipped),
+                    state, free))
+                break
+        ports[free] = ALLOCATED
+        self.allocated[pool].add(free)
+        if owner is not None:
+            self.holders[pool][free] = owner
+        self.hints[pool][requested] = free + 1
+        return str(free)
+
+    def claim(self, port, pool, owner):
+        """Marks a port fixed by a service as used, reporting a conflict if
+           it is already in use. Unlike allocate() the port is kept as is
+
+        :param port: port used by the service
+        :type port: str or int
+        :param pool: name of the pool
+        :type pool: str
+        :param owner: service using the port
+        :type owner: str
+        :return: True if the port was free
+        :rtype: bool
+        """
+        port = int(port)
+        self._grow(pool, port)
+        state = self.pools[pool][port]
+        if state != FREE:
+            self.conflicts.append(PortConflict(
+                pool, port, owner, self._holder(pool, port), state, None))
+            return False
+        self.pools[pool][port] = ALLOCATED
+        self.allocated[pool].add(port)
+        self.holders[pool][port] = owner
+        return True
+
+    def release(self, ports, pool):
+        """Frees allocated ports of a pool
+
+        :param ports: ports to free
+        :type ports: list
+        :param pool: name of the pool
+        :type pool: str
+        """
+        for port in map(int, ports):
+            if port < len(self.pools[pool]) and \
+               self.pools[pool][port] == ALLOCATED:
+                self.pools[pool][port] = FREE
+                self.allocated[pool].discard(port)
+                self.holders[pool].pop(port, None)
+        self.hints[pool].clear()
+
+    def state(self):
+        """Returns the allocated ports of every pool, as json friendly
+           sorted lists
+
+        :return: allocated ports per pool
+        :rtype: dict
+        """
+        return {pool: sorted(ports) for pool, ports in self.allocated.items()}
+
+    def restore(self, state):
+        """Replaces the allocated ports by the ones of a previous state()
+
+        :param state: allocated ports per pool
+        :type state: dict
+        """
+        for pool, ports in self.pools.items():
+            for port in self.allocated[pool]:
+                ports[port] = FREE
+            self.allocated[pool] = set(state[pool])
+            for port in self.allocated[pool]:
+                self._grow(pool, port)
+                ports[port] = ALLOCATED
+            self.hints[pool].clear()
+
+    def _grow(self, pool, port):
+        ports = self.pools[pool]
+        if port >= len(ports):
+            ports.extend(bytes(max(port + 1 - len(ports), BITMAP_SIZE)))
+
+    def _holder(self, pool, port):
+        holders = self.holders[pool]
+        if port in holders:
+            return holders[port]
+        for key, holder in holders.items():
+            if isinstance(key, tuple) and key[0] <= port <= key[1]:
+                return holder
+        return pool
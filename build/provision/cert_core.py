@@ -90,17 +90,17 @@ def copy_root_ca_certificate_and_key_pair(target="ca"):
 def copy_leaf_cert_and_key_pair(source, target, outform=None):
     create_target_folder(target)
     if outform:
-        paths.copy_tuple_path((source, "cert.der"),
+        paths.copy_tuple_path((source, target, "cert.der"),
                               (paths.result_dir_name+"/"+target,
                                "{}_certificate.der".format(target+"_"+source)))
-        paths.copy_tuple_path((source, "key.der"),
+        paths.copy_tuple_path((source, target, "key.der"),
                               (paths.result_dir_name+"/"+target,
                                "{}_key.der".format(target+"_"+source)))
     else:
-        paths.copy_tuple_path((source, "cert.pem"),
+        paths.copy_tuple_path((source, target, "cert.pem"),
                               (paths.result_dir_name+"/"+target,
                                "{}_certificate.pem".format(target+"_"+source)))
-        paths.copy_tuple_path((source, "key.pem"),
+        paths.copy_tuple_path((source, target, "key.pem"),
                               (paths.result_dir_name+"/"+target,
                                "{}_key.pem".format(target+"_"+source)))
 
@@ -109,7 +109,10 @@ def openssl_req(opts, *args, **kwargs):
     cnf_path = get_openssl_cnf_path(opts)
     print("=>\t[openssl_req]")
     xs = ["openssl", "req", "-config", cnf_path] + list(args)
-    run(xs, **kwargs)
+    try:
+        run(xs, **kwargs)
+    finally:
+        os.remove(cnf_path)
 
 
 def openssl_x509(*args, **kwargs):
@@ -140,7 +143,22 @@ def openssl_ca(opts, *args, **kwargs):
     cnf_path = get_openssl_cnf_path(opts)
     print("=>\t[openssl_ca]")
     xs = ["openssl", "ca", "-config", cnf_path] + list(args)
-    run(xs, **kwargs)
+    try:
+        run(xs, **kwargs)
+    finally:
+        os.remove(cnf_path)
+
+
+def san_env(san):
+    """Environment of the openssl commands, with the subjectAltName of the
+       leaf certificate in SAN instead of changing the process' environment,
+       so certificates can be generated concurrently
+    """
+    if san is None:
+        return None
+    env = dict(os.environ)
+    env["SAN"] = san
+    return env
 
 
 def prepare_ca_directory(dir_name):
@@ -177,33 +195,41 @@ def generate_root_ca(opts):
                  "-outform", "DER")
 
 
-def generate_server_certificate_and_key_pair(key, opts):
+def generate_server_certificate_and_key_pair(key, opts, san=None):
     try:
-        generate_cert_and_key_pair(key, "server", opts)
+        generate_cert_and_key_pair(key, "server", opts, san)
     except Exception as err:
         raise err
 
 
-def generate_client_cert_and_key_pair(key, opts):
+def generate_client_cert_and_key_pair(key, opts, san=None):
     try:
-        generate_cert_and_key_pair(key, "client", opts)
+        generate_cert_and_key_pair(key, "client", opts, san)
     except Exception as err:
         raise err
 
 
-def generate_cert_and_key_pair(key, peer, opts,
+def generate_cert_and_key_pair(key, peer, opts, san=None,
                                pa_cert_path=paths.root_ca_cert_path(),
                                pa_key_path=paths.root_ca_key_path(),
                                pa_certs_path=paths.root_ca_certs_path()):
+    generate_key_and_request(key, peer, opts, san)
+    sign_request(key, peer, opts, san, pa_cert_path, pa_key_path,
+                 pa_certs_path)
+    convert_cert_and_key_pair(key, peer, opts)
 
-    os.makedirs(paths.relative_path(peer), exist_ok=True)
+
+def generate_key_and_request(key, peer, opts, san=None):
+    """Generates the key & certificate request of a leaf certificate in its
+       own directory, safe to run concurrently for different certificates
+    """
+    os.makedirs(paths.leaf_pair_path(peer, key), exist_ok=True)
     if 'output_format' in opts:
-        privkey_path = paths.leaf_key_path_der(peer)
+        privkey_path = paths.leaf_key_path_der(peer, key)
     else:
-        privkey_path = paths.leaf_key_path(peer)
+        privkey_path = paths.leaf_key_path(peer, key)
 
-    cert_path = paths.leaf_certificate_path(peer)
-    req_pem_path = paths.relative_path(peer, "req.pem")
+    req_pem_path = paths.relative_path(peer, key, "req.pem")
     opts["common_name"] = key
 
     openssl_req(opts,
@@ -215,7 +241,22 @@ def generate_cert_and_key_pair(key, peer, opts,
                 "-outform", "PEM",
                 "-subj", "/CN={}/O={}/L=$$$/".format(opts["common_name"],
                                                      peer),
-                "-nodes")
+                "-nodes",
+                env=san_env(san))
+
+
+def sign_request(key, peer, opts, san=None,
+                 pa_cert_path=paths.root_ca_cert_path(),
+                 pa_key_path=paths.root_ca_key_path(),
+                 pa_certs_path=paths.root_ca_certs_path()):
+    """Signs the certificate request of a leaf certificate with the CA.
+       It updates the index & serial of the CA, so requests must be signed
+       one at a time, in the same order for the same serials
+    """
+    cert_path = paths.leaf_certificate_path(peer, key)
+    req_pem_path = paths.relative_path(peer, key, "req.pem")
+    opts["common_name"] = key
+
     openssl_ca(opts,
                "-days",    str(3650),
                "-cert",    pa_cert_path,
@@ -225,13 +266,19 @@ def generate_cert_and_key_pair(key, peer, opts,
                "-outdir",  pa_certs_path,
                "-notext",
                "-batch",
-               "-extensions", "{}_extensions".format(peer))
+               "-extensions", "{}_extensions".format(peer),
+               env=san_env(san))
+
+
+def convert_cert_and_key_pair(key, peer, opts):
+    """Converts a signed leaf certificate & its key to DER if required
+    """
     if 'output_format' in opts:
         print("Generating the DER file......")
-        openssl_x509("-in",      cert_path,
-                     "-out",     paths.leaf_certificate_der_path(peer),
+        openssl_x509("-in",      paths.leaf_certificate_path(peer, key),
+                     "-out",     paths.leaf_certificate_der_path(peer, key),
                      "-outform", "DER")
-        openssl_rsa("-in",  privkey_path,
-                    "-out", paths.leaf_key_der_path(peer),
+        openssl_rsa("-in",  paths.leaf_key_path_der(peer, key),
+                    "-out", paths.leaf_key_der_path(peer, key),
                     "-inform", "PEM",
                     "-outform", "DER")
@@ -0,0 +1,241 @@
+"""
+Copyright (c) 2020 Intel Corporation.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# In-process alternative to the openssl commands of cert_core, generating
+# the same files (keys, requests, certificates, CA index & serial) with the
+# cryptography library.
+
+import os
+import datetime
+import ipaddress
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID, ExtendedKeyUsageOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, ec
+import paths
+import cert_core
+
+# rsa or ecdsa, set by gen_certs
+key_type = "rsa"
+VALIDITY_DAYS = 3650
+# Default SAN of config/openssl.cnf
+DEFAULT_SAN = "IP:127.0.0.1,DNS:localhost,URI:urn:unconfigured:application"
+EXTENDED_KEY_USAGES = {
+    "client": [ExtendedKeyUsageOID.CLIENT_AUTH],
+    "server": [ExtendedKeyUsageOID.CLIENT_AUTH,
+               ExtendedKeyUsageOID.SERVER_AUTH],
+}
+
+
+def generate_private_key():
+    if key_type == "ecdsa":
+        return ec.generate_private_key(ec.SECP256R1())
+    return rsa.generate_private_key(public_exponent=65537,
+                                    key_size=int(os.getenv('SSL_KEY_LENGTH')))
+
+
+def write_file(path, data):
+    with open(path, 'wb') as outfile:
+        outfile.write(data)
+
+
+def write_private_key(path, private_key):
+    # Unencrypted PKCS#8, as written by openssl req -nodes
+    write_file(path, private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()))
+
+
+def load_private_key(path):
+    with open(path, 'rb') as infile:
+        return serialization.load_pem_private_key(infile.read(), None)
+
+
+def load_certificate(path):
+    with open(path, 'rb') as infile:
+        return x509.load_pem_x509_certificate(infile.read())
+
+
+def parse_san(san):
+    """Parses an openssl subjectAltName value, eg: IP:127.0.0.1,DNS:etcd
+    """
+    names = []
+    for entry in san.split(","):
+        kind, _, value = entry.strip().partition(":")
+        if kind == "IP":
+            names.append(x509.IPAddress(ipaddress.ip_address(value)))
+        elif kind == "DNS":
+            names.append(x509.DNSName(value))
+        elif kind == "URI":
+            names.append(x509.UniformResourceIdentifier(value))
+        else:
+            raise ValueError("Unsupported subjectAltName {}".format(entry))
+    return names
+
+
+def key_usage(public_key, ca=False):
+    return x509.KeyUsage(
+        digital_signature=not ca,
+        # Keys of RSA certificates may encipher TLS pre-master secrets,
+        # EC ones only sign
+        key_encipherment=not ca and isinstance(public_key,
+                                               rsa.RSAPublicKey),
+        content_commitment=False, data_encipherment=False,
+        key_agreement=False, key_cert_sign=ca, crl_sign=ca,
+        encipher_only=False, decipher_only=False)
+
+
+def openssl_serial(serial):
+    # Even length upper case hex, as in the CA index & serial of openssl
+    serial_hex = "{:X}".format(serial)
+    if len(serial_hex) % 2:
+        serial_hex = "0" + serial_hex
+    return serial_hex
+
+
+def generate_root_ca(opts):
+    cert_core.prepare_ca_directory(paths.root_ca_path())
+    private_key = generate_private_key()
+    name = x509.Name([
+        x509.NameAttribute(NameOID.COMMON_NAME,
+                           "EIICertToolSelfSignedtRootCA"),
+        x509.NameAttribute(NameOID.LOCALITY_NAME, "$$$$")])
+    now = datetime.datetime.utcnow()
+    certificate = x509.CertificateBuilder() \
+        .subject_name(name) \
+        .issuer_name(name) \
+        .public_key(private_key.public_key()) \
+        .serial_number(x509.random_serial_number()) \
+        .not_valid_before(now) \
+        .not_valid_after(now + datetime.timedelta(days=VALIDITY_DAYS)) \
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None),
+                       critical=False) \
+        .add_extension(key_usage(private_key.public_key(), ca=True),
+                       critical=False) \
+        .add_extension(x509.SubjectKeyIdentifier.from_public_key(
+                       private_key.public_key()), critical=False) \
+        .sign(private_key, hashes.SHA256())
+    write_private_key(paths.root_ca_key_path(), private_key)
+    write_file(paths.root_ca_cert_path(),
+               certificate.public_bytes(serialization.Encoding.PEM))
+    write_file(paths.root_ca_certificate_cer_path(),
+               certificate.public_bytes(serialization.Encoding.DER))
+
+
+def generate_key_and_request(key, peer, opts, san=None):
+    """Generates the key & certificate request of a leaf certificate in its
+       own directory, safe to run concurrently for different certificates
+    """
+    os.makedirs(paths.leaf_pair_path(peer, key), exist_ok=True)
+    if 'output_format' in opts:
+        privkey_path = paths.leaf_key_path_der(peer, key)
+    else:
+        privkey_path = paths.leaf_key_path(peer, key)
+
+    private_key = generate_private_key()
+    request = x509.CertificateSigningRequestBuilder() \
+        .subject_name(x509.Name([
+            x509.NameAttribute(NameOID.COMMON_NAME, key),
+            x509.NameAttribute(NameOID.ORGANIZATION_NAME, peer),
+            x509.NameAttribute(NameOID.LOCALITY_NAME, "$$$")])) \
+        .sign(private_key, hashes.SHA256())
+    write_private_key(privkey_path, private_key)
+    write_file(paths.relative_path(peer, key, "req.pem"),
+               request.public_bytes(serialization.Encoding.PEM))
+
+
+def sign_request(key, peer, opts, san=None, pa_cert_path=None,
+                 pa_key_path=None, pa_certs_path=None):
+    """Signs the certificate request of a leaf certificate with the CA,
+       updating its index & serial like openssl ca. Requests must be signed
+       one at a time, in the same order for the same serials
+    """
+    pa_cert_path = pa_cert_path or paths.root_ca_cert_path()
+    pa_key_path = pa_key_path or paths.root_ca_key_path()
+    pa_certs_path = pa_certs_path or paths.root_ca_certs_path()
+    ca_dir = os.path.dirname(pa_cert_path)
+    with open(paths.relative_path(peer, key, "req.pem"), 'rb') as infile:
+        request = x509.load_pem_x509_csr(infile.read())
+    ca_certificate = load_certificate(pa_cert_path)
+    ca_key = load_private_key(pa_key_path)
+
+    serial_path = os.path.join(ca_dir, "serial")
+    with open(serial_path, 'r') as infile:
+        serial = int(infile.read().strip(), 16)
+
+    # Subject as issued by openssl ca with root_ca_policy, which drops the
+    # locality of the request
+    subject = x509.Name([
+        x509.NameAttribute(NameOID.COMMON_NAME, key),
+        x509.NameAttribute(NameOID.ORGANIZATION_NAME, peer)])
+    public_key = request.public_key()
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    not_after = now + datetime.timedelta(days=VALIDITY_DAYS)
+    certificate = x509.CertificateBuilder() \
+        .subject_name(subject) \
+        .issuer_name(ca_certificate.subject) \
+        .public_key(public_key) \
+        .serial_number(serial) \
+        .not_valid_before(now) \
+        .not_valid_after(not_after) \
+        .add_extension(x509.BasicConstraints(ca=False, path_length=None),
+                       critical=False) \
+        .add_extension(x509.ExtendedKeyUsage(EXTENDED_KEY_USAGES[peer]),
+                       critical=False) \
+        .add_extension(key_usage(public_key), critical=False) \
+        .add_extension(x509.SubjectAlternativeName(
+                       parse_san(san or DEFAULT_SAN)),
+                       critical=False) \
+        .add_extension(x509.SubjectKeyIdentifier.from_public_key(public_key),
+                       critical=False) \
+        .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(
+                       ca_key.public_key()), critical=False) \
+        .sign(ca_key, hashes.SHA256())
+
+    cert_pem = certificate.public_bytes(serialization.Encoding.PEM)
+    write_file(paths.leaf_certificate_path(peer, key), cert_pem)
+    serial_hex = openssl_serial(serial)
+    write_file(os.path.join(pa_certs_path, serial_hex + ".pem"), cert_pem)
+    with open(os.path.join(ca_dir, "index.txt"), 'a') as index:
+        index.write("V\t{}\t\t{}\tunknown\t/CN={}/O={}\n".format(
+                    not_after.strftime("%y%m%d%H%M%SZ"), serial_hex, key,
+                    peer))
+    with open(serial_path, 'w') as outfile:
+        outfile.write(openssl_serial(serial + 1) + "\n")
+
+
+def convert_cert_and_key_pair(key, peer, opts):
+    """Converts a signed leaf certificate & its key to DER if required
+    """
+    if 'output_format' in opts:
+        print("Generating the DER file......")
+        certificate = load_certificate(paths.leaf_certificate_path(peer, key))
+        write_file(paths.leaf_certificate_der_path(peer, key),
+                   certificate.public_bytes(serialization.Encoding.DER))
+        private_key = load_private_key(paths.leaf_key_path_der(peer, key))
+        # Traditional format, as written by openssl rsa -outform DER
+        write_file(paths.leaf_key_der_path(peer, key),
+                   private_key.private_bytes(
+                       serialization.Encoding.DER,
+                       serialization.PrivateFormat.TraditionalOpenSSL,
+                       serialization.NoEncryption()))
@@ -0,0 +1,208 @@
+"""
+Copyright (c) 2020 Intel Corporation.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Inspection of the certificates of a previous gen_certs run, for the
+# incremental mode, and manifest of the generated certificates.
+
+import os
+import json
+import hashlib
+import datetime
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, padding
+import paths
+import cert_crypto
+
+MANIFEST_FILE = "manifest.json"
+
+
+def leaf_file_paths(component, peer, outform=None):
+    """Returns the certificate & key paths of a leaf in the results folder
+    """
+    ext = "der" if outform else "pem"
+    name = component + "_" + peer
+    return (paths.relative_path(paths.result_dir_name, component,
+                                "{}_certificate.{}".format(name, ext)),
+            paths.relative_path(paths.result_dir_name, component,
+                                "{}_key.{}".format(name, ext)))
+
+
+def load_certificate(path):
+    with open(path, 'rb') as infile:
+        data = infile.read()
+    if path.endswith(".der"):
+        return x509.load_der_x509_certificate(data)
+    return x509.load_pem_x509_certificate(data)
+
+
+def load_private_key(path):
+    with open(path, 'rb') as infile:
+        data = infile.read()
+    if path.endswith(".der"):
+        load = serialization.load_der_private_key
+    else:
+        load = serialization.load_pem_private_key
+    try:
+        # Only the public key is compared with the certificate's, the
+        # costly consistency check of rsa keys isn't needed. The option
+        # is missing from cryptography < 39
+        return load(data, None, unsafe_skip_rsa_key_validation=True)
+    except TypeError:
+        return load(data, None)
+
+
+def load_root_ca():
+    """Returns the root CA certificate the leaves are signed with
+    """
+    return load_certificate(paths.root_ca_cert_path())
+
+
+def fingerprint(certificate):
+    return hashlib.sha256(certificate.public_bytes(
+        serialization.Encoding.DER)).hexdigest()
+
+
+def is_signed_by(certificate, ca_certificate):
+    if certificate.issuer != ca_certificate.subject:
+        return False
+    public_key = ca_certificate.public_key()
+    try:
+        if isinstance(public_key, rsa.RSAPublicKey):
+            public_key.verify(certificate.signature,
+                              certificate.tbs_certificate_bytes,
+                              padding.PKCS1v15(),
+                              certificate.signature_hash_algorithm)
+        else:
+            public_key.verify(certificate.signature,
+                              certificate.tbs_certificate_bytes,
+                              ec.ECDSA(certificate.signature_hash_algorithm))
+    except InvalidSignature:
+        return False
+    return True
+
+
+def get_san(certificate):
+    try:
+        return list(certificate.extensions.get_extension_for_class(
+            x509.SubjectAlternativeName).value)
+    except x509.ExtensionNotFound:
+        return []
+
+
+def public_key_bytes(key):
+    return key.public_bytes(serialization.Encoding.DER,
+                            serialization.PublicFormat.SubjectPublicKeyInfo)
+
+
+def check_leaf(component, peer, cert_opts, san, ca_certificate, key_type,
+               renew_days):
+    """Checks if the certificate of a previous run can be kept
+
+    :param component: certificate name
+    :type component: str
+    :param peer: server or client
+    :type peer: str
+    :param cert_opts: options of the certificate
+    :type cert_opts: dict
+    :param san: expected subjectAltName, eg: IP:127.0.0.1,DNS:etcd
+    :type san: str
+    :param ca_certificate: current root CA certificate
+    :type ca_certificate: Certificate
+    :param key_type: rsa or ecdsa
+    :type key_type: str
+    :param renew_days: certificates expiring within these days are renewed
+    :type renew_days: int
+    :return: reason to regenerate the certificate, None to keep it
+    :rtype: str
+    """
+    cert_path, key_path = leaf_file_paths(component, peer,
+                                          cert_opts.get('output_format'))
+    if not os.path.isfile(cert_path) or not os.path.isfile(key_path):
+        return "missing"
+    try:
+        certificate = load_certificate(cert_path)
+        private_key = load_private_key(key_path)
+    except (ValueError, TypeError) as err:
+        return "unreadable ({})".format(err)
+    if not is_signed_by(certificate, ca_certificate):
+        return "not signed by the current root CA"
+    renew_after = datetime.datetime.utcnow() + \
+        datetime.timedelta(days=renew_days)
+    if certificate.not_valid_after <= renew_after:
+        return "expiring on {}".format(certificate.not_valid_after)
+    common_names = certificate.subject.get_attributes_for_oid(
+        NameOID.COMMON_NAME)
+    if [name.value for name in common_names] != [component]:
+        return "subject mismatch"
+    if get_san(certificate) != cert_crypto.parse_san(san):
+        return "SAN mismatch"
+    if public_key_bytes(private_key.public_key()) != \
+       public_key_bytes(certificate.public_key()):
+        return "key mismatch"
+    if key_type == "ecdsa":
+        if not isinstance(private_key, ec.EllipticCurvePrivateKey):
+            return "key type changed"
+    elif not isinstance(private_key, rsa.RSAPrivateKey) or \
+            private_key.key_size != int(os.getenv('SSL_KEY_LENGTH')):
+        return "key type or length changed"
+    return None
+
+
+def manifest_entry(certificate, cert_path):
+    return {
+        "certificate": os.path.relpath(cert_path, paths.result_path()),
+        "fingerprint_sha256": fingerprint(certificate),
+        "serial": "{:X}".format(certificate.serial_number),
+        "not_before": certificate.not_valid_before.isoformat() + "Z",
+        "not_after": certificate.not_valid_after.isoformat() + "Z",
+        "san": [str(name.value) for name in get_san(certificate)],
+    }
+
+
+def write_manifest(leaf_certs):
+    """Writes the fingerprints & validity of the root CA & leaf
+       certificates in the results folder
+
+    :param leaf_certs: (component, peer, cert_opts, san) tuples
+    :type leaf_certs: list
+    :return: path of the manifest
+    :rtype: str
+    """
+    ca_certificate = load_root_ca()
+    manifest = {
+        "ca": manifest_entry(ca_certificate, paths.relative_path(
+            paths.result_dir_name, "ca", "ca_certificate.pem")),
+        "certs": {}
+    }
+    for component, peer, cert_opts, _ in leaf_certs:
+        cert_path, _ = leaf_file_paths(component, peer,
+                                       cert_opts.get('output_format'))
+        manifest["certs"][component + "_" + peer] = manifest_entry(
+            load_certificate(cert_path), cert_path)
+    manifest_path = os.path.join(paths.result_path(), MANIFEST_FILE)
+    with open(manifest_path, 'w') as outfile:
+        json.dump(manifest, outfile, indent=4, sort_keys=True)
+    return manifest_path
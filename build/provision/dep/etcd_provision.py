@@ -26,12 +26,148 @@ import subprocess
 import json
 import string
 import random
+import ssl
+import http.client
 import yaml
 import zmq
 import base64
 import zmq.auth
 from distutils.util import strtobool
 ETCD_PREFIX = os.environ['ETCD_PREFIX']
+# etcd rejects transactions having more than --max-txn-ops (128 by default)
+# operations or requests bigger than --max-request-bytes (1.5 MiB by default)
+TXN_MAX_OPS = 128
+TXN_MAX_BYTES = 1024 * 1024
+
+
+class EtcdGatewayError(Exception):
+    """Raised when the etcd json gateway fails a request
+    """
+    pass
+
+
+def _b64(data):
+    return base64.b64encode(data).decode()
+
+
+def prefix_range_end(prefix):
+    """Returns the end of the range of keys starting with prefix
+
+    :param prefix: key prefix
+    :type prefix: bytes
+    :return: range end, first key after the prefixed ones
+    :rtype: bytes
+    """
+    end = bytearray(prefix)
+    while end:
+        if end[-1] < 0xff:
+            end[-1] += 1
+            return bytes(end)
+        end.pop()
+    # All the keys
+    return b'\0'
+
+
+class EtcdGatewayClient:
+    """Client of the etcd v3 json gateway, writing keys in batched
+       transactions over a single (TLS) connection instead of running
+       etcdctl for every key
+    """
+
+    def __init__(self, endpoint, ca_cert=None, cert=None, key=None,
+                 timeout=30):
+        """Constructor
+
+        :param endpoint: etcd endpoint, host:port
+        :type endpoint: str
+        :param ca_cert: ca certificate file, None for plain http
+        :type ca_cert: str
+        :param cert: client certificate file
+        :type cert: str
+        :param key: client key file
+        :type key: str
+        :param timeout: socket timeout in seconds
+        :type timeout: int
+        """
+        host, port = endpoint.split("://")[-1].rsplit(":", 1)
+        if ca_cert:
+            context = ssl.create_default_context(cafile=ca_cert)
+            if cert:
+                context.load_cert_chain(cert, key)
+            self.conn = http.client.HTTPSConnection(host, int(port),
+                                                    timeout=timeout,
+                                                    context=context)
+        else:
+            self.conn = http.client.HTTPConnection(host, int(port),
+                                                   timeout=timeout)
+
+    @classmethod
+    def from_env(cls):
+        """Creates a client with the endpoint & certificates used by
+           etcdctl
+        """
+        return cls(os.environ['ETCDCTL_ENDPOINTS'],
+                   os.environ.get('ETCDCTL_CACERT'),
+                   os.environ.get('ETCDCTL_CERT'),
+                   os.environ.get('ETCDCTL_KEY'))
+
+    def close(self):
+        self.conn.close()
+
+    def _post(self, path, body):
+        self.conn.request("POST", path, json.dumps(body),
+                          {"Content-Type": "application/json"})
+        response = self.conn.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise EtcdGatewayError("{} failed with status {}: {}".format(
+                                   path, response.status, data[:200]))
+        return json.loads(data)
+
+    def put_all(self, pairs):
+        """Puts keys in as few transactions as the etcd limits allow
+
+        :param pairs: key, value bytes pairs
+        :type pairs: list
+        :return: number of transactions
+        :rtype: int
+        """
+        txns = 0
+        batch, batch_bytes = [], 0
+        for key, value in pairs:
+            size = len(key) + len(value)
+            if batch and (len(batch) == TXN_MAX_OPS or
+                          batch_bytes + size > TXN_MAX_BYTES):
+                self._txn_put(batch)
+                txns += 1
+                batch, batch_bytes = [], 0
+            batch.append({"requestPut": {"key": _b64(key),
+                                         "value": _b64(value)}})
+            batch_bytes += size
+        if batch:
+            self._txn_put(batch)
+            txns += 1
+        return txns
+
+    def _txn_put(self, operations):
+        response = self._post("/v3/kv/txn", {"success": operations})
+        if not response.get("succeeded", False):
+            raise EtcdGatewayError("Transaction of {} keys failed".format(
+                                   len(operations)))
+
+    def get_prefix(self, prefix):
+        """Reads all the keys starting with prefix in one range request
+
+        :param prefix: key prefix
+        :type prefix: bytes
+        :return: key, value bytes dict
+        :rtype: dict
+        """
+        response = self._post("/v3/kv/range",
+                              {"key": _b64(prefix),
+                               "range_end": _b64(prefix_range_end(prefix))})
+        return {base64.b64decode(kv["key"]): base64.b64decode(kv.get(
+                "value", "")) for kv in response.get("kvs", [])}
 
 
 def _execute_cmd(cmd):
@@ -75,10 +211,12 @@ def get_appname(file):
     return dictApps
 
 
-def put_zmqkeys(appname):
-    """Generate public/private key for given app and put it in etcd
+def get_zmqkeys(appname):
+    """Generate public/private key for given app
     :param appname: App Name
     :type file: String
+    :return: etcd key, value pairs of the public & private keys
+    :rtype: list
     """
     secret_key = ''
     public_key = ''
@@ -90,18 +228,8 @@ def put_zmqkeys(appname):
         public_key, secret_key = zmq.curve_keypair()
         str_public_key = public_key.decode()
         str_secret_key = secret_key.decode()
-    returncode = _execute_cmd(["./etcdctl", "put",
-                              ETCD_PREFIX + "/Publickeys/" + appname,
-                              public_key])
-    if returncode != 0:
-        print("Error putting Etcd public key for" + appname)
-        sys.exit(-1)
-    returncode = _execute_cmd(["./etcdctl", "put",
-                              ETCD_PREFIX + "/" + appname +
-                              "/private_key", secret_key])
-    if returncode != 0:
-        print("Error putting Etcd private key for" + appname)
-        sys.exit(-1)
+    return [(ETCD_PREFIX + "/Publickeys/" + appname, public_key),
+            (ETCD_PREFIX + "/" + appname + "/private_key", secret_key)]
 
 
 def enable_etcd_auth():
@@ -114,35 +242,28 @@ def enable_etcd_auth():
         sys.exit(-1)
 
 
-def load_data_etcd(file, apps):
-    """Parse given json file and add keys to etcd
+def get_etcd_data(file, apps):
+    """Parse given json file and return the keys to add to etcd
     :param file: Full path of json file having etcd initial data
     :type file: String
     :param apps: dict for AppName:CertType
     :type apps: dict
+    :return: etcd key, value pairs
+    :rtype: list
     """
     with open(file, 'r') as f:
         config = json.load(f)
-    print("=======Adding key/values to etcd========")
+    pairs = []
     for key, value in config.items():
         if key.split("/")[1] not in apps.keys() and key != '/GlobalEnv/':
             continue
         key = ETCD_PREFIX + key
         if isinstance(value, str):
-            returncode = _execute_cmd(["./etcdctl", "put", key,
-                                      bytes(value.encode())])
-            if returncode != 0:
-                print("Adding {} key failed".format(key))
-                sys.exit(-1)
+            pairs.append((key, bytes(value.encode())))
         elif isinstance(value, dict) and key == '/GlobalEnv/':
             # Adding DEV_MODE from env
             value['DEV_MODE'] = os.environ['DEV_MODE']
-            returncode = _execute_cmd(["./etcdctl", "put", key,
-                                      bytes(json.dumps(value,
-                                       indent=4).encode())])
-            if returncode != 0:
-                print("Adding {} key failed".format(key))
-                sys.exit(-1)
+            pairs.append((key, bytes(json.dumps(value, indent=4).encode())))
         elif isinstance(value, dict):
             # Adding ca cert, server key and cert in app config in PROD mode
             if not devMode:
@@ -153,20 +274,57 @@ def load_data_etcd(file, apps):
                         server_cert_server_key = \
                             get_server_cert_key(app_type[1], apps[app_type[1]])
                         value.update(server_cert_server_key)
-            returncode = _execute_cmd(["./etcdctl", "put", key,
-                                      bytes(json.dumps(value,
-                                       indent=4).encode())])
-            if returncode != 0:
-                print("Adding {} key failed".format(key))
-                sys.exit(-1)
+            pairs.append((key, bytes(json.dumps(value, indent=4).encode())))
+    return pairs
+
+
+def load_data_etcd(pairs):
+    """Add keys to etcd in batched transactions over the etcd json
+       gateway, verified with a single range read. Falls back to etcdctl
+       if the gateway can't be reached
+    :param pairs: etcd key, value pairs
+    :type pairs: list
+    """
+    print("=======Adding key/values to etcd========")
+    client = None
+    try:
+        client = EtcdGatewayClient.from_env()
+        txns = client.put_all([(key.encode(), value)
+                               for key, value in pairs])
+        for key, _ in pairs:
+            print("Added {} key successfully".format(key))
+        print("Added {} keys in {} transactions".format(len(pairs), txns))
+        print("=======Reading key/values from etcd========")
+        stored = client.get_prefix((ETCD_PREFIX + "/").encode())
+    except (OSError, ValueError, http.client.HTTPException,
+            EtcdGatewayError) as ex:
+        print("etcd json gateway failed ({}), using etcdctl".format(ex))
+        load_data_etcdctl(pairs)
+        return
+    finally:
+        if client is not None:
+            client.close()
+    for key, value in pairs:
+        if stored.get(key.encode()) != value:
+            print("Reading {} key failed".format(key))
+            sys.exit(-1)
+
+
+def load_data_etcdctl(pairs):
+    """Add keys to etcd running etcdctl for every key
+    :param pairs: etcd key, value pairs
+    :type pairs: list
+    """
+    for key, value in pairs:
+        returncode = _execute_cmd(["./etcdctl", "put", key, value])
+        if returncode != 0:
+            print("Adding {} key failed".format(key))
+            sys.exit(-1)
         print("Added {} key successfully".format(key))
 
     print("=======Reading key/values from etcd========")
-    for key in config.keys():
-        if key.split("/")[1] not in apps.keys() and key != '/GlobalEnv/':
-            continue
-        key = ETCD_PREFIX + key
-        retruncode = _execute_cmd(["./etcdctl", "get", key])
+    for key, _ in pairs:
+        returncode = _execute_cmd(["./etcdctl", "get", key])
         if returncode != 0:
             print("Reading {} key failed".format(key))
             sys.exit(-1)
@@ -279,12 +437,15 @@ if __name__ == "__main__":
     etcd_health_check()
 
     apps = get_appname(str(sys.argv[1]))
-    load_data_etcd("./config/eii_config.json", apps)
+    etcd_data = get_etcd_data("./config/eii_config.json", apps)
+    if not devMode:
+        for key, value in apps.items():
+            if 'zmq' in value:
+                etcd_data.extend(get_zmqkeys(key))
+    load_data_etcd(etcd_data)
     for key, value in apps.items():
         try:
             if not devMode:
-                if 'zmq' in value:
-                    put_zmqkeys(key)
                 create_etcd_users(key)
         except ValueError:
             pass
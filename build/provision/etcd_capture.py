@@ -22,9 +22,27 @@
 import subprocess
 import json
 import os
+import ssl
+import base64
 import argparse
+import http.client
 from distutils.util import strtobool
 
+# Keys holding secrets, never written to the capture
+SECRET_MATCHERS = ('Publickeys', 'private_key',
+                   'ca_cert', 'server_cert', 'server_key')
+# Revision of the etcd snapshot a capture was taken at, read back by the
+# incremental mode
+REVISION_SUFFIX = '.revision'
+# With --from-key, the first key of the keyspace
+FIRST_KEY = b'\0'
+
+
+class EtcdRangeError(Exception):
+    """Raised when reading a range of keys from etcd fails
+    """
+    pass
+
 
 def parse_args():
     """Parse command line arguments.
@@ -39,6 +57,13 @@ def parse_args():
     a_p.add_argument('--etcd_root_key',
                      default="./Certificates/root/root_client_key.pem",
                      help='root key')
+    a_p.add_argument('--output', default='etcd_capture_data.json',
+                     help='JSON file the data is written to')
+    a_p.add_argument('--page_size', type=int, default=500,
+                     help='Number of keys read per range request')
+    a_p.add_argument('--incremental', action='store_true',
+                     help='Only read the keys modified since the capture '
+                     'already in the output file, and update it')
     return a_p.parse_args()
 
 
@@ -47,6 +72,229 @@ def _execute_cmd(cmd):
     return cmd_output
 
 
+def is_secret(key):
+    return any(matcher in key for matcher in SECRET_MATCHERS)
+
+
+class EtcdRangeReader:
+    """Reads the whole keyspace of etcd in paginated range requests over
+       a single (TLS) connection to the etcd v3 json gateway, all the pages
+       being read at the same revision. Falls back to a single etcdctl
+       command if the gateway can't be used, eg: with etcd auth enabled,
+       as the gateway doesn't forward the client certificate's user
+    """
+
+    def __init__(self, endpoint, ca_cert=None, cert=None, key=None,
+                 timeout=30):
+        """Constructor
+
+        :param endpoint: etcd endpoint, host:port
+        :type endpoint: str
+        :param ca_cert: ca certificate file, None for plain http
+        :type ca_cert: str
+        :param cert: client certificate file
+        :type cert: str
+        :param key: client key file
+        :type key: str
+        :param timeout: socket timeout in seconds
+        :type timeout: int
+        """
+        self.endpoint = endpoint
+        self.etcdctl_args = []
+        host, port = endpoint.split("://")[-1].rsplit(":", 1)
+        if ca_cert:
+            self.etcdctl_args = ["--cacert", ca_cert, "--cert", cert,
+                                 "--key", key]
+            context = ssl.create_default_context(cafile=ca_cert)
+            context.load_cert_chain(cert, key)
+            self.conn = http.client.HTTPSConnection(host, int(port),
+                                                    timeout=timeout,
+                                                    context=context)
+        else:
+            self.conn = http.client.HTTPConnection(host, int(port),
+                                                   timeout=timeout)
+        self.use_gateway = True
+        self.requests = 0
+
+    def close(self):
+        self.conn.close()
+
+    def _gateway_range(self, body):
+        self.conn.request("POST", "/v3/kv/range", json.dumps(body),
+                          {"Content-Type": "application/json"})
+        response = self.conn.getresponse()
+        data = response.read()
+        self.requests += 1
+        if response.status != 200:
+            raise EtcdRangeError("range failed with status {}: {}".format(
+                                 response.status, data[:200]))
+        return json.loads(data)
+
+    def _etcdctl_range(self, revision, min_mod_revision, keys_only):
+        cmd = ["./etcd/etcdctl", "--endpoints", self.endpoint] + \
+            self.etcdctl_args + ["get", "--from-key", "", "-w", "json"]
+        if revision:
+            cmd += ["--rev", str(revision)]
+        if min_mod_revision:
+            cmd += ["--min-mod-rev", str(min_mod_revision)]
+        if keys_only:
+            cmd.append("--keys-only")
+        self.requests += 1
+        return json.loads(_execute_cmd(cmd).decode('utf-8'))
+
+    def pages(self, page_size, revision=0, min_mod_revision=0,
+              keys_only=False):
+        """Reads all the keys, in key order, page by page
+
+        :param page_size: number of keys per request
+        :type page_size: int
+        :param revision: revision to read at, the latest by default
+        :type revision: int
+        :param min_mod_revision: only keys modified at or after this
+                                 revision are returned
+        :type min_mod_revision: int
+        :param keys_only: don't return the values
+        :type keys_only: bool
+        :return: generator of (revision, [(key, mod_revision, value)])
+        :rtype: generator
+        """
+        if self.use_gateway:
+            start = FIRST_KEY
+            while True:
+                body = {"key": base64.b64encode(start).decode(),
+                        "range_end": base64.b64encode(FIRST_KEY).decode(),
+                        "limit": page_size, "revision": revision,
+                        "min_mod_revision": min_mod_revision,
+                        "keys_only": keys_only}
+                try:
+                    response = self._gateway_range(body)
+                except (OSError, ValueError, http.client.HTTPException,
+                        EtcdRangeError) as ex:
+                    # Pages already returned can't be taken back
+                    if start != FIRST_KEY:
+                        raise
+                    print("etcd json gateway failed ({}), using "
+                          "etcdctl".format(ex))
+                    self.use_gateway = False
+                    break
+                revision = int(response["header"]["revision"])
+                kvs = self._decode(response)
+                yield revision, kvs
+                if not response.get("more", False) or not kvs:
+                    return
+                start = kvs[-1][0] + b'\0'
+        response = self._etcdctl_range(revision, min_mod_revision,
+                                       keys_only)
+        yield int(response["header"]["revision"]), self._decode(response)
+
+    @staticmethod
+    def _decode(response):
+        return [(base64.b64decode(kv["key"]), int(kv.get("mod_revision", 0)),
+                 base64.b64decode(kv.get("value", "")))
+                for kv in response.get("kvs", [])]
+
+
+def capture(reader, page_size):
+    """Reads all the keys & values of etcd, skipping the secrets
+
+    :param reader: etcd reader
+    :type reader: EtcdRangeReader
+    :param page_size: number of keys per request
+    :type page_size: int
+    :return: revision of the snapshot, generator of (key, value) pairs
+    :rtype: tuple
+    """
+    pages = reader.pages(page_size)
+    revision, kvs = next(pages)
+
+    def items(kvs):
+        while True:
+            for key, _, value in kvs:
+                key = key.decode('utf-8')
+                if not is_secret(key):
+                    yield key, json.loads(value.decode('utf-8'))
+            kvs = next(pages, (None, None))[1]
+            if kvs is None:
+                return
+    return revision, items(kvs)
+
+
+def capture_incremental(reader, page_size, previous, last_revision):
+    """Reads the keys modified since a previous capture and merges them in
+       it. Deleted keys are found with a keys only read of the keyspace
+
+    :param reader: etcd reader
+    :type reader: EtcdRangeReader
+    :param page_size: number of keys per request
+    :type page_size: int
+    :param previous: data of the previous capture
+    :type previous: dict
+    :param last_revision: revision of the previous capture
+    :type last_revision: int
+    :return: revision of the snapshot, (key, value) pairs, number of keys
+             read. None if the previous capture misses unmodified keys
+    :rtype: tuple
+    """
+    revision, keys = 0, []
+    for revision, kvs in reader.pages(page_size, keys_only=True):
+        keys.extend(key.decode('utf-8') for key, _, _ in kvs)
+    modified = {}
+    for _, kvs in reader.pages(page_size, revision, last_revision + 1):
+        for key, _, value in kvs:
+            key = key.decode('utf-8')
+            if not is_secret(key):
+                modified[key] = json.loads(value.decode('utf-8'))
+    items = []
+    for key in keys:
+        if is_secret(key):
+            continue
+        if key in modified:
+            items.append((key, modified[key]))
+        elif key in previous:
+            items.append((key, previous[key]))
+        else:
+            return None
+    return revision, items, len(modified)
+
+
+def write_json(path, items):
+    """Writes (key, value) pairs sorted by key as a JSON object, one pair
+       at a time, formatted as json.dump(sort_keys=True, indent=4) does.
+       The file is replaced once fully written
+
+    :param path: JSON file
+    :type path: str
+    :param items: (key, value) pairs, in key order
+    :type items: iterable
+    :return: number of keys written
+    :rtype: int
+    """
+    count = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as json_file:
+        json_file.write("{")
+        for key, value in items:
+            json_file.write(",\n    " if count else "\n    ")
+            json_file.write(json.dumps(key))
+            json_file.write(": ")
+            json_file.write(json.dumps(value, sort_keys=True,
+                                       indent=4).replace("\n", "\n    "))
+            count += 1
+        json_file.write("\n}" if count else "}")
+    os.replace(tmp_path, path)
+    return count
+
+
+def read_previous(path):
+    try:
+        with open(path + REVISION_SUFFIX, 'r') as revision_file:
+            revision = int(revision_file.read().strip())
+        with open(path, 'r') as json_file:
+            return revision, json.load(json_file)
+    except (OSError, ValueError):
+        return None, None
+
+
 def main():
     """ main function
     """
@@ -56,46 +304,38 @@ def main():
         + os.getenv('ETCD_CLIENT_PORT', '2379')
     args = parse_args()
     if dev_mode:
-        cmd = _execute_cmd(["./etcd/etcdctl", "get",
-                            "--endpoints", etcdctl_ep,
-                            "--from-key", "''", "--keys-only"])
+        reader = EtcdRangeReader(etcdctl_ep)
     else:
-        cmd = _execute_cmd(["./etcd/etcdctl",
-                            "--endpoints", etcdctl_ep,
-                            "--cacert", args.ca_etcd,
-                            "--cert", args.etcd_root_cert,
-                            "--key", args.etcd_root_key, "get",
-                            "--from-key", "''", "--keys-only"])
-    keys = str(cmd, encoding='utf-8')
-    key_list = keys.split()
-    value_list = []
-    matchers = ['Publickeys', 'private_key',
-                'ca_cert', 'server_cert', 'server_key']
-    matching = [s for s in key_list if any(xs in s for xs in matchers)]
-
-    for key in matching:
-        if key in key_list:
-            key_list.remove(key)
-
-    for key in key_list:
-        if dev_mode:
-            cmd = _execute_cmd(["./etcd/etcdctl", "get",
-                                "--endpoints", etcdctl_ep,
-                                "--print-value-only", key])
+        reader = EtcdRangeReader(etcdctl_ep, args.ca_etcd,
+                                 args.etcd_root_cert, args.etcd_root_key)
+    try:
+        result = None
+        if args.incremental:
+            last_revision, previous = read_previous(args.output)
+            if previous is None:
+                print("No previous capture in {}, capturing all the "
+                      "keys".format(args.output))
+            else:
+                result = capture_incremental(reader, args.page_size,
+                                             previous, last_revision)
+                if result is None:
+                    print("Previous capture in {} is incomplete, capturing "
+                          "all the keys".format(args.output))
+        if result is not None:
+            revision, items, modified = result
+            count = write_json(args.output, items)
+            print("Updated {} of {} keys modified since revision {}".format(
+                  modified, count, last_revision))
         else:
-            cmd = _execute_cmd(["./etcd/etcdctl",
-                                "--endpoints", etcdctl_ep,
-                                "--cacert", args.ca_etcd,
-                                "--cert", args.etcd_root_cert,
-                                "--key", args.etcd_root_key, "get",
-                                "--print-value-only", key])
-        value = json.loads(cmd.decode('utf-8'))
-        value_list.append(value)
-
-    etcd_dict = dict(zip(key_list, value_list))
-
-    with open('etcd_capture_data.json', 'w') as json_file:
-        json.dump(etcd_dict, json_file, sort_keys=True, indent=4)
+            revision, items = capture(reader, args.page_size)
+            count = write_json(args.output, items)
+            print("Captured {} keys".format(count))
+    finally:
+        reader.close()
+    with open(args.output + REVISION_SUFFIX, 'w') as revision_file:
+        revision_file.write("{}\n".format(revision))
+    print("Snapshot of revision {} written to {} in {} requests".format(
+          revision, args.output, reader.requests))
 
 
 if __name__ == "__main__":
@@ -23,7 +23,7 @@
 #Script to write back data from ETCD Cluster to JSON file.
 function helpFunction {
     echo >&2
-    echo "Usage: ./etcd_capture.sh --ca_etcd ca_certificate --etcd_root_cert root_cert --etcd_root_key root_key" >&2
+    echo "Usage: ./etcd_capture.sh --ca_etcd ca_certificate --etcd_root_cert root_cert --etcd_root_key root_key [--output file] [--page_size size] [--incremental]" >&2
     echo >&2
     echo "SUMMARY": >&2
     echo >&2
@@ -33,6 +33,12 @@ function helpFunction {
     echo >&2
     echo "  --etcd_root_key  root client key" >&2
     echo >&2
+    echo "  --output  JSON file the data is written to (default: etcd_capture_data.json)" >&2
+    echo >&2
+    echo "  --page_size  number of keys read per range request (default: 500)" >&2
+    echo >&2
+    echo "  --incremental  only read the keys modified since the capture already in the output file" >&2
+    echo >&2
     exit 1
 }
 
@@ -29,8 +29,15 @@ import cert_core
 import paths
 import argparse
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 import yaml
 
+DEFAULT_SAN = "IP:127.0.0.1,DNS:etcd,DNS:*,DNS:localhost," \
+              "URI:urn:unconfigured:application"
+# Module generating the keys & certificates, cert_core running openssl or
+# cert_crypto generating them in-process
+backend = cert_core
+
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Tool Used for Generating\
@@ -42,6 +49,27 @@ def parse_args():
     parser.add_argument('--capath', dest='rootca_path',
                         help='RootCA certificate Path, if given,cert-tool\
                         will re-use the existing rootCA certificate')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of certificates whose keys are\
+                        generated concurrently, 1 to generate them\
+                        serially')
+    parser.add_argument('--backend', choices=['openssl', 'cryptography'],
+                        default='openssl',
+                        help='Generate the keys & certificates running\
+                        openssl or in-process with the cryptography\
+                        library')
+    parser.add_argument('--key_type', choices=['rsa', 'ecdsa'],
+                        default='rsa',
+                        help='Type of the keys, rsa of SSL_KEY_LENGTH bits\
+                        or ecdsa on the P-256 curve, which requires the\
+                        cryptography backend')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Keep the certificates of Certificates/ still\
+                        signed by the root CA, matching the SANs & not\
+                        expiring, generating only the other ones')
+    parser.add_argument('--renew_days', type=int, default=30,
+                        help='Number of days before their expiry the\
+                        certificates are renewed in incremental mode')
     return parser.parse_args()
 
 
@@ -96,44 +124,113 @@ def copy_certificates_to_results_folder():
 
 
 def generate_root_ca():
-    cert_core.generate_root_ca({"common_name": "rootca",
-                                "client_alt_name": "rootca",
-                                "server_alt_name": "rootca"})
+    backend.generate_root_ca({"common_name": "rootca",
+                              "client_alt_name": "rootca",
+                              "server_alt_name": "rootca"})
     os.makedirs(paths.relative_path("Certificates", "ca"), exist_ok=True)
 
 
-def generate(opts, root_ca_needed=True):
-    if root_ca_needed:
-        print("Generating root CA certs...")
-        generate_root_ca()
-    copy_certificates_to_results_folder()
+def get_san(cert_opts):
+    """Returns the subjectAltName of a certificate
+    """
+    if "server_alt_name" not in cert_opts:
+        return DEFAULT_SAN
+    if os.environ["SSL_SAN_IP"] != "":
+        return "IP:" + os.environ["HOST_IP"] + "," + "IP:" + \
+               os.environ["SSL_SAN_IP"] + "," + DEFAULT_SAN
+    return "IP:" + os.environ["HOST_IP"] + "," + DEFAULT_SAN
+
+
+def get_leaf_certs(opts):
+    """Returns the leaf certificates to generate, in the order of the
+       config, as (component, peer, cert_opts, san) tuples
+    """
+    leaf_certs = []
     for cert in opts["certs"]:
-        print("Generating Certificate for.......... " + str(cert) + "\n\n")
-        os.environ["SAN"] = \
-                "IP:127.0.0.1,DNS:etcd,DNS:*,DNS:localhost,URI:urn:unconfigured:application"
         for component, cert_opts in cert.items():
-            if 'output_format' in cert_opts:
-                outform = cert_opts['output_format']
-            else:
-                outform = None
+            san = get_san(cert_opts)
             if "server_alt_name" in cert_opts:
-                if os.environ["SSL_SAN_IP"] != "":
-                    os.environ["SAN"] = "IP:" + \
-                                        os.environ["HOST_IP"] + "," + "IP:" + \
-                                        os.environ["SSL_SAN_IP"] + "," + \
-                                        os.environ["SAN"]
-                else:
-                    os.environ["SAN"] = "IP:" + \
-                        os.environ["HOST_IP"] + "," + os.environ["SAN"]
-                cert_core.generate_server_certificate_and_key_pair(component,
-                                                                   cert_opts)
-                cert_core.copy_leaf_cert_and_key_pair("server",
-                                                      component, outform)
+                leaf_certs.append((component, "server", cert_opts, san))
             if "client_alt_name" in cert_opts:
-                cert_core.generate_client_cert_and_key_pair(component,
-                                                            cert_opts)
-                cert_core.copy_leaf_cert_and_key_pair("client",
-                                                      component, outform)
+                leaf_certs.append((component, "client", cert_opts, san))
+    return leaf_certs
+
+
+def generate_key_and_request(leaf_cert):
+    component, peer, cert_opts, san = leaf_cert
+    print("Generating Certificate for.......... " + component + "_" + peer +
+          "\n\n")
+    # cert_opts may be shared by the server & client certs of a component
+    backend.generate_key_and_request(component, peer, dict(cert_opts), san)
+
+
+def convert_and_copy(leaf_cert):
+    component, peer, cert_opts, _ = leaf_cert
+    backend.convert_cert_and_key_pair(component, peer, cert_opts)
+    cert_core.copy_leaf_cert_and_key_pair(peer, component,
+                                          cert_opts.get('output_format'))
+
+
+def set_backend(name, key_type):
+    global backend
+    if name == 'cryptography':
+        import cert_crypto
+        cert_crypto.key_type = key_type
+        backend = cert_crypto
+    elif key_type != 'rsa':
+        raise ValueError("{} keys require the cryptography backend".format(
+                         key_type))
+    else:
+        backend = cert_core
+
+
+def get_outdated_leaf_certs(leaf_certs, key_type, renew_days):
+    """Returns the leaf certificates of a previous run that can't be kept
+    """
+    import cert_manifest
+    ca_certificate = cert_manifest.load_root_ca()
+    outdated = []
+    for leaf_cert in leaf_certs:
+        component, peer, cert_opts, san = leaf_cert
+        reason = cert_manifest.check_leaf(component, peer, cert_opts, san,
+                                          ca_certificate, key_type,
+                                          renew_days)
+        if reason is None:
+            print("Keeping certificate of " + component + "_" + peer)
+        else:
+            print("Regenerating certificate of " + component + "_" + peer +
+                  ": " + reason)
+            outdated.append(leaf_cert)
+    return outdated
+
+
+def generate(opts, root_ca_needed=True, jobs=1, incremental=False,
+             key_type='rsa', renew_days=30):
+    if root_ca_needed:
+        print("Generating root CA certs...")
+        generate_root_ca()
+    copy_certificates_to_results_folder()
+    all_leaf_certs = leaf_certs = get_leaf_certs(opts)
+    if incremental:
+        leaf_certs = get_outdated_leaf_certs(leaf_certs, key_type,
+                                             renew_days)
+        print("Generating {} of {} certificates".format(
+              len(leaf_certs), len(all_leaf_certs)))
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        # Key generation takes most of the time and every certificate has
+        # its own directory, so keys are generated concurrently
+        list(pool.map(generate_key_and_request, leaf_certs))
+        # Signing updates the CA index & serial, so it's done serially in
+        # the config's order, giving the same serials whatever the jobs
+        for component, peer, cert_opts, san in leaf_certs:
+            backend.sign_request(component, peer, dict(cert_opts), san)
+        list(pool.map(convert_and_copy, leaf_certs))
+    if incremental:
+        import cert_manifest
+        print("Certificates manifest written to " +
+              cert_manifest.write_manifest(all_leaf_certs))
+
+
 def clean():
     for trees in [paths.root_ca_path(), paths.leaf_pair_path("server"),
                   paths.result_path(),
@@ -172,6 +269,7 @@ if __name__ == '__main__':
         if args.clean is True:
             clean()
             exit(1)
+        set_backend(args.backend, args.key_type)
         if not args.compose_file_path:
             data = parse_json()
         else:
@@ -179,9 +277,13 @@ if __name__ == '__main__':
         if args.rootca_path:
             root_ca_dir = args.rootca_path
             paths.root_ca_dir_name = root_ca_dir
-            generate(data, False)   # re use existing root CA
+            # re use existing root CA
+            generate(data, False, args.jobs, args.incremental,
+                     args.key_type, args.renew_days)
         else:
-            generate(data, True)  # Generate new root CA
+            # Generate new root CA
+            generate(data, True, args.jobs, args.incremental, args.key_type,
+                     args.renew_days)
         if os.environ['PROVISION_MODE'] == "k8s":
            generate_k8s_secrets()
     except Exception as err:
@@ -77,32 +77,32 @@ def root_ca_certificate_cer_path():
     return path.join(root, root_ca_dir_name, "cacert.der")
 
 #
-# Leaf (peer) certificates and keys
+# Leaf (peer) certificates and keys, in a directory per certificate name
 #
 
 
-def leaf_pair_path(peer):
-    return path.join(root, peer)
+def leaf_pair_path(peer, name=""):
+    return path.join(root, peer, name)
 
 
-def leaf_certificate_path(peer):
-    return relative_path(peer, "cert.pem")
+def leaf_certificate_path(peer, name=""):
+    return relative_path(peer, name, "cert.pem")
 
 
-def leaf_certificate_der_path(peer):
-    return relative_path(peer, "cert.der")
+def leaf_certificate_der_path(peer, name=""):
+    return relative_path(peer, name, "cert.der")
 
 
-def leaf_key_der_path(peer):
-    return relative_path(peer, "key.der")
+def leaf_key_der_path(peer, name=""):
+    return relative_path(peer, name, "key.der")
 
 
-def leaf_key_path(peer):
-    return relative_path(peer, "key.pem")
+def leaf_key_path(peer, name=""):
+    return relative_path(peer, name, "key.pem")
 
 
-def leaf_key_path_der(peer):
-    return relative_path(peer, "key.key")
+def leaf_key_path_der(peer, name=""):
+    return relative_path(peer, name, "key.key")
 
 
 #
@@ -156,12 +156,16 @@ function remove_client_server() {
 
 function prod_mode_gen_certs() {
     log_info "Generating EII Certificates"
+    incremental=""
+    if [ "$INCREMENTAL_CERTS" = "true" ]; then
+        incremental="--incremental"
+    fi
     if [ -d "rootca" ]; then
         log_warn "Making use of existing CA from ./rootca dir for generating certs..."
         log_warn "To generate new CA, remove roootca/ from current dir.."
-        python3 gen_certs.py --f $docker_compose --capath rootca/
+        python3 gen_certs.py --f $docker_compose --capath rootca/ --jobs $(nproc) $incremental
     else
-        python3 gen_certs.py --f $docker_compose
+        python3 gen_certs.py --f $docker_compose --jobs $(nproc) $incremental
     fi
     chown -R $EII_USER_NAME:$EII_USER_NAME Certificates/
     chmod -R 750 Certificates/
@@ -232,8 +236,12 @@ if [ "$PROVISION_MODE" = 'k8s' -a "$ETCD_NAME" = 'master' ]; then
      kubectl create namespace eii
      pip3 install -r cert_requirements.txt
      
-     echo "Clearing existing Certificates..."
-     rm -rf Certificates
+     if [ "$INCREMENTAL_CERTS" = "true" ]; then
+         echo "Re-using the still valid existing Certificates..."
+     else
+         echo "Clearing existing Certificates..."
+         rm -rf Certificates
+     fi
      
      copy_docker_compose_file
 
@@ -259,8 +267,12 @@ elif [ $ETCD_NAME = 'master' ]; then
 
     copy_docker_compose_file
 
-    echo "Clearing existing Certificates..."
-    rm -rf Certificates
+    if [ "$INCREMENTAL_CERTS" = "true" ]; then
+        echo "Re-using the still valid existing Certificates..."
+    else
+        echo "Clearing existing Certificates..."
+        rm -rf Certificates
+    fi
 
     echo "Checking ETCD port..."
     check_ETCD_port
@@ -0,0 +1,189 @@
+# Copyright (c) 2020 Intel Corporation.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Per run model of the services parsed by builder.py
+"""
+import os
+import json
+from collections import Counter
+import ruamel.yaml
+
+COMPOSE_FILE = 'docker-compose.yml'
+CONFIG_FILE = 'config.json'
+K8S_FILE = 'k8s-service.yml'
+
+
+class Service:
+    """Files of a service directory, each read and parsed at most once
+
+    Files are loaded on first access, so the stages whose fragments are
+    re-used from the build cache don't read them at all. Parsed documents
+    are shared by all the stages, which must copy them before making
+    changes that are not meant to end up in their output.
+    """
+
+    def __init__(self, path):
+        """Constructor
+
+        :param path: path of the service directory
+        :type path: str
+        """
+        self.path = path
+        self.reads = Counter()
+        self.parses = Counter()
+        self._contents = {}
+        self._documents = {}
+        # AppName is fetched on first access, None being the AppName of
+        # common/video
+        self._app_name = None
+        self._app_name_fetched = False
+
+    def read(self, file_name):
+        """Returns the content of a file of the service
+
+        :param file_name: name of the file in the service directory
+        :type file_name: str
+        :return: content of the file
+        :rtype: str
+        """
+        if file_name not in self._contents:
+            with open(self.path + '/' + file_name, 'r') as infile:
+                self._contents[file_name] = infile.read()
+            self.reads[file_name] += 1
+        return self._contents[file_name]
+
+    def yaml(self, file_name):
+        """Returns the round trip document of a yml file of the service
+
+        :param file_name: name of the file in the service directory
+        :type file_name: str
+        :return: parsed yml
+        :rtype: CommentedMap
+        """
+        if file_name not in self._documents:
+            self._documents[file_name] = ruamel.yaml.round_trip_load(
+                self.read(file_name), preserve_quotes=True)
+            self.parses[file_name] += 1
+        return self._documents[file_name]
+
+    def json(self, file_name):
+        """Returns the parsed json file of the service
+
+        :param file_name: name of the file in the service directory
+        :type file_name: str
+        :return: parsed json
+        :rtype: dict
+        """
+        if file_name not in self._documents:
+            self._documents[file_name] = json.loads(self.read(file_name))
+            self.parses[file_name] += 1
+        return self._documents[file_name]
+
+    @property
+    def compose(self):
+        """docker-compose.yml of the service
+        """
+        return self.yaml(COMPOSE_FILE)
+
+    @property
+    def config(self):
+        """config.json of the service
+        """
+        return self.json(CONFIG_FILE)
+
+    @property
+    def k8s_manifest(self):
+        """Content of the k8s-service.yml of the service
+        """
+        return self.read(K8S_FILE)
+
+    @property
+    def app_name(self):
+        """AppName of the first service of the docker-compose.yml
+
+        :return: AppName of service if found, None for common/video
+                 empty string if path is not a directory
+        :rtype: str
+        """
+        if not self._app_name_fetched:
+            self._app_name = self._fetch_app_name()
+            self._app_name_fetched = True
+        return self._app_name
+
+    def _fetch_app_name(self):
+        if not os.path.isdir(self.path):
+            return ""
+        data = self.compose
+        # Iterate through the yaml file and
+        # return AppName if found
+        for x in data:
+            if x == 'services':
+                for y in data[x]:
+                    if "environment" in data[x][y]:
+                        # If environment sections exists,
+                        # raise Exception if AppName not found
+                        if "AppName" not in data[x][y]["environment"]:
+                            raise Exception("AppName not found")
+                        return data[x][y]["environment"]["AppName"]
+                    # For common/video case
+                    return None
+        return ""
+
+
+class ServiceModel:
+    """Services of a builder run, keyed by their directory
+    """
+
+    def __init__(self):
+        """Constructor
+        """
+        self.services = {}
+
+    def get(self, path):
+        """Returns the service of a directory, creating it if needed
+
+        :param path: path of the service directory
+        :type path: str
+        :return: service
+        :rtype: Service
+        """
+        if path not in self.services:
+            self.services[path] = Service(path)
+        return self.services[path]
+
+    def update(self, service):
+        """Replaces a service by a copy loaded in a worker process, so
+           the files it loaded are not loaded again
+
+        :param service: service returned by a worker process
+        :type service: Service
+        """
+        self.services[service.path] = service
+
+    def stats(self):
+        """Returns the number of reads and parses of every file name
+
+        :return: reads, parses counters
+        :rtype: tuple
+        """
+        reads, parses = Counter(), Counter()
+        for service in self.services.values():
+            reads.update(service.reads)
+            parses.update(service.parses)
+        return reads, parses
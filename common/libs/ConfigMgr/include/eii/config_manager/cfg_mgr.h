@@ -41,6 +41,28 @@
 extern "C" {
 #endif
 
+/**
+ * Timings of the start up of the ConfigMgr, all in microseconds
+ */
+typedef struct {
+
+    // Time taken to create and initialize the kv store client
+    long init_us;
+
+    // Time taken to prefetch the keys of the app from the kv store
+    long prefetch_us;
+
+    // Number of keys prefetched, -1 if the prefetch failed
+    long prefetched_keys;
+
+    // Time taken to fetch GlobalEnv, the interfaces and the config of the app
+    long fetch_us;
+
+    // Total time taken by app_cfg_new()
+    long total_us;
+
+} cfgmgr_startup_stats_t;
+
 typedef struct {
 
     config_t* (*create_kv_store_config)();
@@ -49,6 +71,8 @@ typedef struct {
 
     char* env_var;
 
+    cfgmgr_startup_stats_t startup_stats;
+
 } app_cfg_t;
 
 /**
@@ -28,7 +28,10 @@
 #define _EII_ETCD_CLIENT_H
 
 #include <iostream>
+#include <map>
 #include <memory>
+#include <mutex>
+#include <vector>
 #include <string>
 #include <stdlib.h>
 #include <unistd.h>
@@ -43,6 +46,7 @@
 
 #include <eii/config_manager/kv_store_plugin/etcd_client/protobuf/rpc.grpc.pb.h>
 #include <eii/config_manager/kv_store_plugin/etcd_client/protobuf/kv.pb.h>
+#include <eii/config_manager/kv_store_plugin/etcd_client/watch_multiplexer.h>
 
 #define ADDRESS_LEN 30
 using grpc::Channel;
@@ -57,6 +61,8 @@ using etcdserverpb::RangeRequest;
 using etcdserverpb::PutRequest;
 using etcdserverpb::RequestOp;
 using etcdserverpb::PutResponse;
+using etcdserverpb::TxnRequest;
+using etcdserverpb::TxnResponse;
 using etcdserverpb::WatchCreateRequest;
 using etcdserverpb::WatchRequest;
 using etcdserverpb::WatchResponse;
@@ -108,6 +114,22 @@ class EtcdClient {
         */
         std::vector<std::string> get_prefix(std::string& key_prefix);
 
+        /**
+        * Loads all the keys of the given prefixes with a single transaction
+        * into an in-memory snapshot. Until end_prefetch() is called, the
+        * get() and get_prefix() calls within these prefixes are served from
+        * the snapshot, and put() keeps it up to date.
+        * @param prefixes is the list of key prefixes to be loaded
+        * @return number of keys loaded, -1 on failure
+        */
+        int prefetch(std::vector<std::string>& prefixes);
+
+        /**
+        * Drops the snapshot loaded by prefetch(), the later get() and
+        * get_prefix() calls are sent to etcd server
+        */
+        void end_prefetch();
+
         /**
         * Saves the value of a key to etcd. The key will be modified if already exists or created
         * if it does not exist.
@@ -119,7 +141,8 @@ class EtcdClient {
 
         /**
         * Watches for changes of a key, registers user_callback and notify 
-        * user if any change on key occured 
+        * user if any change on key occured. All the watches of the client
+        * share a single Watch stream.
         * @param key is the value or directory to be watched
         * @param user_callback user_call back to register for a key
         * @param user_data user_data to be passed, it can be NULL also
@@ -128,7 +151,8 @@ class EtcdClient {
 
         /**
         * Watches for changes of a prefix of a key and register user_callback and notify 
-        * the user if any change on directory(prefix of key) occured 
+        * the user if any change on directory(prefix of key) occured. All the
+        * watches of the client share a single Watch stream.
         * @param key is the value or directory to be watched
         * @param user_callback user_call back to register for a key
         * @param user_data user_data to be passed, it can be NULL also
@@ -138,7 +162,16 @@ class EtcdClient {
     private:
         char address[ADDRESS_LEN];
         grpc::SslCredentialsOptions ssl_opts;
+        std::shared_ptr<Channel> channel;
         std::unique_ptr<KV::Stub> kv_stub;
+        std::unique_ptr<WatchMultiplexer> watch_mux;
+
+        // Snapshot loaded by prefetch(), keyed by the full etcd keys
+        std::mutex snapshot_mutex;
+        std::vector<std::string> snapshot_prefixes;
+        std::map<std::string, std::string> snapshot;
+
+        bool in_snapshot(const std::string& key);
 };
 
 #endif // _EII_ETCD_CLIENT_H
\ No newline at end of file
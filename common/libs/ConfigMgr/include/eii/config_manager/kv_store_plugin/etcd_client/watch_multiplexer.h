@@ -0,0 +1,114 @@
+// Copyright (c) 2021 Intel Corporation.
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to
+// deal in the Software without restriction, including without limitation the
+// rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+// sell copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in
+// all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+// FROM,OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+// IN THE SOFTWARE.
+
+/**
+ * @file
+ * @brief Watch multiplexer sharing one grpc Watch stream between all the
+ * watches of an etcd client
+**/
+
+#ifndef _EII_ETCD_WATCH_MULTIPLEXER_H
+#define _EII_ETCD_WATCH_MULTIPLEXER_H
+
+#include <atomic>
+#include <condition_variable>
+#include <deque>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <thread>
+#include <vector>
+#include <grpcpp/grpcpp.h>
+#include "eii/utils/config.h"
+
+#include <eii/config_manager/kv_store_plugin/etcd_client/protobuf/rpc.grpc.pb.h>
+#include <eii/config_manager/kv_store_plugin/etcd_client/protobuf/kv.pb.h>
+
+/**
+ * Format for the user callback to notify the user when any update occurs on a key
+ * when watch functions are being called for the key
+ * @param key           key is being updated
+ * @param value         updated value
+ * @param cb_user_data  user data passed
+ */
+typedef void (*callback_t)(const char *key, config_t* value, void* cb_user_data);
+
+/**
+ * Runs all the watches of an etcd client on a single bidirectional Watch
+ * stream of a shared channel. Watches are created one at a time on the
+ * stream, etcd answers them in order, and the events read back are dispatched
+ * to the user callbacks by watch ID from a single reader thread.
+ *
+ * When the stream ends, it is re-opened and all the watches are created
+ * again from the revision following the last one seen.
+ *
+ * The state of the multiplexer is shared with the reader thread, which keeps
+ * it alive until the thread ends, so that the multiplexer can be destroyed
+ * from within a user callback.
+ */
+class WatchMultiplexer {
+    public:
+        /**
+        * WatchMultiplexer Constructor
+        * @param channel - grpc channel to the etcd server, shared with the
+        *                  other stubs of the client
+        */
+        explicit WatchMultiplexer(std::shared_ptr<grpc::Channel> channel);
+
+        /**
+        * Destructor, cancels the Watch stream and joins the reader thread.
+        * When called from within a user callback, no more callbacks are
+        * called and the reader thread ends once the callback returns.
+        */
+        ~WatchMultiplexer();
+
+        /**
+        * Registers a watch on the shared stream. The reader thread is
+        * started with the first watch.
+        * @param create_req - watch create request of the key or range
+        * @param user_cb    - user callback called on every put of the key
+        * @param user_data  - user data passed to the callback, can be NULL
+        */
+        void add_watch(const etcdserverpb::WatchCreateRequest& create_req,
+                       callback_t user_cb, void* user_data);
+
+        /**
+        * Number of watches registered
+        */
+        size_t watch_count();
+
+        /**
+        * Number of watches acknowledged by the server on the current stream
+        */
+        size_t active_watch_count();
+
+        /**
+        * Number of Watch streams opened so far, including the re-opened ones
+        */
+        size_t streams_opened();
+
+    private:
+        struct state_t;
+
+        std::shared_ptr<state_t> m_state;
+        std::thread m_thread;
+};
+
+#endif // _EII_ETCD_WATCH_MULTIPLEXER_H
@@ -67,6 +67,16 @@ typedef struct {
         // a prefixed key from kv_store_client
         char* (*get_prefix) (void* handle, char *key);
 
+        // function pointer to assign to load all the keys of the given prefixes
+        // from kv_store into an in-memory snapshot serving the later get and
+        // get_prefix calls within these prefixes, returns the number of keys
+        // loaded or -1 on failure
+        int (*prefetch) (void* handle, char **prefixes, int num_prefixes);
+
+        // function pointer to assign to drop the snapshot loaded by prefetch,
+        // the later get and get_prefix calls are served from kv_store
+        void (*end_prefetch) (void* handle);
+
         // function poiner to assign to store value of a particular key into kv_store
         int (*put) (void* handle, char *key, char *value);
 
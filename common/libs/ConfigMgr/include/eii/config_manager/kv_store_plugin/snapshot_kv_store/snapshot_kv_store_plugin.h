@@ -0,0 +1,68 @@
+// Copyright (c) 2021 Intel Corporation.
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to
+// deal in the Software without restriction, including without limitation the
+// rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+// sell copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in
+// all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+// FROM,OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+// IN THE SOFTWARE.
+
+/**
+ * @file
+ * @brief Interface between kv_store_plugin and the snapshot kv store, serving
+ * the keys of a local JSON snapshot file
+ */
+
+#ifndef _EII_SNAPSHOT_KV_STORE_PLUGIN_H
+#define _EII_SNAPSHOT_KV_STORE_PLUGIN_H
+
+#include <eii/utils/logger.h>
+#include <eii/config_manager/kv_store_plugin/kv_store_plugin.h>
+
+#define SNAPSHOT_KV_STORE   "snapshot_kv_store"
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/**
+ * snapshot_config object
+ */
+typedef struct {
+    // JSON file mapping every key to its value, like the eii_config.json
+    // generated by builder.py or the etcd_capture_data.json of etcd_capture.py
+    char *file;
+} snapshot_config_t;
+
+/**
+ * Extract config values, create kv_store_client object based on config and
+ * fill kv_store_client's function pointers and kv_store_config which internally
+ * points to @c snapshot_config_t
+ * This function would be called by kv_store_plugin's create_kv_client() internally
+ * @param config - Configuration object
+ * @return kv_store_client instance, or NULL
+ */
+kv_store_client_t* create_snapshot_kv_client(config_t* config);
+
+/**
+ * Free snapshot_config_t and resources held by kv_store_client object
+ @param kv_store_client - @c kv_store_client_t object
+ */
+void snapshot_values_destroy(kv_store_client_t* kv_store_client);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif // _EII_SNAPSHOT_KV_STORE_PLUGIN_H
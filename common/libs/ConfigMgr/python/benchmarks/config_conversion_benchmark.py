@@ -0,0 +1,119 @@
+# Copyright (c) 2020 Intel Corporation.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Benchmark of the conversion of configs from their cJSON tree to python,
+   comparing printing & parsing the JSON (json.loads(cJSON_Print())), the
+   native conversion walking the tree and the lazy view only converting the
+   accessed values. The cJSON parse isn't part of the conversions, it is
+   reported for reference. Lazy views keep their converted values, a fresh
+   view is parsed for each of their iterations.
+
+   Eg: python3 benchmarks/config_conversion_benchmark.py --udfs 1 10 100
+"""
+import json
+import time
+import argparse
+
+from cfgmgr.util import load_config_view
+
+
+def app_config(num_udfs):
+    """VideoIngestion like config with num_udfs udfs
+    """
+    udfs = []
+    for index in range(num_udfs):
+        udfs.append({
+            "name": "pcb.pcb_filter_{}".format(index),
+            "type": "python",
+            "device": "CPU",
+            "model_xml": "common/udfs/python/pcb/ref/model_{}.xml".format(
+                index),
+            "n_total_px": 300000,
+            "n_left_px": 1000,
+            "n_right_px": 1000,
+            "training_mode": False,
+            "scale_ratio": 4.0,
+            "ref_config_roi": [[0.25 * i, 0.5 * i, 0.75 * i, 1.0 * i]
+                               for i in range(8)],
+            "labels": ["label_{}".format(i) for i in range(16)],
+        })
+    return {
+        "encoding": {"type": "jpeg", "level": 95},
+        "ingestor": {
+            "type": "opencv",
+            "pipeline": "./test_videos/pcb_d2000.avi",
+            "loop_video": True,
+            "queue_size": 10,
+            "poll_interval": 0.2,
+        },
+        "sw_trigger": {"init_state": "running"},
+        "max_workers": 4,
+        "udfs": udfs,
+    }
+
+
+def timed(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations
+
+
+def parse_args():
+    """Parse command line arguments.
+    """
+    arg_parse = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parse.add_argument('--udfs', nargs='+', type=int, default=[1, 10, 100],
+                           help='Number of udfs of the configs')
+    arg_parse.add_argument('--iterations', type=int, default=200,
+                           help='Conversions per measure')
+    return arg_parse.parse_args()
+
+
+def main():
+    """main function
+    """
+    args = parse_args()
+    print("{:>5} {:>9} {:>10} {:>10} {:>10} {:>10}".format(
+          "udfs", "bytes", "parse (us)", "json (us)", "native", "lazy"))
+    for num_udfs in args.udfs:
+        config_str = json.dumps(app_config(num_udfs))
+        view = load_config_view(config_str)
+        if view.to_py() != json.loads(view.to_json()):
+            raise Exception("Native conversion differs from json.loads")
+
+        parse = timed(lambda: load_config_view(config_str), args.iterations)
+        json_path = timed(lambda: json.loads(view.to_json()), args.iterations)
+        native = timed(view.to_py, args.iterations)
+
+        views = iter([load_config_view(config_str)
+                      for _ in range(args.iterations)])
+
+        def lazy():
+            config = next(views)
+            return config["ingestor"]["pipeline"], config["udfs"][0]["name"]
+        lazy_path = timed(lazy, args.iterations)
+        print("{:>5} {:>9} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+              num_udfs, len(config_str), parse * 1e6, json_path * 1e6,
+              native * 1e6, lazy_path * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -27,6 +27,7 @@ cdef class Watch:
     """EII ConfigManager Watch class
     """
     cdef app_cfg_t* app_cfg
+    cdef object config_cache
 
     @staticmethod
-    cdef create(app_cfg_t* app_cfg)
\ No newline at end of file
+    cdef create(app_cfg_t* app_cfg, object config_cache=*)
\ No newline at end of file
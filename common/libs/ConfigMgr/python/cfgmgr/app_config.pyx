@@ -21,6 +21,7 @@
 """
 
 from .libeiiconfigmanager cimport *
+from .async_watch import WatchQueue, DEFAULT_MAXSIZE
 
 
 cdef void watch_callback_fn(const char* key, config_t* value, void* func) with gil:
@@ -78,16 +79,19 @@ cdef class Watch:
         self.app_cfg = NULL
 
     @staticmethod
-    cdef create(app_cfg_t* app_cfg):
+    cdef create(app_cfg_t* app_cfg, object config_cache=None):
         """Helper method for initializing the client object.
 
         :param app_cfg: Applications config struct
         :type: struct
+        :param config_cache: cache invalidated by the watch callbacks
+        :type: ConfigCache
         :return: Watch class object
         :rtype: obj
         """
         w = Watch()
         w.app_cfg = app_cfg
+        w.config_cache = config_cache
         return w
 
     def __dealloc__(self):
@@ -100,6 +104,14 @@ cdef class Watch:
         """
         pass
 
+    def _callback(self, pyFunc):
+        """Wraps a python callback to invalidate the cached configs
+           depending on the changed key before calling it
+        """
+        if self.config_cache is None:
+            return pyFunc
+        return self.config_cache.wrap_callback(pyFunc)
+
     def watch(self, key, pyFunc):
         """Method to watch over a given key
            Calls the base C cfgmgr_watch() API
@@ -109,8 +121,9 @@ cdef class Watch:
         :param pyFunc: python function
         :type: object
         """
+        callback = self._callback(pyFunc)
         try:
-            cfgmgr_watch(self.app_cfg.base_cfg, bytes(key, 'utf-8'), watch_callback_fn, <void *> pyFunc)
+            cfgmgr_watch(self.app_cfg.base_cfg, bytes(key, 'utf-8'), watch_callback_fn, <void *> callback)
             return
         except Exception as ex:
             raise Exception("[Watch] Failed to register watch callback {}".format(ex))
@@ -124,8 +137,9 @@ cdef class Watch:
         :param pyFunc: python function
         :type: object
         """
+        callback = self._callback(pyFunc)
         try:
-            cfgmgr_watch_prefix(self.app_cfg.base_cfg, bytes(prefix, 'utf-8'), watch_callback_fn, <void *> pyFunc)
+            cfgmgr_watch_prefix(self.app_cfg.base_cfg, bytes(prefix, 'utf-8'), watch_callback_fn, <void *> callback)
             return
         except Exception as ex:
             raise Exception("[Watch] Failed to register watch_prefix callback {}".format(ex))
@@ -139,8 +153,9 @@ cdef class Watch:
         """
         app_name = self.app_cfg.base_cfg.app_name.decode()
         config_key = "/" + app_name + "/config"
+        callback = self._callback(pyFunc)
         try:
-            cfgmgr_watch(self.app_cfg.base_cfg, bytes(config_key, 'utf-8'), watch_callback_fn, <void *> pyFunc)
+            cfgmgr_watch(self.app_cfg.base_cfg, bytes(config_key, 'utf-8'), watch_callback_fn, <void *> callback)
             return
         except Exception as ex:
             raise Exception("[Watch] Failed to register watch config callback {}".format(ex))
@@ -154,8 +169,85 @@ cdef class Watch:
         """
         app_name = self.app_cfg.base_cfg.app_name.decode()
         interface_key = "/" + app_name + "/interfaces"
+        callback = self._callback(pyFunc)
         try:
-            cfgmgr_watch(self.app_cfg.base_cfg, bytes(interface_key, 'utf-8'), watch_callback_fn, <void *> pyFunc)
+            cfgmgr_watch(self.app_cfg.base_cfg, bytes(interface_key, 'utf-8'), watch_callback_fn, <void *> callback)
             return
         except Exception as ex:
             raise Exception("[Watch] Failed to register watch interface callback {}".format(ex))
+
+    def _watch_queue(self, watch_fn, args, maxsize, coalesce, loop):
+        """Registers a WatchQueue as the callback of a watch
+        """
+        queue = WatchQueue(maxsize, coalesce, loop)
+        watch_fn(*args, queue.put_threadsafe)
+        return queue
+
+    def watch_async(self, key, maxsize=DEFAULT_MAXSIZE, coalesce=True,
+                    loop=None):
+        """Method to watch over a given key from an asyncio event loop
+
+        :param key: key to watch on
+        :type: str
+        :param maxsize: maximum number of pending changes
+        :type: int
+        :param coalesce: only keep the latest pending value of a key
+        :type: bool
+        :param loop: event loop of the consumer, the current one by default
+        :type: asyncio.AbstractEventLoop
+        :return: async iterator of the (key, value) changes
+        :rtype: WatchQueue
+        """
+        return self._watch_queue(self.watch, (key,), maxsize, coalesce, loop)
+
+    def watch_prefix_async(self, prefix, maxsize=DEFAULT_MAXSIZE,
+                           coalesce=True, loop=None):
+        """Method to watch over a given prefix from an asyncio event loop
+
+        :param prefix: prefix to watch on
+        :type: str
+        :param maxsize: maximum number of pending changes
+        :type: int
+        :param coalesce: only keep the latest pending value of a key
+        :type: bool
+        :param loop: event loop of the consumer, the current one by default
+        :type: asyncio.AbstractEventLoop
+        :return: async iterator of the (key, value) changes
+        :rtype: WatchQueue
+        """
+        return self._watch_queue(self.watch_prefix, (prefix,), maxsize,
+                                 coalesce, loop)
+
+    def watch_config_async(self, maxsize=DEFAULT_MAXSIZE, coalesce=True,
+                           loop=None):
+        """Method to watch over an application's config from an asyncio
+           event loop
+
+        :param maxsize: maximum number of pending changes
+        :type: int
+        :param coalesce: only keep the latest pending value of a key
+        :type: bool
+        :param loop: event loop of the consumer, the current one by default
+        :type: asyncio.AbstractEventLoop
+        :return: async iterator of the (key, value) changes
+        :rtype: WatchQueue
+        """
+        return self._watch_queue(self.watch_config, (), maxsize, coalesce,
+                                 loop)
+
+    def watch_interface_async(self, maxsize=DEFAULT_MAXSIZE, coalesce=True,
+                              loop=None):
+        """Method to watch over an application's interfaces from an asyncio
+           event loop
+
+        :param maxsize: maximum number of pending changes
+        :type: int
+        :param coalesce: only keep the latest pending value of a key
+        :type: bool
+        :param loop: event loop of the consumer, the current one by default
+        :type: asyncio.AbstractEventLoop
+        :return: async iterator of the (key, value) changes
+        :rtype: WatchQueue
+        """
+        return self._watch_queue(self.watch_interface, (), maxsize, coalesce,
+                                 loop)
@@ -0,0 +1,195 @@
+# Copyright (c) 2020 Intel Corporation.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""asyncio integration of the ConfigMgr watches
+"""
+
+import asyncio
+import collections
+import threading
+import time
+
+from .exc import WatchQueueClosed
+
+# Default number of pending changes of a WatchQueue
+DEFAULT_MAXSIZE = 128
+
+
+class WatchQueue:
+    """Bounded queue feeding the changes of watched keys into an asyncio
+       event loop
+
+    The watch callbacks run on the watch threads of the C layer, they only
+    store the change & wake the event loop up, so a slow consumer never
+    stalls the watch stream. The pending changes of a key are coalesced, only
+    its latest value being delivered. Once maxsize changes are pending, the
+    oldest one is dropped.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, coalesce=True, loop=None):
+        """Constructor
+
+        :param maxsize: maximum number of pending changes
+        :type maxsize: int
+        :param coalesce: only keep the latest pending value of a key
+        :type coalesce: bool
+        :param loop: event loop of the consumer, the current one by default
+        :type loop: asyncio.AbstractEventLoop
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.coalesce = coalesce
+        self.loop = loop or asyncio.get_event_loop()
+        # (key, value, time queued) by key when coalescing, by sequence
+        # number otherwise
+        self.pending = collections.OrderedDict()
+        self.sequence = 0
+        self.lock = threading.Lock()
+        # Only one wake up of the loop at a time is scheduled, whatever the
+        # rate of the changes
+        self.wakeup_scheduled = False
+        self.waiter = None
+        self.closed = False
+        self.received = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.max_pending = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    def put_threadsafe(self, key, value):
+        """Watch callback queuing a change, called from any thread
+
+        :param key: changed key
+        :type key: str
+        :param value: new value
+        :type value: str
+        """
+        now = time.perf_counter()
+        with self.lock:
+            if self.closed:
+                return
+            self.received += 1
+            if self.coalesce and key in self.pending:
+                # Keeps the position & queuing time of the first change
+                _, _, queued = self.pending[key]
+                self.pending[key] = (key, value, queued)
+                self.coalesced += 1
+            else:
+                if len(self.pending) >= self.maxsize:
+                    self.pending.popitem(last=False)
+                    self.dropped += 1
+                entry_key = key if self.coalesce else self.sequence
+                self.sequence += 1
+                self.pending[entry_key] = (key, value, now)
+                self.max_pending = max(self.max_pending, len(self.pending))
+            if self.wakeup_scheduled:
+                return
+            self.wakeup_scheduled = True
+        self._schedule_wakeup()
+
+    def _schedule_wakeup(self):
+        try:
+            self.loop.call_soon_threadsafe(self._wakeup)
+        except RuntimeError:
+            # Event loop closed, nobody is waiting anymore
+            pass
+
+    def _wakeup(self):
+        with self.lock:
+            self.wakeup_scheduled = False
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def get_nowait(self):
+        """Returns the oldest pending change
+
+        :return: changed key & its new value, None if no change is pending
+        :rtype: tuple
+        """
+        with self.lock:
+            if not self.pending:
+                if self.closed:
+                    raise WatchQueueClosed("[Watch] Queue closed")
+                return None
+            _, (key, value, queued) = self.pending.popitem(last=False)
+            lag = time.perf_counter() - queued
+            self.delivered += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+        return key, value
+
+    async def get(self):
+        """Waits for the next change, to be called from the event loop of
+           the queue
+
+        :return: changed key & its new value
+        :rtype: tuple
+        """
+        while True:
+            change = self.get_nowait()
+            if change is not None:
+                return change
+            self.waiter = self.loop.create_future()
+            try:
+                await self.waiter
+            finally:
+                self.waiter = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.get()
+        except WatchQueueClosed:
+            raise StopAsyncIteration
+
+    def close(self):
+        """Stops queuing the changes, the iteration ends once the pending
+           ones are consumed. Can be called from any thread
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self.wakeup_scheduled:
+                return
+            self.wakeup_scheduled = True
+        self._schedule_wakeup()
+
+    def stats(self):
+        """Returns the back-pressure counters of the queue
+
+        :return: received, delivered, coalesced & dropped changes, current &
+                 maximum pending changes, mean & maximum time in seconds a
+                 change waited for the consumer
+        :rtype: dict
+        """
+        with self.lock:
+            return {"received": self.received,
+                    "delivered": self.delivered,
+                    "coalesced": self.coalesced,
+                    "dropped": self.dropped,
+                    "pending": len(self.pending),
+                    "max_pending": self.max_pending,
+                    "mean_lag": self.total_lag / max(self.delivered, 1),
+                    "max_lag": self.max_lag}
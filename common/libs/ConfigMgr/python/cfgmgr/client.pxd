@@ -29,6 +29,9 @@ cdef class Client:
     """
     cdef app_cfg_t* app_cfg
     cdef client_cfg_t* client_cfg
+    cdef object config_cache
+    cdef object cache_key
 
     @staticmethod
-    cdef create(app_cfg_t* app_cfg, client_cfg_t* client_cfg)
+    cdef create(app_cfg_t* app_cfg, client_cfg_t* client_cfg, object config_cache=*,
+                object cache_key=*)
@@ -25,7 +25,7 @@ import json
 from .libeiiconfigmanager cimport *
 from libc.stdlib cimport malloc
 from libc.stdlib cimport free
-from .util cimport Util
+from .util cimport Util, cjson_to_py
 
 
 cdef class Client:
@@ -47,19 +47,26 @@ cdef class Client:
         self.client_cfg = NULL
 
     @staticmethod
-    cdef create(app_cfg_t* app_cfg, client_cfg_t* client_cfg):
+    cdef create(app_cfg_t* app_cfg, client_cfg_t* client_cfg, object config_cache=None,
+                object cache_key=None):
         """Helper method for initializing the client object.
 
         :param app_cfg: Applications config struct
         :type: struct
         :param client_cfg: Client config struct
         :type: struct
+        :param config_cache: cache of the msgbus configs
+        :type: ConfigCache
+        :param cache_key: key of the msgbus config in the cache
+        :type: tuple
         :return: Client class object
         :rtype: obj
         """
         c = Client()
         c.app_cfg = app_cfg
         c.client_cfg = client_cfg
+        c.config_cache = config_cache
+        c.cache_key = cache_key
         return c
 
     def __dealloc__(self):
@@ -74,26 +81,39 @@ cdef class Client:
             client_cfg_config_destroy(self.client_cfg)
 
     def get_msgbus_config(self):
-        """Constructs message bus config for Client
+        """Constructs message bus config for Client, parsed once and
+           cached until a Watch callback reports a change in etcd
 
-        :return: Messagebus config
+        :return: Messagebus config, read only
+        :rtype: dict
+        """
+        if self.config_cache is None:
+            return self._load_msgbus_config()
+        return self.config_cache.get(self.cache_key,
+                                     self._load_msgbus_config)
+
+    def _load_msgbus_config(self):
+        """Constructs message bus config for Client from the base c layer
+
+        :return: Messagebus config, read only if cached
         :rtype: dict
         """
-        cdef char* config
         cdef config_t* msgbus_config
         try:
             msgbus_config = self.client_cfg.cfgmgr_get_msgbus_config_client(self.app_cfg.base_cfg,self.client_cfg)
             if msgbus_config is NULL:
                 raise Exception("[Client] Getting msgbus config from base c layer failed")
         
-            config = configt_to_char(msgbus_config)
-            if config is NULL:
-                raise Exception("[Client] config failed to get converted to char")
-
-            config_str = config.decode('utf-8')
-            free(config)
-            config_destroy(msgbus_config)
-            return json.loads(config_str)
+
+            try:
+                # Converted from the cJSON tree, without printing & parsing
+                # it again
+                if msgbus_config.cfg is NULL:
+                    raise Exception("[Client] msgbus config is empty")
+                return cjson_to_py(<cJSON*>msgbus_config.cfg,
+                                   self.config_cache is not None)
+            finally:
+                config_destroy(msgbus_config)
         except Exception as ex:
             raise ex
 
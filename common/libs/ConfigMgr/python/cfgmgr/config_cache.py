@@ -0,0 +1,211 @@
+# Copyright (c) 2020 Intel Corporation.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Read-through cache of the configs converted from the ConfigMgr C layer
+"""
+
+import threading
+import time
+
+# Cache keys of the app config & interfaces, the message bus configs are
+# cached under (interface type, name or index) keys
+APP_CONFIG = 'config'
+APP_INTERFACES = 'interfaces'
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("Cached ConfigMgr configs are read only, use "
+                    "copy.deepcopy() to get a modifiable copy")
+
+
+class FrozenDict(dict):
+    """Read only dict of a cached config. Still a dict, so it can be
+       serialized to JSON & passed to the message bus as is
+    """
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = \
+        update = __ior__ = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (dict, (thaw(self),))
+
+
+class FrozenList(list):
+    """Read only list of a cached config
+    """
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = append = extend = \
+        insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (list, (thaw(self),))
+
+
+def freeze(value):
+    """Converts the dicts & lists of a parsed config to read only ones
+
+    :param value: parsed JSON value
+    :type value: any
+    :return: read only value
+    :rtype: any
+    """
+    if isinstance(value, (FrozenDict, FrozenList)):
+        # Already built read only by the native conversion
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Returns a modifiable copy of a frozen config
+
+    :param value: frozen value
+    :type value: any
+    :return: modifiable copy
+    :rtype: any
+    """
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ConfigCache:
+    """Configs of an application, parsed once from the C layer
+
+    The C layer keeps the app config & interfaces read at start up, so a
+    cached entry only gets outdated when its etcd key changes. Watch
+    callbacks invalidate the entries depending on the changed key.
+    """
+
+    def __init__(self, app_name):
+        """Constructor
+
+        :param app_name: name of the application
+        :type app_name: str
+        """
+        self.config_key = "/" + app_name + "/config"
+        self.entries = {}
+        # Incremented on every invalidation, so a config loaded while its
+        # key changed isn't cached
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.parse_time = 0.0
+        # Keeps the Watch callbacks alive, the C layer only holds pointers
+        # to them
+        self.callbacks = []
+
+    def get(self, key, load):
+        """Returns a cached config, loading it on a miss
+
+        :param key: cache key
+        :type key: hashable
+        :param load: function loading the config from the C layer
+        :type load: function
+        :return: frozen config
+        :rtype: any
+        """
+        value = self.entries.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        generation = self.generation
+        start = time.perf_counter()
+        value = freeze(load())
+        with self.lock:
+            self.misses += 1
+            self.parse_time += time.perf_counter() - start
+            if generation == self.generation:
+                self.entries[key] = value
+        return value
+
+    def invalidate(self, etcd_key):
+        """Drops the entries depending on a changed etcd key. The app config
+           only depends on its own key, the message bus configs and
+           interfaces depend on the interfaces & keys of other apps
+
+        :param etcd_key: changed key
+        :type etcd_key: str
+        """
+        with self.lock:
+            self.generation += 1
+            self.invalidations += 1
+            if etcd_key == self.config_key:
+                self.entries.pop(APP_CONFIG, None)
+                return
+        self.clear_interfaces()
+
+    def clear_interfaces(self):
+        """Drops the interfaces & message bus configs, eg: once the topics
+           of an interface are changed
+        """
+        with self.lock:
+            self.generation += 1
+            self.entries = {key: value for key, value in self.entries.items()
+                            if key == APP_CONFIG}
+
+    def clear(self):
+        """Drops all the entries
+        """
+        with self.lock:
+            self.generation += 1
+            self.entries = {}
+
+    def wrap_callback(self, callback):
+        """Returns a watch callback invalidating the cache before calling
+           the user's one
+
+        :param callback: user callback, called with the key & new value
+        :type callback: function
+        :return: wrapping callback
+        :rtype: function
+        """
+        def invalidating_callback(key, value):
+            self.invalidate(key)
+            callback(key, value)
+        self.callbacks.append(invalidating_callback)
+        return invalidating_callback
+
+    def stats(self):
+        """Returns the counters of the cache
+
+        :return: hits, misses, invalidations & total parse time in seconds
+        :rtype: dict
+        """
+        return {"hits": self.hits, "misses": self.misses,
+                "invalidations": self.invalidations,
+                "parse_time": self.parse_time,
+                "entries": len(self.entries)}
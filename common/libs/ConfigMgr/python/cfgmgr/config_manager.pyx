@@ -31,9 +31,11 @@ from .libeiiconfigmanager cimport *
 from .publisher cimport Publisher
 from .subscriber cimport Subscriber
 from .app_config import AppCfg
+from .config_cache import ConfigCache, APP_CONFIG, APP_INTERFACES
 from .app_config cimport Watch
 from .server cimport Server
 from .client cimport Client
+from .util cimport cjson_to_py, ConfigObjectView
 from libc.stdlib cimport free
 
 
@@ -45,6 +47,7 @@ cdef class ConfigMgr:
     cdef sub_cfg_t* sub_cfg
     cdef server_cfg_t* server_cfg
     cdef client_cfg_t* client_cfg
+    cdef object config_cache
 
     def __init__(self):
         """Constructor
@@ -58,6 +61,8 @@ cdef class ConfigMgr:
             self.app_cfg = app_cfg_new()
             if self.app_cfg == NULL:
                 raise Exception("app_cfg is NULL in config_manager")
+            self.config_cache = ConfigCache(
+                self.app_cfg.base_cfg.app_name.decode())
             # Setting /GlobalEnv/ env variables
             env_var = self.app_cfg.env_var
             if env_var is NULL:
@@ -89,30 +94,97 @@ cdef class ConfigMgr:
             app_cfg_config_destroy(self.app_cfg)
 
     def get_app_config(self):
-        """gets AppCfg object respective applications config
+        """gets AppCfg object respective applications config. The config is
+           parsed once and cached until a Watch callback reports a change of
+           the '/<appname>/config' key
 
-        :return: Return object of class AppCfg
+        :return: Return object of class AppCfg, read only
         :rtype: obj
         """
+        return AppCfg(self.config_cache.get(APP_CONFIG,
+                                            self._load_app_config))
+
+    def _load_app_config(self):
+        """Converts the applications config of the base c layer, walking its
+           cJSON tree instead of printing & parsing it
+
+        :return: applications config, read only
+        :rtype: dict
+        """
         cdef config_t* conf
-        cdef char* config
         try: 
             conf = get_app_config(self.app_cfg.base_cfg)
-            if conf is NULL:
+            if conf is NULL or conf.cfg is NULL:
                 raise Exception("[GetAppConfig] Conf received from base c layer is NULL")
 
-            config = configt_to_char(conf)
-            if config is NULL:
-                raise Exception("[GetAppConfig] Configt to char conversion failed")
-                
-            config_str = config.decode('utf-8')
-            cfg = json.loads(config_str)
-
-            obj = AppCfg(cfg)
-            return obj
+            return cjson_to_py(<cJSON*>conf.cfg, True)
         except Exception as ex:
             raise ex
 
+    def get_app_config_view(self):
+        """gets a lazy view of the applications config, converting its
+           values only when they are accessed. Large configs (eg: ingestor,
+           udfs) can be read without converting all of them
+
+        :return: read only mapping of the applications config
+        :rtype: ConfigObjectView
+        """
+        cdef config_t* conf
+        conf = get_app_config(self.app_cfg.base_cfg)
+        if conf is NULL or conf.cfg is NULL:
+            raise Exception("[GetAppConfig] Conf received from base c layer is NULL")
+
+        # The view keeps this object, owning the config, alive
+        return ConfigObjectView.create(<cJSON*>conf.cfg, self)
+
+    def get_app_interface(self):
+        """gets applications interfaces, parsed once and cached until a
+           Watch callback reports a change in etcd
+
+        :return: applications interfaces, read only
+        :rtype: dict
+        """
+        return self.config_cache.get(APP_INTERFACES,
+                                     self._load_app_interface)
+
+    def _load_app_interface(self):
+        """Converts the applications interfaces of the base c layer
+
+        :return: applications interfaces
+        :rtype: dict
+        """
+        cdef config_t* conf
+        conf = get_app_interface(self.app_cfg.base_cfg)
+        if conf is NULL or conf.cfg is NULL:
+            raise Exception("[GetAppInterface] Interface received from base c layer is NULL")
+
+        return cjson_to_py(<cJSON*>conf.cfg, True)
+
+    def get_cache_stats(self):
+        """Counters of the cached configs
+
+        :return: hits, misses, invalidations, entries & total time in seconds
+                 spent converting configs from the base c layer
+        :rtype: dict
+        """
+        return self.config_cache.stats()
+
+    def get_startup_stats(self):
+        """Timings of the start up of the base c layer
+
+        :return: kv store init, prefetch & fetch times and total time in
+                 seconds, and number of prefetched keys (-1 if the prefetch
+                 failed)
+        :rtype: dict
+        """
+        cdef cfgmgr_startup_stats_t stats = self.app_cfg.startup_stats
+        return {
+            'init': stats.init_us / 1e6,
+            'prefetch': stats.prefetch_us / 1e6,
+            'prefetched_keys': stats.prefetched_keys,
+            'fetch': stats.fetch_us / 1e6,
+            'total': stats.total_us / 1e6,
+        }
 
     def get_watch_obj(self):
         """Fetching the object to call watch APIs
@@ -121,7 +193,7 @@ cdef class ConfigMgr:
         :rtype : obj
         """
         try:
-            w = Watch.create(self.app_cfg)
+            w = Watch.create(self.app_cfg, self.config_cache)
             return w
         except Exception as ex:
             raise Exception("[Watch] Failed to fetch watch object {}".format(ex))
@@ -185,7 +257,8 @@ cdef class ConfigMgr:
                 raise Exception("pub_cfg is NULL in config_manager base c layer")
 
             # Create & return Publisher object
-            return Publisher.create(self.app_cfg, self.pub_cfg)
+            return Publisher.create(self.app_cfg, self.pub_cfg,
+                                    self.config_cache, ("Publishers", name))
         except Exception as ex:
             raise ex
 
@@ -204,7 +277,8 @@ cdef class ConfigMgr:
                 raise Exception("pub_cfg is NULL in config_manager base c layer")
 
             # Create & return Publisher object
-            return Publisher.create(self.app_cfg, self.pub_cfg)
+            return Publisher.create(self.app_cfg, self.pub_cfg,
+                                    self.config_cache, ("Publishers", index))
         except Exception as ex:
             raise ex
 
@@ -223,7 +297,8 @@ cdef class ConfigMgr:
                 raise Exception("sub_cfg is NULL in config_manager base c layer")
 
             # Create & return Subscriber object
-            return Subscriber.create(self.app_cfg, self.sub_cfg)
+            return Subscriber.create(self.app_cfg, self.sub_cfg,
+                                     self.config_cache, ("Subscribers", name))
         except Exception as ex:
             raise ex
         
@@ -242,7 +317,8 @@ cdef class ConfigMgr:
                 raise Exception("sub_cfg is NULL in config_manager in base c layer")
 
             # Create & return Subscriber object
-            return Subscriber.create(self.app_cfg, self.sub_cfg)
+            return Subscriber.create(self.app_cfg, self.sub_cfg,
+                                     self.config_cache, ("Subscribers", index))
         except Exception as ex:
             raise ex
 
@@ -262,7 +338,8 @@ cdef class ConfigMgr:
                 raise Exception("server_cfg is NULL in config_manager base c layer")
 
             # Create & return Server object
-            return Server.create(self.app_cfg, self.server_cfg)
+            return Server.create(self.app_cfg, self.server_cfg,
+                                 self.config_cache, ("Servers", name))
         except Exception as ex:
             raise ex
 
@@ -281,7 +358,8 @@ cdef class ConfigMgr:
                 raise Exception("server_cfg is NULL in config_manager base c layer")
 
             # Create & return Server object
-            return Server.create(self.app_cfg, self.server_cfg)
+            return Server.create(self.app_cfg, self.server_cfg,
+                                 self.config_cache, ("Servers", index))
         except Exception as ex:
             raise ex
 
@@ -300,7 +378,8 @@ cdef class ConfigMgr:
                 raise Exception("client_cfg is NULL in config_manager base c layer")
 
             # Create & return Client object
-            return Client.create(self.app_cfg, self.client_cfg)
+            return Client.create(self.app_cfg, self.client_cfg,
+                                 self.config_cache, ("Clients", name))
         except Exception as ex:
             raise ex
 
@@ -318,7 +397,8 @@ cdef class ConfigMgr:
                 raise Exception("client_cfg is NULL in config_manager base c layer")
 
             # Create & return Client object
-            return Client.create(self.app_cfg, self.client_cfg)
+            return Client.create(self.app_cfg, self.client_cfg,
+                                 self.config_cache, ("Clients", index))
         except Exception as ex:
             raise ex
 
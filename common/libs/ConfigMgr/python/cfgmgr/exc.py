@@ -22,4 +22,8 @@
 
 
 class InitializationFailed(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class WatchQueueClosed(Exception):
+    pass
@@ -25,9 +25,37 @@ from libc.stdint cimport *
 cdef extern from "stdbool.h":
     ctypedef bint bool
 
+cdef extern from "cjson/cJSON.h" nogil:
+    # cJSON tree of the config_t & config_value_t objects and arrays
+    ctypedef struct cJSON:
+        cJSON* next
+        cJSON* prev
+        cJSON* child
+        int type
+        char* valuestring
+        int valueint
+        double valuedouble
+        char* string
+
+    int cJSON_Invalid
+    int cJSON_False
+    int cJSON_True
+    int cJSON_NULL
+    int cJSON_Number
+    int cJSON_String
+    int cJSON_Array
+    int cJSON_Object
+    int cJSON_Raw
+
+    cJSON* cJSON_Parse(const char* value)
+    char* cJSON_Print(const cJSON* item)
+    void cJSON_Delete(cJSON* item)
+    void cJSON_free(void* object)
+
 cdef extern from "eii/config_manager/cfg_mgr.h" nogil:
     ctypedef struct config_t:
-        pass
+        # cJSON* of the config
+        void* cfg
 
     ctypedef struct kv_store_client_t:
         pass
@@ -97,9 +125,17 @@ cdef extern from "eii/config_manager/cfg_mgr.h" nogil:
         config_value_t* (*cfgmgr_get_interface_value_client)(void* client_config, const char* key)
         config_value_t* (*cfgmgr_get_endpoint_client)(void* client_config)
 
+    ctypedef struct cfgmgr_startup_stats_t:
+        long init_us
+        long prefetch_us
+        long prefetched_keys
+        long fetch_us
+        long total_us
+
     ctypedef struct app_cfg_t:
         base_cfg_t* base_cfg
         char* env_var
+        cfgmgr_startup_stats_t startup_stats
 
     # C callback type definition
     ctypedef void (*callback_t)(const char* key, config_t* value, void* cb_user_data)
@@ -29,6 +29,9 @@ cdef class Publisher:
     """
     cdef app_cfg_t* app_cfg
     cdef pub_cfg_t* pub_cfg
+    cdef object config_cache
+    cdef object cache_key
 
     @staticmethod
-    cdef create(app_cfg_t* app_cfg, pub_cfg_t* pub_cfg)
+    cdef create(app_cfg_t* app_cfg, pub_cfg_t* pub_cfg, object config_cache=*,
+                object cache_key=*)
@@ -25,7 +25,7 @@ import json
 from .libeiiconfigmanager cimport *
 from libc.stdlib cimport malloc
 from libc.stdlib cimport free
-from .util cimport Util
+from .util cimport Util, cjson_to_py
 import logging
 
 
@@ -45,19 +45,26 @@ cdef class Publisher:
         self.pub_cfg = NULL
 
     @staticmethod
-    cdef create(app_cfg_t* app_cfg, pub_cfg_t* pub_cfg):
+    cdef create(app_cfg_t* app_cfg, pub_cfg_t* pub_cfg, object config_cache=None,
+                object cache_key=None):
         """Helper method for initializing the client object.
 
         :param app_cfg: Applications config struct
         :type: struct
         :param pub_cfg: Publisher config struct
         :type: struct
+        :param config_cache: cache of the msgbus configs
+        :type: ConfigCache
+        :param cache_key: key of the msgbus config in the cache
+        :type: tuple
         :return: Publisher class object
         :rtype: obj
         """
         p = Publisher()
         p.app_cfg = app_cfg
         p.pub_cfg = pub_cfg
+        p.config_cache = config_cache
+        p.cache_key = cache_key
         return p
 
     def __dealloc__(self):
@@ -72,26 +79,38 @@ cdef class Publisher:
             pub_cfg_config_destroy(self.pub_cfg)
 
     def get_msgbus_config(self):
-        """Constructs message bus config for Publisher
+        """Constructs message bus config for Publisher, parsed once and
+           cached until a Watch callback reports a change in etcd
 
-        :return: Messagebus config
+        :return: Messagebus config, read only
+        :rtype: dict
+        """
+        if self.config_cache is None:
+            return self._load_msgbus_config()
+        return self.config_cache.get(self.cache_key,
+                                     self._load_msgbus_config)
+
+    def _load_msgbus_config(self):
+        """Constructs message bus config for Publisher from the base c layer
+
+        :return: Messagebus config, read only if cached
         :rtype: dict
         """
-        cdef char* config
         cdef config_t* msgbus_config
         try:
             msgbus_config = self.pub_cfg.cfgmgr_get_msgbus_config_pub(self.app_cfg.base_cfg, self.pub_cfg)
             if msgbus_config is NULL:
                 raise Exception("[Publisher] Getting msgbus config from base c layer failed")
 
-            config = configt_to_char(msgbus_config)
-            if config is NULL:
-                raise Exception("[Publisher] config failed to get converted to char")
-
-            config_str = config.decode('utf-8')
-            free(config)
-            config_destroy(msgbus_config)
-            return json.loads(config_str)
+            try:
+                # Converted from the cJSON tree, without printing & parsing
+                # it again
+                if msgbus_config.cfg is NULL:
+                    raise Exception("[Publisher] msgbus config is empty")
+                return cjson_to_py(<cJSON*>msgbus_config.cfg,
+                                   self.config_cache is not None)
+            finally:
+                config_destroy(msgbus_config)
         except Exception as ex:
             raise ex
 
@@ -257,6 +276,8 @@ cdef class Publisher:
             topics_set = self.pub_cfg.cfgmgr_set_topics_pub(topics_to_be_set, len(topics_list), self.app_cfg.base_cfg, self.pub_cfg)
             if topics_set is not 0 :
                 raise Exception("[Publisher] Set Topics in base c layer failed")
+            if self.config_cache is not None:
+                self.config_cache.clear_interfaces()
             free(topics_to_be_set)
             return topics_set
         except Exception as ex:
@@ -29,6 +29,9 @@ cdef class Server:
     """
     cdef app_cfg_t* app_cfg
     cdef server_cfg_t* server_cfg
+    cdef object config_cache
+    cdef object cache_key
 
     @staticmethod
-    cdef create(app_cfg_t* app_cfg, server_cfg_t* server_cfg)
+    cdef create(app_cfg_t* app_cfg, server_cfg_t* server_cfg, object config_cache=*,
+                object cache_key=*)
@@ -29,7 +29,10 @@ cdef class Subscriber:
     """
     cdef app_cfg_t* app_cfg
     cdef sub_cfg_t* sub_cfg
+    cdef object config_cache
+    cdef object cache_key
 
     @staticmethod
-    cdef create(app_cfg_t* app_cfg, sub_cfg_t* sub_cfg)
+    cdef create(app_cfg_t* app_cfg, sub_cfg_t* sub_cfg, object config_cache=*,
+                object cache_key=*)
 
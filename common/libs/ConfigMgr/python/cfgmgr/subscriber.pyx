@@ -26,7 +26,7 @@ import json
 from .libeiiconfigmanager cimport *
 from libc.stdlib cimport malloc
 from libc.stdlib cimport free
-from .util cimport Util
+from .util cimport Util, cjson_to_py
 
 
 cdef class Subscriber:
@@ -45,19 +45,26 @@ cdef class Subscriber:
         self.sub_cfg = NULL
 
     @staticmethod
-    cdef create(app_cfg_t* app_cfg, sub_cfg_t* sub_cfg):
+    cdef create(app_cfg_t* app_cfg, sub_cfg_t* sub_cfg, object config_cache=None,
+                object cache_key=None):
         """Helper method for initializing the client object.
 
         :param app_cfg: Applications config struct
         :type: struct
         :param sub_cfg: Subscriber config struct
         :type: struct
+        :param config_cache: cache of the msgbus configs
+        :type: ConfigCache
+        :param cache_key: key of the msgbus config in the cache
+        :type: tuple
         :return: Subscriber class object
         :rtype: obj
         """
         s = Subscriber()
         s.app_cfg = app_cfg
         s.sub_cfg = sub_cfg
+        s.config_cache = config_cache
+        s.cache_key = cache_key
         return s
 
     def __dealloc__(self):
@@ -72,26 +79,38 @@ cdef class Subscriber:
             sub_cfg_config_destroy(self.sub_cfg)
 
     def get_msgbus_config(self):
-        """Constructs message bus config for Subscriber
+        """Constructs message bus config for Subscriber, parsed once and
+           cached until a Watch callback reports a change in etcd
 
-        :return: Messagebus config
+        :return: Messagebus config, read only
+        :rtype: dict
+        """
+        if self.config_cache is None:
+            return self._load_msgbus_config()
+        return self.config_cache.get(self.cache_key,
+                                     self._load_msgbus_config)
+
+    def _load_msgbus_config(self):
+        """Constructs message bus config for Subscriber from the base c layer
+
+        :return: Messagebus config, read only if cached
         :rtype: dict
         """
-        cdef char* config
         cdef config_t* msgbus_config
         try:
             msgbus_config = self.sub_cfg.cfgmgr_get_msgbus_config_sub(self.app_cfg.base_cfg, self.sub_cfg)
             if msgbus_config is NULL:
                 raise Exception("[Subscriber] Getting msgbus config from base c layer failed")
 
-            config = configt_to_char(msgbus_config)
-            if config is NULL:
-                    raise Exception("[Subscriber] config failed to get converted to char")
-
-            config_str = config.decode('utf-8')
-            free(config)
-            config_destroy(msgbus_config)
-            return json.loads(config_str)
+            try:
+                # Converted from the cJSON tree, without printing & parsing
+                # it again
+                if msgbus_config.cfg is NULL:
+                    raise Exception("[Subscriber] msgbus config is empty")
+                return cjson_to_py(<cJSON*>msgbus_config.cfg,
+                                   self.config_cache is not None)
+            finally:
+                config_destroy(msgbus_config)
         except Exception as ex:
             raise ex
 
@@ -218,6 +237,8 @@ cdef class Subscriber:
             topics_set = self.sub_cfg.cfgmgr_set_topics_sub(topics_to_be_set, len(topics_list), self.app_cfg.base_cfg, self.sub_cfg)
             if topics_set is not 0 :
                     raise Exception("[Subscriber] Set Topics in base c layer failed")
+            if self.config_cache is not None:
+                self.config_cache.clear_interfaces()
             free(topics_to_be_set)
             return topics_set
         except Exception as ex:
@@ -20,7 +20,36 @@
 """EII ConfigManager Util class
 """
 
-from .libeiiconfigmanager cimport config_value_t
+from .libeiiconfigmanager cimport config_value_t, cJSON
+
+
+cdef object cjson_to_py(const cJSON* item, bint frozen=*)
+
+
+cdef class ConfigObjectView:
+    """Lazy view of a config object
+    """
+    cdef const cJSON* node
+    cdef object owner
+    cdef dict converted
+
+    @staticmethod
+    cdef create(const cJSON* node, object owner)
+
+    cdef const cJSON* _find(self, key)
+
+
+cdef class ConfigArrayView:
+    """Lazy view of a config array
+    """
+    cdef const cJSON* node
+    cdef object owner
+    cdef int length
+    cdef list items
+    cdef list done
+
+    @staticmethod
+    cdef create(const cJSON* node, object owner)
 
 
 cdef class Util:
@@ -21,9 +21,348 @@
 """
 
 import json
+from collections.abc import Mapping, Sequence
 
 from .libeiiconfigmanager cimport *
 from libc.stdlib cimport malloc
+from libc.math cimport isnan, isinf
+from libc.string cimport strcmp
+from .config_cache import FrozenDict, FrozenList
+
+# Integral numbers below this are printed by cJSON as integers, with
+# 15 significant digits
+cdef double CJSON_EXACT_INTEGER = 1e15
+# Type bits of a cJSON item, without the reference & const string flags
+cdef int CJSON_TYPE_MASK = 0xFF
+
+
+cdef object cjson_number(const cJSON* item):
+    """Converts a cJSON number to the int or float json.loads() gives for
+       the text printed by cJSON_Print()
+    """
+    cdef double number = item.valuedouble
+    if isnan(number) or isinf(number):
+        # Printed as null
+        return None
+    if -CJSON_EXACT_INTEGER < number < CJSON_EXACT_INTEGER and \
+       number == <double><long long>number:
+        return <long long>number
+    text = "%1.15g" % number
+    if float(text) != number:
+        text = "%1.17g" % number
+    if "." in text or "e" in text:
+        return float(text)
+    return int(text)
+
+
+cdef object cjson_to_py(const cJSON* item, bint frozen=False):
+    """Converts a cJSON tree to python dicts, lists & scalars, as
+       json.loads() of the text printed by cJSON_Print() would
+
+    :param item: cJSON item
+    :type: struct
+    :param frozen: whether to build the read only FrozenDict & FrozenList
+    :type: bool
+    :return: value of the item
+    :rtype: integer/string/float/boolean/dict/list/None
+    """
+    cdef const cJSON* child
+    cdef int item_type = item.type & CJSON_TYPE_MASK
+    if item_type == cJSON_String:
+        return item.valuestring.decode('utf-8')
+    elif item_type == cJSON_Number:
+        return cjson_number(item)
+    elif item_type == cJSON_Object:
+        value = {}
+        child = item.child
+        while child is not NULL:
+            value[child.string.decode('utf-8')] = cjson_to_py(child, frozen)
+            child = child.next
+        return FrozenDict(value) if frozen else value
+    elif item_type == cJSON_Array:
+        value = []
+        child = item.child
+        while child is not NULL:
+            value.append(cjson_to_py(child, frozen))
+            child = child.next
+        return FrozenList(value) if frozen else value
+    elif item_type == cJSON_True:
+        return True
+    elif item_type == cJSON_False:
+        return False
+    elif item_type == cJSON_NULL:
+        return None
+    elif item_type == cJSON_Raw:
+        return json.loads(item.valuestring.decode('utf-8'))
+    raise TypeError("Invalid cJSON item of type {}".format(item.type))
+
+
+cdef object cjson_to_view(const cJSON* item, object owner):
+    """Returns a lazy view of objects & arrays, the value of scalars
+    """
+    cdef int item_type = item.type & CJSON_TYPE_MASK
+    if item_type == cJSON_Object:
+        return ConfigObjectView.create(item, owner)
+    elif item_type == cJSON_Array:
+        return ConfigArrayView.create(item, owner)
+    return cjson_to_py(item)
+
+
+cdef class CJSONDocument:
+    """Owner of a cJSON tree parsed from a JSON string
+    """
+    cdef cJSON* root
+
+    def __cinit__(self, *args, **kwargs):
+        self.root = NULL
+
+    def __dealloc__(self):
+        if self.root != NULL:
+            cJSON_Delete(self.root)
+
+
+def load_config_view(config_str):
+    """Parses a JSON config into a lazy view, without converting it
+
+    :param config_str: JSON config
+    :type: str
+    :return: ConfigObjectView or ConfigArrayView of the config
+    :rtype: obj
+    """
+    cdef CJSONDocument document = CJSONDocument()
+    document.root = cJSON_Parse(config_str.encode('utf-8'))
+    if document.root is NULL:
+        raise ValueError("Failed to parse the config")
+    return cjson_to_view(document.root, document)
+
+
+cdef class ConfigObjectView:
+    """Read only mapping of a config object, converting its values only
+       when they are accessed. Objects & arrays are returned as views,
+       converted values are kept for the next accesses.
+    """
+
+    def __cinit__(self, *args, **kwargs):
+        self.node = NULL
+
+    @staticmethod
+    cdef create(const cJSON* node, object owner):
+        """Helper method for initializing the view
+
+        :param node: cJSON object
+        :type: struct
+        :param owner: object keeping the cJSON tree alive
+        :type: obj
+        :return: ConfigObjectView class object
+        :rtype: obj
+        """
+        v = ConfigObjectView()
+        v.node = node
+        v.owner = owner
+        v.converted = {}
+        return v
+
+    cdef const cJSON* _find(self, key):
+        cdef const cJSON* child = self.node.child
+        cdef const cJSON* found = NULL
+        cdef bytes bkey = key.encode('utf-8')
+        cdef const char* ckey = bkey
+        # Last of the duplicated keys, as json.loads() keeps it
+        while child is not NULL:
+            if strcmp(child.string, ckey) == 0:
+                found = child
+            child = child.next
+        return found
+
+    def __getitem__(self, key):
+        """Value of a key, converted on the first access
+
+        :param key: Key on which value is retrived
+        :type: string
+        :return: value of the key
+        :rtype: integer/string/float/boolean/view
+        """
+        cdef const cJSON* child
+        try:
+            return self.converted[key]
+        except KeyError:
+            pass
+        if not isinstance(key, str):
+            raise KeyError(key)
+        child = self._find(key)
+        if child is NULL:
+            raise KeyError(key)
+        value = cjson_to_view(child, self.owner)
+        self.converted[key] = value
+        return value
+
+    def keys(self):
+        """Keys of the object, in config order
+
+        :return: keys
+        :rtype: list
+        """
+        cdef const cJSON* child = self.node.child
+        keys = {}
+        while child is not NULL:
+            keys[child.string.decode('utf-8')] = None
+            child = child.next
+        return list(keys)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self._find(key) is not NULL
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def __eq__(self, other):
+        if isinstance(other, (ConfigObjectView, ConfigArrayView)):
+            other = other.to_py()
+        return self.to_py() == other
+
+    def __repr__(self):
+        return "ConfigObjectView({})".format(self.to_py())
+
+    def to_py(self):
+        """Converts the whole object
+
+        :return: config object
+        :rtype: dict
+        """
+        return cjson_to_py(self.node)
+
+    def to_json(self):
+        """Prints the object with cJSON
+
+        :return: JSON of the object
+        :rtype: str
+        """
+        cdef char* config = cJSON_Print(self.node)
+        if config is NULL:
+            raise Exception("cJSON print of the config failed")
+        config_str = config.decode('utf-8')
+        cJSON_free(config)
+        return config_str
+
+
+cdef class ConfigArrayView:
+    """Read only sequence of a config array, converting its items only
+       when they are accessed
+    """
+
+    def __cinit__(self, *args, **kwargs):
+        self.node = NULL
+
+    @staticmethod
+    cdef create(const cJSON* node, object owner):
+        """Helper method for initializing the view
+
+        :param node: cJSON array
+        :type: struct
+        :param owner: object keeping the cJSON tree alive
+        :type: obj
+        :return: ConfigArrayView class object
+        :rtype: obj
+        """
+        cdef const cJSON* child = node.child
+        v = ConfigArrayView()
+        v.node = node
+        v.owner = owner
+        v.length = 0
+        while child is not NULL:
+            v.length += 1
+            child = child.next
+        v.items = [None] * v.length
+        v.done = [False] * v.length
+        return v
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        """Item at an index, converted on the first access
+
+        :param index: index of the item, or slice
+        :type: int
+        :return: item
+        :rtype: integer/string/float/boolean/view
+        """
+        cdef const cJSON* child
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if not isinstance(index, int):
+            raise TypeError("config array indices must be integers")
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("config array index out of range")
+        if not self.done[index]:
+            child = self.node.child
+            for _ in range(index):
+                child = child.next
+            self.items[index] = cjson_to_view(child, self.owner)
+            self.done[index] = True
+        return self.items[index]
+
+    def __iter__(self):
+        cdef const cJSON* child = self.node.child
+        cdef int index = 0
+        while child is not NULL:
+            if not self.done[index]:
+                self.items[index] = cjson_to_view(child, self.owner)
+                self.done[index] = True
+            yield self.items[index]
+            child = child.next
+            index += 1
+
+    def __eq__(self, other):
+        if isinstance(other, (ConfigObjectView, ConfigArrayView)):
+            other = other.to_py()
+        return self.to_py() == other
+
+    def __repr__(self):
+        return "ConfigArrayView({})".format(self.to_py())
+
+    def to_py(self):
+        """Converts the whole array
+
+        :return: config array
+        :rtype: list
+        """
+        return cjson_to_py(self.node)
+
+    def to_json(self):
+        """Prints the array with cJSON
+
+        :return: JSON of the array
+        :rtype: str
+        """
+        cdef char* config = cJSON_Print(self.node)
+        if config is NULL:
+            raise Exception("cJSON print of the config failed")
+        config_str = config.decode('utf-8')
+        cJSON_free(config)
+        return config_str
+
+
+Mapping.register(ConfigObjectView)
+Sequence.register(ConfigArrayView)
+
 
 cdef class Util:
     """EII Message Bus Publisher object
@@ -56,13 +395,16 @@ cdef class Util:
                 value = c_value.decode('utf-8')
             elif(cvt.type == CVT_BOOLEAN):
                 value = cvt.body.boolean
-            elif(cvt.type == CVT_OBJECT or cvt.type == CVT_ARRAY):
-                config = cvt_to_char(cvt);
-                if config is NULL:
-                    raise Exception("cvt to char failed in util")
-
-                config_str = config.decode('utf-8')
-                value = json.loads(config_str)
+            elif(cvt.type == CVT_OBJECT):
+                # Converted from the cJSON object of the value, without
+                # printing & parsing it again
+                if cvt.body.object is NULL or cvt.body.object.object is NULL:
+                    raise Exception("cvt object is NULL in util")
+                value = cjson_to_py(<cJSON*>cvt.body.object.object)
+            elif(cvt.type == CVT_ARRAY):
+                if cvt.body.array is NULL or cvt.body.array.array is NULL:
+                    raise Exception("cvt array is NULL in util")
+                value = cjson_to_py(<cJSON*>cvt.body.array.array)
             else:
                 value = None
                 raise TypeError("Type mismatch of Interface value")
@@ -0,0 +1,62 @@
+# Copyright (c) 2020 Intel Corporation.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""EII ConfigMgr asyncio watch example
+"""
+
+import os
+import json
+import asyncio
+import cfgmgr.config_manager as cfg
+
+
+async def consume(queue, name):
+    async for key, value in queue:
+        print("[{}] Key is {}".format(name, key))
+        print("[{}] json is {}".format(name, json.loads(value)))
+        print("[{}] stats {}".format(name, queue.stats()))
+
+
+async def main(ctx):
+    watch_cfg = ctx.get_watch_obj()
+    # Changes of "/<appname>/config" & of the VideoAnalytics prefix, fed
+    # into this event loop
+    config_queue = watch_cfg.watch_config_async()
+    prefix_queue = watch_cfg.watch_prefix_async("/VideoAnalytics",
+                                                maxsize=32)
+    print("Watching on app config & VideoAnalytics for 60 seconds")
+    consumers = asyncio.gather(consume(config_queue, "config"),
+                               consume(prefix_queue, "VideoAnalytics"))
+    await asyncio.sleep(60)
+    config_queue.close()
+    prefix_queue.close()
+    await consumers
+
+
+try:
+    os.environ["AppName"] = "VideoIngestion"
+
+    # create ConfigMgr object
+    ctx = cfg.ConfigMgr()
+    asyncio.get_event_loop().run_until_complete(main(ctx))
+
+except KeyboardInterrupt:
+    print('[INFO] Quitting...')
+except Exception as e:
+    print('Error during execution: {}'.format(e))
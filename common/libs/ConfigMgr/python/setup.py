@@ -45,7 +45,7 @@ setup(
             Extension(
                 '*',
                 ['./cfgmgr/*.pyx'],
-                libraries=['eiiconfigmanager'])],
+                libraries=['eiiconfigmanager', 'cjson'])],
         build_dir='./build/cython',
         compiler_directives={'language_level': 3}
     )
@@ -24,9 +24,45 @@
  */
 
 #include <stdarg.h>
+#include <time.h>
 #include "eii/config_manager/cfg_mgr.h"
 
 #define MAX_CONFIG_KEY_LENGTH 250
+#define GLOBAL_ENV "/GlobalEnv/"
+
+// Returns a monotonic timestamp in microseconds
+static long get_time_us() {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1000000L + ts.tv_nsec / 1000L;
+}
+
+// Loads GlobalEnv and all the keys of the app into the snapshot of the kv
+// store client with a single request, returns the number of keys loaded or
+// -1 on failure
+static long prefetch_app_keys(kv_store_client_t* kv_store_client, void* handle,
+                              const char* app_name) {
+    char* prefixes[2];
+    int num_prefixes = 0;
+    long num_keys = -1;
+
+    if (kv_store_client->prefetch == NULL) {
+        LOG_DEBUG_0("kv store client does not support prefetch");
+        return -1;
+    }
+    size_t init_len = strlen("/") + strlen(app_name) + strlen("/") + 1;
+    char* app_prefix = concat_s(init_len, 3, "/", app_name, "/");
+    if (app_prefix == NULL) {
+        LOG_ERROR_0("Concatenation of /appname and / failed");
+        return -1;
+    }
+    prefixes[num_prefixes++] = GLOBAL_ENV;
+    prefixes[num_prefixes++] = app_prefix;
+
+    num_keys = kv_store_client->prefetch(handle, prefixes, num_prefixes);
+    free(app_prefix);
+    return num_keys;
+}
 
 // function to generate kv_store_config from env
 config_t* create_kv_store_config() {
@@ -81,6 +117,18 @@ config_t* create_kv_store_config() {
     }
     cJSON_AddItemToObject(c_json, "etcd_kv_store", etcd_kv_store);
 
+    // Creating snapshot_kv_store object, used when KVStore is set to snapshot
+    char* snapshot_file = getenv("KVStoreSnapshot");
+    if (snapshot_file != NULL) {
+        cJSON* snapshot_kv_store = cJSON_CreateObject();
+        if (snapshot_kv_store == NULL) {
+            LOG_ERROR_0("c_json initialization failed");
+            goto err;
+        }
+        cJSON_AddItemToObject(c_json, "snapshot_kv_store", snapshot_kv_store);
+        cJSON_AddStringToObject(snapshot_kv_store, "file", snapshot_file);
+    }
+
     // Fetching & intializing dev mode variable
     int result = 0;
     dev_mode_var = getenv("DEV_MODE");
@@ -694,8 +742,11 @@ app_cfg_t* app_cfg_new() {
         LOG_ERROR_0("Malloc failed for app_cfg_t");
         goto err;
     }
+    long start_us = get_time_us();
+    long step_us;
     // Setting app_cfg->env_var to NULL initially
     app_cfg->env_var = NULL;
+    memset(&app_cfg->startup_stats, 0, sizeof(cfgmgr_startup_stats_t));
 
     // Fetching & intializing dev mode variable
     dev_mode_var = getenv("DEV_MODE");
@@ -726,8 +777,42 @@ app_cfg_t* app_cfg_new() {
         goto err;
     }
 
+    app_cfg->startup_stats.init_us = get_time_us() - start_us;
+
+    // Fetching AppName
+    app_name_var = getenv("AppName");
+    if (app_name_var == NULL) {
+        LOG_ERROR_0("AppName env not set");
+        goto err;
+    }
+    size_t str_len = strlen(app_name_var) + 1;
+    c_app_name = (char*)malloc(sizeof(char) * str_len);
+    if (c_app_name == NULL) {
+        LOG_ERROR_0("c_app_name is NULL");
+        goto err;
+    }
+    int ret = snprintf(c_app_name, str_len, "%s", app_name_var);
+    if (ret < 0){
+        LOG_ERROR_0("snprintf failed to c_app_name");
+        goto err;
+    }
+    LOG_DEBUG("AppName: %s", c_app_name);
+    trim(c_app_name);
+
+    // Prefetching the keys of the app, the gets below are served from the
+    // snapshot until the end of the start up. On failure, every key is
+    // fetched from the kv store.
+    step_us = get_time_us();
+    app_cfg->startup_stats.prefetched_keys = prefetch_app_keys(
+            kv_store_client, handle, c_app_name);
+    app_cfg->startup_stats.prefetch_us = get_time_us() - step_us;
+    if (app_cfg->startup_stats.prefetched_keys < 0) {
+        LOG_WARN_0("Prefetch of the app keys failed, continuing without it");
+    }
+
+    step_us = get_time_us();
     // Fetching GlobalEnv
-    env_var = kv_store_client->get(handle, "/GlobalEnv/");
+    env_var = kv_store_client->get(handle, GLOBAL_ENV);
     if (env_var == NULL) {
         LOG_WARN_0("Value is not found for the key /GlobalEnv/,"
                    " continuing without setting GlobalEnv vars");
@@ -755,26 +840,6 @@ app_cfg_t* app_cfg_new() {
         cJSON_Delete(env_json);
     }
 
-    // Fetching AppName
-    app_name_var = getenv("AppName");
-    if (app_name_var == NULL) {
-        LOG_ERROR_0("AppName env not set");
-        goto err;
-    }
-    size_t str_len = strlen(app_name_var) + 1;
-    c_app_name = (char*)malloc(sizeof(char) * str_len);
-    if (c_app_name == NULL) {
-        LOG_ERROR_0("c_app_name is NULL");
-        goto err;
-    }
-    int ret = snprintf(c_app_name, str_len, "%s", app_name_var);
-    if (ret < 0){
-        LOG_ERROR_0("snprintf failed to c_app_name");
-        goto err;
-    }
-    LOG_DEBUG("AppName: %s", c_app_name);
-    trim(c_app_name);
-
     // Fetching App interfaces
     size_t init_len = strlen("/") + strlen(c_app_name) + strlen("/interfaces") + 1;
     interface_char = concat_s(init_len, 3, "/", c_app_name, "/interfaces");
@@ -805,6 +870,13 @@ app_cfg_t* app_cfg_new() {
         LOG_ERROR("Value is not found for the key: %s", config_char);
         goto err;
     }
+    app_cfg->startup_stats.fetch_us = get_time_us() - step_us;
+
+    // Dropping the snapshot, so that the keys read later, like the public
+    // keys read when creating the msgbus configs, are up to date
+    if (kv_store_client->end_prefetch != NULL) {
+        kv_store_client->end_prefetch(handle);
+    }
 
     app_config = json_config_new_from_buffer(value);
     if (app_config == NULL) {
@@ -859,6 +931,14 @@ app_cfg_t* app_cfg_new() {
         free(value);
     }
 
+    app_cfg->startup_stats.total_us = get_time_us() - start_us;
+    LOG_INFO("ConfigMgr started in %ld us (kv store init: %ld us, prefetch of "
+             "%ld keys: %ld us, fetch: %ld us)",
+             app_cfg->startup_stats.total_us, app_cfg->startup_stats.init_us,
+             app_cfg->startup_stats.prefetched_keys,
+             app_cfg->startup_stats.prefetch_us,
+             app_cfg->startup_stats.fetch_us);
+
     return app_cfg;
 
 err:
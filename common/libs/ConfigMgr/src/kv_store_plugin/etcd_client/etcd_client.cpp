@@ -28,21 +28,28 @@
 
 #define NO_VALUE_ERROR    "CHECK failed: (index) < (current_size_): "
 
+// Returns the key with the ETCD_PREFIX env prepended, if set
+static std::string get_etcd_key(const std::string& key) {
+    char* etcd_prefix = getenv("ETCD_PREFIX");
+    if (etcd_prefix == NULL || strlen(etcd_prefix) == 0) {
+        return key;
+    }
+    return std::string(etcd_prefix) + key;
+}
+
+// Returns the end of the range of all the keys starting with key_prefix
+static std::string get_range_end(const std::string& key_prefix) {
+    std::string range_end = key_prefix;
+    range_end.back() = range_end.back() + 1;
+    return range_end;
+}
+
 static std::string get_file_contents(const char *fpath) {
   std::ifstream finstream(fpath);
   std::string contents((std::istreambuf_iterator<char>(finstream)), std::istreambuf_iterator<char>());
   return contents;
 }
 
-// Forward declaration of internally used locally defined functions
-void register_watch_loop(char* address, grpc::SslCredentialsOptions ssl_opts,
-                         WatchRequest watch_req, callback_t user_callback,
-                         void *user_data);
-
-bool register_watch(char* address, grpc::SslCredentialsOptions ssl_opts,
-                    WatchRequest watch_req, callback_t user_callback,
-                    void *user_data);
-
 EtcdClient::EtcdClient(const std::string& host, const std::string& port) {
     LOG_INFO("Initialize EtcdClient in Dev mode");
     kv_stub = NULL;
@@ -52,7 +59,9 @@ EtcdClient::EtcdClient(const std::string& host, const std::string& port) {
     sprintf(address, "%s:%s", host.c_str(), port.c_str());
     
     try {
-        kv_stub = KV::NewStub(grpc::CreateChannel(address, grpc::InsecureChannelCredentials()));
+        channel = grpc::CreateChannel(address, grpc::InsecureChannelCredentials());
+        kv_stub = KV::NewStub(channel);
+        watch_mux.reset(new WatchMultiplexer(channel));
     }catch(...) {
         LOG_ERROR("Exception Occurred while creating grpc channel for KV Store");
         throw "KV Channel Creation Failed";
@@ -77,7 +86,9 @@ EtcdClient::EtcdClient(const std::string& host, const std::string& port, const s
     ssl_opts.pem_cert_chain = cert_pem;
 
     try {
-        kv_stub = KV::NewStub(grpc::CreateChannel(address, grpc::SslCredentials(ssl_opts)));
+        channel = grpc::CreateChannel(address, grpc::SslCredentials(ssl_opts));
+        kv_stub = KV::NewStub(channel);
+        watch_mux.reset(new WatchMultiplexer(channel));
     }catch(...) {
         LOG_ERROR("Exception Occurred while creating grpc channel for KV Store");
         throw "KV Channel Creation Failed";
@@ -107,6 +118,17 @@ std::string EtcdClient::get(std::string& key) {
                 key = prefix + key;
             }
         }
+        {
+            std::lock_guard<std::mutex> lk(snapshot_mutex);
+            if (in_snapshot(key)) {
+                auto it = snapshot.find(key);
+                if (it == snapshot.end()) {
+                    LOG_DEBUG("Value for the key %s is not found in snapshot", key.c_str());
+                    return "(NULL)";
+                }
+                return it->second;
+            }
+        }
         get_request.set_key(key);
         status = kv_stub->Range(&context,get_request,&reply);
         if (status.ok()) {
@@ -156,6 +178,17 @@ std::vector<std::string> EtcdClient::get_prefix(std::string& key_prefix) {
                 range_end = key_prefix;
             }
         }
+        {
+            std::lock_guard<std::mutex> lk(snapshot_mutex);
+            if (in_snapshot(key_prefix)) {
+                std::string snapshot_end = get_range_end(key_prefix);
+                auto end = snapshot.lower_bound(snapshot_end);
+                for (auto it = snapshot.lower_bound(key_prefix); it != end; it++) {
+                    values.push_back(it->second);
+                }
+                return values;
+            }
+        }
         get_request.set_key(key_prefix);
        
         int ascii = (int)range_end[range_end.length()-1];
@@ -190,97 +223,79 @@ std::vector<std::string> EtcdClient::get_prefix(std::string& key_prefix) {
     return values;
 }
 
-void register_watch_loop(char* address, grpc::SslCredentialsOptions ssl_opts,
-                         WatchRequest watch_req, callback_t user_callback,
-                         void *user_data) {
-    bool watch_registered = true;
-    // Register watch once and check for watch expired conditions
-    // If watch is expired, register it again
-    do {
-        // TODO: We are relying on register_watch returning on error
-        // conditions here, should be replaced with a means to catch
-        // specific error conditions like timeout, socket closed etc.
-        watch_registered = register_watch(address, ssl_opts, watch_req,
-                                          user_callback, user_data);
-        if (!watch_registered) {
-            LOG_DEBUG_0("Watch expired, re-registering...");
-        }
-    } while (!watch_registered);
-}
-
-bool register_watch(char* address, grpc::SslCredentialsOptions ssl_opts, 
-                    WatchRequest watch_req, callback_t user_callback, void *user_data) {
-    WatchResponse reply;
-    mvccpb::KeyValue kvs;
+/**
+* Loads all the keys of the given prefixes into the snapshot with a single
+* transaction of range requests
+* @param prefixes is the list of key prefixes to be loaded
+*/
+int EtcdClient::prefetch(std::vector<std::string>& prefixes) {
+    LOG_DEBUG_0("In prefetch() API");
+    TxnRequest txn_request;
+    TxnResponse reply;
+    Status status;
     ClientContext context;
+    std::vector<std::string> etcd_prefixes;
+    std::map<std::string, std::string> kvs;
 
-    std::unique_ptr<Watch::Stub> watch_stub;
+    try {
+        for (size_t i = 0; i < prefixes.size(); i++) {
+            if (prefixes[i].empty()) {
+                LOG_ERROR_0("Empty prefix is not supported for prefetch");
+                return -1;
+            }
+            std::string etcd_prefix = get_etcd_key(prefixes[i]);
+            // With no compare, the success requests are always run
+            RangeRequest* range_request = txn_request.add_success()->mutable_request_range();
+            range_request->set_key(etcd_prefix);
+            range_request->set_range_end(get_range_end(etcd_prefix));
+            etcd_prefixes.push_back(etcd_prefix);
+            LOG_DEBUG("prefetch all values for keys starting from %s", etcd_prefix.c_str());
+        }
 
-    if((ssl_opts.pem_root_certs.empty()) && (ssl_opts.pem_private_key.empty()) \
-            && (ssl_opts.pem_cert_chain.empty())) {
-        watch_stub = Watch::NewStub(grpc::CreateChannel(address, grpc::InsecureChannelCredentials()));
-    }else {
-        watch_stub = Watch::NewStub(grpc::CreateChannel(address, grpc::SslCredentials(ssl_opts)));
+        status = kv_stub->Txn(&context, txn_request, &reply);
+        if (!status.ok()) {
+            LOG_ERROR("prefetch() API Failed with Error:%s and Error Code: %d",
+                status.error_message().c_str(), status.error_code());
+            return -1;
+        }
+        for (int i = 0; i < reply.responses_size(); i++) {
+            const RangeResponse& range = reply.responses(i).response_range();
+            for (int j = 0; j < range.kvs_size(); j++) {
+                kvs[range.kvs(j).key()] = range.kvs(j).value();
+            }
+        }
+    } catch(std::exception const & ex) {
+        LOG_ERROR("Exception Occurred in prefetch() API with the Error: %s", ex.what());
+        return -1;
     }
 
-    // TODO: make use of AsyncWatch instead of Watch
-    std::unique_ptr<ClientReaderWriter<WatchRequest, WatchResponse> > stream = watch_stub->Watch(&context);
-
-    stream->Write(watch_req);
-
-    // Checking for any changes in key
-    while (stream->Read(&reply)) {
-        if (reply.events_size()) {
-            for (int cnt = 0; cnt < reply.events_size(); cnt++) {
-                auto event = reply.events(cnt);
-                if(mvccpb::Event::EventType::Event_EventType_PUT == event.type())
-                {
-                    kvs = event.kv();
-                    char *kvs_key = const_cast<char*>(kvs.key().c_str());
-                    char *kvs_value = const_cast<char*>(kvs.value().c_str());
-                    LOG_DEBUG("key:%s is updated with the value %s", kvs_key, kvs_value);
-
-                    cJSON* val_json;
-                    // Checking if the value updated is not in Json format
-                    if (kvs_value[0] != '{') {
-                        if(strlen(kvs_value) == 0) {
-                            LOG_ERROR_0("Value shouldn't be empty. Empty string is not supported");
-                            return false;
-                        }
-                        // Creating the cJSON object with Key as kvs_key and value as kvs_value
-                        val_json = cJSON_CreateObject();
-                        if(val_json == NULL){
-                            LOG_ERROR_0("Create json object failed");
-                            return false;
-                        }
-                        cJSON_AddStringToObject(val_json, kvs_key, kvs_value);
-                    } else{
-                        // char* to cJSON conversion
-                        val_json = cJSON_Parse(kvs_value);
-                        if(val_json == NULL){
-                            LOG_ERROR_0("cJSON Parse failed");
-                            return false;
-                        }
-                    }
-
-                    // cJSON to config_t conversion
-                    config_t* config = config_new(
-                        (void*) val_json, free_json, get_config_value);
-                    if (config == NULL) {
-                        cJSON_Delete(val_json);
-                        config_destroy(config);
-                        LOG_ERROR_0("Failed to initialize configuration object");
-                        return false;
-                    }
-                    user_callback(kvs_key, config, user_data);
-                }
-            }
+    std::lock_guard<std::mutex> lk(snapshot_mutex);
+    for (auto it = kvs.begin(); it != kvs.end(); it++) {
+        snapshot[it->first] = it->second;
+    }
+    snapshot_prefixes.insert(snapshot_prefixes.end(), etcd_prefixes.begin(), etcd_prefixes.end());
+    LOG_DEBUG("prefetch() loaded %zu keys", kvs.size());
+    return (int) kvs.size();
+}
+
+/**
+* Drops the snapshot loaded by prefetch()
+*/
+void EtcdClient::end_prefetch() {
+    LOG_DEBUG_0("In end_prefetch() API");
+    std::lock_guard<std::mutex> lk(snapshot_mutex);
+    snapshot.clear();
+    snapshot_prefixes.clear();
+}
+
+// Checks if the key is within the prefixes of the snapshot, the caller must
+// hold snapshot_mutex
+bool EtcdClient::in_snapshot(const std::string& key) {
+    for (size_t i = 0; i < snapshot_prefixes.size(); i++) {
+        if (key.compare(0, snapshot_prefixes[i].size(), snapshot_prefixes[i]) == 0) {
+            return true;
         }
     }
-    // Returns false to indicate stream->Read() returned 0
-    // and that the watch has expired
-    // User can choose to re-register the watch based
-    // on this return value
     return false;
 }
 
@@ -295,10 +310,6 @@ void EtcdClient::watch_prefix(std::string& key, callback_t user_callback, void *
     LOG_DEBUG_0("In watch_prefix() API");
     LOG_DEBUG("Register the prefix of the the key %s to watch on", key.c_str());
 
-    WatchResponse reply;
-    ClientContext context;
-    mvccpb::KeyValue kvs;
-    WatchRequest watch_req;
     WatchCreateRequest watch_create_req;
 
     int revision = 0;
@@ -322,10 +333,8 @@ void EtcdClient::watch_prefix(std::string& key, callback_t user_callback, void *
 
         watch_create_req.set_range_end(range_end);
         watch_create_req.set_start_revision(revision);
-        watch_req.mutable_create_request()->CopyFrom(watch_create_req);
 
-        std::thread register_watch_prefix_thread(register_watch_loop, address, ssl_opts, watch_req, user_callback, user_data);
-        register_watch_prefix_thread.detach();
+        watch_mux->add_watch(watch_create_req, user_callback, user_data);
     } catch(std::exception const & ex) {
         LOG_ERROR("Exception Occurred in watch_prefix() API with the Error: %s", ex.what());
         return;
@@ -343,10 +352,6 @@ void EtcdClient::watch(std::string& key, callback_t user_callback, void *user_da
     LOG_DEBUG_0("In watch() API");
     LOG_DEBUG("Register the key %s to watch on", key.c_str());
 
-    WatchResponse reply;
-    ClientContext context;
-    mvccpb::KeyValue kvs;
-    WatchRequest watch_req;
     WatchCreateRequest watch_create_req;
 
     int revision = 0;
@@ -364,11 +369,9 @@ void EtcdClient::watch(std::string& key, callback_t user_callback, void *user_da
         watch_create_req.set_key(key);
         watch_create_req.set_prev_kv(false);
         watch_create_req.set_start_revision(revision);
-        watch_req.mutable_create_request()->CopyFrom(watch_create_req);
 
-        std::thread register_watch_thread(register_watch_loop, address, ssl_opts, watch_req, user_callback, user_data);
-        LOG_DEBUG("Thread created to wait on any change on the key %s", key.c_str());
-        register_watch_thread.detach();
+        watch_mux->add_watch(watch_create_req, user_callback, user_data);
+        LOG_DEBUG("Watch registered on the key %s", key.c_str());
     } catch(std::exception const & ex) {
         LOG_ERROR("Exception Occurred in watch() API with the Error: %s", ex.what());
         return;
@@ -414,6 +417,10 @@ int EtcdClient::put(std::string& key, std::string& value) {
             LOG_ERROR("put() API Failed with Error:%s", status.error_message().c_str());
             return -1;
         }
+        std::lock_guard<std::mutex> lk(snapshot_mutex);
+        if (in_snapshot(key)) {
+            snapshot[key] = value;
+        }
     } catch(std::exception const & ex) {
         LOG_ERROR("Exception Occurred in put() API with the Error: %s", ex.what());
         return -1;
@@ -425,6 +432,8 @@ int EtcdClient::put(std::string& key, std::string& value) {
 
 EtcdClient::~EtcdClient() {
     LOG_DEBUG_0("EtcdClient Destructor is called");
+    // Stop the watches before the channel they share goes away
+    watch_mux.reset();
     if (kv_stub != NULL) {
         kv_stub.reset();
     }
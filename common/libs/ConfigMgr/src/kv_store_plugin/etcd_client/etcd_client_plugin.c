@@ -37,6 +37,8 @@
 void* etcd_init(void* etcd_client);
 char* etcd_get(void * handle, char *key);
 config_value_t* etcd_get_prefix(void * handle, char *key);
+int etcd_prefetch(void* handle, char **prefixes, int num_prefixes);
+void etcd_end_prefetch(void* handle);
 int etcd_put(void* handle, char *key, char *value);
 void etcd_watch(void* handle, char *key_test, callback_t cb, void* user_data);
 void etcd_watch_prefix(void* handle, char *key_test, callback_t cb, void* user_data);
@@ -269,6 +271,8 @@ kv_store_client_t* create_etcd_client(config_t *config) {
         kv_store_client->kv_store_config = etcd_config;
         kv_store_client->get = etcd_get;
         kv_store_client->get_prefix = etcd_get_prefix;
+        kv_store_client->prefetch = etcd_prefetch;
+        kv_store_client->end_prefetch = etcd_end_prefetch;
         kv_store_client->put = etcd_put;
         kv_store_client->watch = etcd_watch;
         kv_store_client->watch_prefix = etcd_watch_prefix;
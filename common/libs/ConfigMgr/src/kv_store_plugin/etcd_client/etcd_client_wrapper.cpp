@@ -116,6 +116,20 @@ config_value_t* etcd_get_prefix(void* handle, char *key) {
     return values;
 }
 
+int etcd_prefetch(void* handle, char **prefixes, int num_prefixes) {
+    std::vector<std::string> vec;
+    EtcdClient *cli = static_cast<EtcdClient *>(handle);
+    for (int i = 0; i < num_prefixes; i++) {
+        vec.push_back(prefixes[i]);
+    }
+    return cli->prefetch(vec);
+}
+
+void etcd_end_prefetch(void* handle) {
+    EtcdClient *cli = static_cast<EtcdClient *>(handle);
+    cli->end_prefetch();
+}
+
 int etcd_put(void* handle, char *key, char *value){
     std::string str_key = key;
     std::string str_value = value;
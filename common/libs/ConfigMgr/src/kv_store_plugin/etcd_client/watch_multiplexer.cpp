@@ -0,0 +1,358 @@
+// Copyright (c) 2021 Intel Corporation.
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to
+// deal in the Software without restriction, including without limitation the
+// rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+// sell copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in
+// all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+// FROM,OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+// IN THE SOFTWARE.
+
+#include <algorithm>
+#include <chrono>
+#include <string.h>
+
+#include <eii/utils/logger.h>
+#include <eii/utils/json_config.h>
+#include <eii/config_manager/kv_store_plugin/etcd_client/watch_multiplexer.h>
+
+// Delays before re-opening an ended Watch stream, doubled on each failed
+// attempt up to the maximum
+#define WATCH_BACKOFF_MIN_MS  100
+#define WATCH_BACKOFF_MAX_MS  5000
+
+using grpc::ClientContext;
+using grpc::Status;
+using etcdserverpb::WatchRequest;
+using etcdserverpb::WatchResponse;
+using etcdserverpb::WatchCreateRequest;
+
+/**
+ * Converts the value of an updated key to a config_t object, values which are
+ * not JSON objects are wrapped in an object with the key as the only member
+ * @param kvs - updated key value
+ * @return config_t object, NULL on failure
+ */
+static config_t* kv_to_config(const mvccpb::KeyValue& kvs) {
+    const char *kvs_key = kvs.key().c_str();
+    const char *kvs_value = kvs.value().c_str();
+    LOG_DEBUG("key:%s is updated with the value %s", kvs_key, kvs_value);
+
+    cJSON* val_json;
+    // Checking if the value updated is not in Json format
+    if (kvs_value[0] != '{') {
+        if(strlen(kvs_value) == 0) {
+            LOG_ERROR_0("Value shouldn't be empty. Empty string is not supported");
+            return NULL;
+        }
+        // Creating the cJSON object with Key as kvs_key and value as kvs_value
+        val_json = cJSON_CreateObject();
+        if(val_json == NULL){
+            LOG_ERROR_0("Create json object failed");
+            return NULL;
+        }
+        cJSON_AddStringToObject(val_json, kvs_key, kvs_value);
+    } else{
+        // char* to cJSON conversion
+        val_json = cJSON_Parse(kvs_value);
+        if(val_json == NULL){
+            LOG_ERROR_0("cJSON Parse failed");
+            return NULL;
+        }
+    }
+
+    // cJSON to config_t conversion
+    config_t* config = config_new(
+        (void*) val_json, free_json, get_config_value);
+    if (config == NULL) {
+        cJSON_Delete(val_json);
+        LOG_ERROR_0("Failed to initialize configuration object");
+        return NULL;
+    }
+    return config;
+}
+
+/**
+ * State of a WatchMultiplexer, shared with its reader thread
+ */
+struct WatchMultiplexer::state_t {
+    // A registered watch
+    struct watcher_t {
+        WatchCreateRequest create_req;
+        callback_t user_cb;
+        void* user_data;
+        // Last revision seen for the watch, 0 if none
+        int64_t revision;
+    };
+
+    typedef grpc::ClientReaderWriter<WatchRequest, WatchResponse> stream_t;
+
+    std::shared_ptr<grpc::Channel> m_channel;
+    std::unique_ptr<etcdserverpb::Watch::Stub> m_watch_stub;
+
+    // Guards all the members below, and the writes on the stream
+    std::mutex m_mutex;
+    std::condition_variable m_stop_cv;
+    std::unique_ptr<ClientContext> m_context;
+    std::unique_ptr<stream_t> m_stream;
+    std::vector<std::shared_ptr<watcher_t>> m_watchers;
+    std::deque<std::shared_ptr<watcher_t>> m_pending;
+    std::map<int64_t, std::shared_ptr<watcher_t>> m_active;
+    bool m_create_in_flight;
+    size_t m_streams_opened;
+    std::atomic<bool> m_stop;
+
+    explicit state_t(std::shared_ptr<grpc::Channel> channel) :
+        m_channel(channel), m_create_in_flight(false), m_streams_opened(0),
+        m_stop(false) {
+        m_watch_stub = etcdserverpb::Watch::NewStub(m_channel);
+    }
+
+    void stop();
+    void run();
+    stream_t* open_stream();
+    void close_stream();
+    void send_next_create();
+    void handle_response(const WatchResponse& reply);
+};
+
+WatchMultiplexer::WatchMultiplexer(std::shared_ptr<grpc::Channel> channel) :
+    m_state(new state_t(channel)) {}
+
+WatchMultiplexer::~WatchMultiplexer() {
+    LOG_DEBUG_0("WatchMultiplexer Destructor is called");
+    m_state->stop();
+    if (m_thread.joinable()) {
+        // The client may be freed from within a user callback, the reader
+        // thread then holds the state until it ends
+        if (m_thread.get_id() == std::this_thread::get_id()) {
+            m_thread.detach();
+        } else {
+            m_thread.join();
+        }
+    }
+}
+
+void WatchMultiplexer::add_watch(const WatchCreateRequest& create_req,
+                                 callback_t user_cb, void* user_data) {
+    std::shared_ptr<state_t::watcher_t> watcher(new state_t::watcher_t);
+    watcher->create_req.CopyFrom(create_req);
+    watcher->user_cb = user_cb;
+    watcher->user_data = user_data;
+    watcher->revision = 0;
+
+    std::lock_guard<std::mutex> lk(m_state->m_mutex);
+    m_state->m_watchers.push_back(watcher);
+    if (m_state->m_stream != NULL) {
+        m_state->m_pending.push_back(watcher);
+        m_state->send_next_create();
+    }
+    if (!m_thread.joinable()) {
+        // The reader thread opens the stream and creates the pending watches
+        m_thread = std::thread(&state_t::run, m_state);
+    }
+}
+
+size_t WatchMultiplexer::watch_count() {
+    std::lock_guard<std::mutex> lk(m_state->m_mutex);
+    return m_state->m_watchers.size();
+}
+
+size_t WatchMultiplexer::active_watch_count() {
+    std::lock_guard<std::mutex> lk(m_state->m_mutex);
+    return m_state->m_active.size();
+}
+
+size_t WatchMultiplexer::streams_opened() {
+    std::lock_guard<std::mutex> lk(m_state->m_mutex);
+    return m_state->m_streams_opened;
+}
+
+void WatchMultiplexer::state_t::stop() {
+    {
+        std::lock_guard<std::mutex> lk(m_mutex);
+        m_stop = true;
+        if (m_context != NULL) {
+            m_context->TryCancel();
+        }
+    }
+    m_stop_cv.notify_all();
+}
+
+void WatchMultiplexer::state_t::run() {
+    int backoff_ms = WATCH_BACKOFF_MIN_MS;
+    WatchResponse reply;
+
+    while (!m_stop) {
+        stream_t* stream = open_stream();
+        if (stream != NULL) {
+            while (stream->Read(&reply)) {
+                backoff_ms = WATCH_BACKOFF_MIN_MS;
+                handle_response(reply);
+            }
+            close_stream();
+        }
+
+        std::unique_lock<std::mutex> lk(m_mutex);
+        if (m_stop) {
+            break;
+        }
+        LOG_DEBUG("Watch stream ended, re-opening in %d ms...", backoff_ms);
+        m_stop_cv.wait_for(lk, std::chrono::milliseconds(backoff_ms),
+                           [this] { return m_stop.load(); });
+        backoff_ms = std::min(backoff_ms * 2, WATCH_BACKOFF_MAX_MS);
+    }
+}
+
+WatchMultiplexer::state_t::stream_t* WatchMultiplexer::state_t::open_stream() {
+    std::lock_guard<std::mutex> lk(m_mutex);
+    if (m_stop) {
+        return NULL;
+    }
+    m_context.reset(new ClientContext());
+    m_stream = m_watch_stub->Watch(m_context.get());
+    m_streams_opened++;
+    LOG_DEBUG("Opened Watch stream for %zu watch(es)", m_watchers.size());
+
+    // All the watches are created again on a new stream
+    m_active.clear();
+    m_pending.assign(m_watchers.begin(), m_watchers.end());
+    m_create_in_flight = false;
+    send_next_create();
+    return m_stream.get();
+}
+
+void WatchMultiplexer::state_t::close_stream() {
+    std::unique_ptr<stream_t> stream;
+    std::unique_ptr<ClientContext> context;
+    {
+        std::lock_guard<std::mutex> lk(m_mutex);
+        stream = std::move(m_stream);
+        context = std::move(m_context);
+        m_active.clear();
+        m_pending.clear();
+        m_create_in_flight = false;
+    }
+    Status status = stream->Finish();
+    if (!status.ok()) {
+        LOG_DEBUG("Watch stream ended with Error:%s and Error Code: %d",
+                  status.error_message().c_str(), status.error_code());
+    }
+}
+
+void WatchMultiplexer::state_t::send_next_create() {
+    // etcd does not take the ID of the watch in the create request, created
+    // responses are matched with the oldest pending create instead, so only
+    // one create is in flight at a time
+    if (m_create_in_flight || m_stream == NULL || m_pending.empty()) {
+        return;
+    }
+    WatchRequest watch_req;
+    WatchCreateRequest* create_req = watch_req.mutable_create_request();
+    std::shared_ptr<watcher_t> watcher = m_pending.front();
+    create_req->CopyFrom(watcher->create_req);
+    if (watcher->revision > 0) {
+        // Resume after the last revision seen on a previous stream
+        create_req->set_start_revision(watcher->revision + 1);
+    }
+    if (!m_stream->Write(watch_req)) {
+        // The stream is broken, the reader thread re-opens it
+        LOG_DEBUG("Failed to create watch on key %s",
+                  watcher->create_req.key().c_str());
+        return;
+    }
+    m_create_in_flight = true;
+}
+
+void WatchMultiplexer::state_t::handle_response(const WatchResponse& reply) {
+    std::shared_ptr<watcher_t> watcher;
+    {
+        std::lock_guard<std::mutex> lk(m_mutex);
+        if (reply.created()) {
+            if (m_pending.empty()) {
+                LOG_ERROR("Unexpected creation of watch %ld",
+                          (long) reply.watch_id());
+                return;
+            }
+            watcher = m_pending.front();
+            m_pending.pop_front();
+            m_create_in_flight = false;
+            if (reply.canceled() || reply.watch_id() < 0) {
+                LOG_ERROR("Failed to create watch on key %s",
+                          watcher->create_req.key().c_str());
+                m_watchers.erase(std::remove(m_watchers.begin(),
+                                             m_watchers.end(), watcher),
+                                 m_watchers.end());
+                send_next_create();
+                return;
+            }
+            m_active[reply.watch_id()] = watcher;
+            if (watcher->revision == 0) {
+                watcher->revision = reply.header().revision();
+            }
+            LOG_DEBUG("Watch %ld created on key %s", (long) reply.watch_id(),
+                      watcher->create_req.key().c_str());
+            send_next_create();
+        } else {
+            auto it = m_active.find(reply.watch_id());
+            if (it == m_active.end()) {
+                LOG_DEBUG("Response for unknown watch %ld",
+                          (long) reply.watch_id());
+                return;
+            }
+            watcher = it->second;
+            if (reply.canceled()) {
+                m_active.erase(it);
+                if (reply.compact_revision() > 0) {
+                    // Revisions were compacted away, create the watch again
+                    // from the oldest revision still available
+                    LOG_DEBUG("Watch on key %s compacted, re-creating...",
+                              watcher->create_req.key().c_str());
+                    watcher->revision = reply.compact_revision() - 1;
+                    m_pending.push_back(watcher);
+                    send_next_create();
+                } else {
+                    LOG_ERROR("Watch on key %s canceled by the server",
+                              watcher->create_req.key().c_str());
+                    m_watchers.erase(std::remove(m_watchers.begin(),
+                                                 m_watchers.end(), watcher),
+                                     m_watchers.end());
+                }
+                return;
+            }
+        }
+        for (int cnt = 0; cnt < reply.events_size(); cnt++) {
+            int64_t mod_revision = reply.events(cnt).kv().mod_revision();
+            if (mod_revision > watcher->revision) {
+                watcher->revision = mod_revision;
+            }
+        }
+    }
+
+    // User callbacks are called without holding the lock, so that they can
+    // register new watches, or free the client
+    for (int cnt = 0; cnt < reply.events_size(); cnt++) {
+        if (m_stop) {
+            return;
+        }
+        const mvccpb::Event& event = reply.events(cnt);
+        if (mvccpb::Event::EventType::Event_EventType_PUT != event.type()) {
+            continue;
+        }
+        config_t* config = kv_to_config(event.kv());
+        if (config == NULL) {
+            continue;
+        }
+        watcher->user_cb(event.kv().key().c_str(), config, watcher->user_data);
+    }
+}
@@ -25,11 +25,13 @@
 
 #include <eii/config_manager/kv_store_plugin/kv_store_plugin.h>
 #include <eii/config_manager/kv_store_plugin/etcd_client/etcd_client_plugin.h>
+#include <eii/config_manager/kv_store_plugin/snapshot_kv_store/snapshot_kv_store_plugin.h>
 
 #include <eii/utils/config.h>
 #include <safe_lib.h>
 
 #define KV_ETCD "etcd"
+#define KV_SNAPSHOT "snapshot"
 
 kv_store_client_t* create_kv_client(config_t* config){
     kv_store_client_t* kv_store_client = NULL;
@@ -48,11 +50,17 @@ kv_store_client_t* create_kv_client(config_t* config){
 
     int ind_etcd;
     strcmp_s(value->body.string, strlen(KV_ETCD), KV_ETCD, &ind_etcd);
+    int ind_snapshot;
+    strcmp_s(value->body.string, strlen(KV_SNAPSHOT), KV_SNAPSHOT, &ind_snapshot);
 
     if(ind_etcd == 0) {
         kv_store_client = create_etcd_client(config);
         if(kv_store_client == NULL)
             goto err;
+     } else if(ind_snapshot == 0) {
+        kv_store_client = create_snapshot_kv_client(config);
+        if(kv_store_client == NULL)
+            goto err;
      }else {
         LOG_ERROR("Unknown KV Store type: %s", value->body.string);
         goto err;
@@ -0,0 +1,701 @@
+// Copyright (c) 2021 Intel Corporation.
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to
+// deal in the Software without restriction, including without limitation the
+// rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+// sell copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in
+// all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+// FROM,OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+// IN THE SOFTWARE.
+
+/**
+ * @file
+ * @brief Snapshot kv store: serves get, get_prefix and watch from a local JSON
+ * file mapping every key to its value. The file is loaded through mmap and
+ * loaded again whenever it is written or replaced, notifying the watches of
+ * the changed keys.
+ */
+
+#include <errno.h>
+#include <fcntl.h>
+#include <limits.h>
+#include <poll.h>
+#include <pthread.h>
+#include <stdbool.h>
+#include <string.h>
+#include <unistd.h>
+#include <sys/inotify.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+
+#include <cjson/cJSON.h>
+#include <safe_lib.h>
+#include <eii/utils/json_config.h>
+#include <eii/utils/string.h>
+#include <eii/config_manager/kv_store_plugin/snapshot_kv_store/snapshot_kv_store_plugin.h>
+
+#define SNAPSHOT_FILE   "file"
+
+// Size of the buffer reading inotify events
+#define EVENTS_BUF_LEN  (16 * (sizeof(struct inotify_event) + NAME_MAX + 1))
+
+/**
+ * Registered watch on a key or key prefix
+ */
+typedef struct snapshot_watch {
+    char* key;
+    bool prefix;
+    callback_t cb;
+    void* user_data;
+    struct snapshot_watch* next;
+} snapshot_watch_t;
+
+/**
+ * Change of a key to be notified to a watch
+ */
+typedef struct snapshot_change {
+    char* key;
+    config_t* value;
+    snapshot_watch_t* watch;
+    struct snapshot_change* next;
+} snapshot_change_t;
+
+/**
+ * Handle of the snapshot kv store
+ */
+typedef struct {
+    char* file;
+    pthread_mutex_t mutex;
+    // Loaded snapshot, object mapping every key to its value
+    cJSON* kvs;
+    snapshot_watch_t* watches;
+    bool watch_thread_started;
+    pthread_t watch_thread;
+    // Set when the client is freed from within a watch callback, the watch
+    // thread then frees it once the callback returns
+    bool free_pending;
+    // Pipe waking the watch thread up to stop it
+    int stop_fds[2];
+} snapshot_client_t;
+
+void* snapshot_init(void* kv_store_client);
+char* snapshot_get(void* handle, char *key);
+config_value_t* snapshot_get_prefix(void* handle, char *key);
+int snapshot_prefetch(void* handle, char **prefixes, int num_prefixes);
+int snapshot_put(void* handle, char *key, char *value);
+void snapshot_watch(void* handle, char *key, callback_t cb, void* user_data);
+void snapshot_watch_prefix(void* handle, char *key, callback_t cb, void* user_data);
+
+static char* copy_string(const char* src) {
+    size_t len = strlen(src);
+    char* dest = (char*)calloc(len + 1, sizeof(char));
+    if (dest == NULL) {
+        LOG_ERROR_0("Failed to allocate memory for string copy");
+        return NULL;
+    }
+    if (len > 0 && strncpy_s(dest, len + 1, src, len) != 0) {
+        LOG_ERROR_0("Failed to copy string");
+        free(dest);
+        return NULL;
+    }
+    return dest;
+}
+
+// Returns the key with the ETCD_PREFIX env prepended if set, like the keys of
+// the etcd kv store
+static char* get_snapshot_key(const char* key) {
+    char* etcd_prefix = getenv("ETCD_PREFIX");
+    if (etcd_prefix == NULL || strlen(etcd_prefix) == 0) {
+        return copy_string(key);
+    }
+    size_t init_len = strlen(etcd_prefix) + strlen(key) + 1;
+    return concat_s(init_len, 2, etcd_prefix, key);
+}
+
+static bool has_prefix(const char* key, const char* prefix) {
+    return strncmp(key, prefix, strlen(prefix)) == 0;
+}
+
+/**
+ * Loads the snapshot file through mmap. The file is mapped over an anonymous
+ * mapping one byte larger, so that it is always followed by a zero byte
+ * terminating the JSON string parsed.
+ * @param file - snapshot file
+ * @return object mapping every key to its value, NULL on failure
+ */
+static cJSON* load_snapshot(const char* file) {
+    struct stat st;
+    cJSON* kvs = NULL;
+    void* addr = MAP_FAILED;
+    size_t map_len = 0;
+
+    int fd = open(file, O_RDONLY | O_CLOEXEC);
+    if (fd < 0) {
+        LOG_ERROR("Failed to open snapshot file %s: %s", file, strerror(errno));
+        return NULL;
+    }
+    if (fstat(fd, &st) != 0 || st.st_size == 0) {
+        LOG_ERROR("Snapshot file %s is empty or can't be read", file);
+        goto err;
+    }
+
+    map_len = (size_t) st.st_size + 1;
+    addr = mmap(NULL, map_len, PROT_READ, MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+    if (addr == MAP_FAILED) {
+        LOG_ERROR("Failed to map snapshot file %s: %s", file, strerror(errno));
+        goto err;
+    }
+    if (mmap(addr, (size_t) st.st_size, PROT_READ, MAP_PRIVATE | MAP_FIXED,
+             fd, 0) == MAP_FAILED) {
+        LOG_ERROR("Failed to map snapshot file %s: %s", file, strerror(errno));
+        goto err;
+    }
+
+    kvs = cJSON_Parse((const char*) addr);
+    if (kvs == NULL) {
+        LOG_ERROR("Error when parsing snapshot file %s", file);
+        goto err;
+    }
+    if (!cJSON_IsObject(kvs)) {
+        LOG_ERROR("Snapshot file %s must hold a JSON object", file);
+        cJSON_Delete(kvs);
+        kvs = NULL;
+        goto err;
+    }
+    LOG_DEBUG("Loaded %d keys from snapshot file %s", cJSON_GetArraySize(kvs), file);
+
+err:
+    if (addr != MAP_FAILED) {
+        munmap(addr, map_len);
+    }
+    close(fd);
+    return kvs;
+}
+
+// Returns the value of a key as stored in the kv store: strings as they are,
+// other values printed as JSON
+static char* value_to_char(cJSON* item) {
+    if (cJSON_IsString(item)) {
+        return copy_string(item->valuestring);
+    }
+    return cJSON_PrintUnformatted(item);
+}
+
+// Converts the value of a changed key to a config_t object, like the etcd kv
+// store does for its watches: values which are not JSON objects are wrapped
+// in an object with the key as the only member
+static config_t* value_to_config(cJSON* item) {
+    cJSON* val_json = NULL;
+    if (cJSON_IsObject(item)) {
+        val_json = cJSON_Duplicate(item, true);
+    } else if (cJSON_IsString(item) && item->valuestring[0] == '{') {
+        val_json = cJSON_Parse(item->valuestring);
+    } else {
+        char* value = value_to_char(item);
+        if (value == NULL) {
+            return NULL;
+        }
+        if (strlen(value) == 0) {
+            LOG_ERROR_0("Value shouldn't be empty. Empty string is not supported");
+            free(value);
+            return NULL;
+        }
+        val_json = cJSON_CreateObject();
+        if (val_json != NULL) {
+            cJSON_AddStringToObject(val_json, item->string, value);
+        }
+        free(value);
+    }
+    if (val_json == NULL) {
+        LOG_ERROR("Failed to convert the value of the key %s", item->string);
+        return NULL;
+    }
+
+    config_t* config = config_new((void*) val_json, free_json, get_config_value);
+    if (config == NULL) {
+        LOG_ERROR_0("Failed to initialize configuration object");
+        cJSON_Delete(val_json);
+        return NULL;
+    }
+    return config;
+}
+
+/**
+ * Loads the snapshot file again and lists the changes of the watched keys,
+ * the caller must hold the mutex
+ * @param client - snapshot client
+ * @return changes to be notified, in the order of the keys of the file
+ */
+static snapshot_change_t* reload_snapshot(snapshot_client_t* client) {
+    snapshot_change_t* changes = NULL;
+    snapshot_change_t** tail = &changes;
+    cJSON* kvs = load_snapshot(client->file);
+    if (kvs == NULL) {
+        // Partially written files are loaded again once closed or replaced
+        LOG_ERROR_0("Keeping the previous snapshot");
+        return NULL;
+    }
+
+    cJSON* item = NULL;
+    cJSON_ArrayForEach(item, kvs) {
+        cJSON* old_item = cJSON_GetObjectItemCaseSensitive(client->kvs, item->string);
+        if (old_item != NULL && cJSON_Compare(old_item, item, true)) {
+            continue;
+        }
+        for (snapshot_watch_t* watch = client->watches; watch != NULL; watch = watch->next) {
+            bool match = watch->prefix ? has_prefix(item->string, watch->key) :
+                strcmp(item->string, watch->key) == 0;
+            if (!match) {
+                continue;
+            }
+            config_t* value = value_to_config(item);
+            if (value == NULL) {
+                continue;
+            }
+            snapshot_change_t* change = (snapshot_change_t*)malloc(sizeof(snapshot_change_t));
+            if (change == NULL) {
+                LOG_ERROR_0("Failed to allocate memory for snapshot change");
+                config_destroy(value);
+                continue;
+            }
+            change->key = copy_string(item->string);
+            if (change->key == NULL) {
+                config_destroy(value);
+                free(change);
+                continue;
+            }
+            change->value = value;
+            change->watch = watch;
+            change->next = NULL;
+            *tail = change;
+            tail = &change->next;
+        }
+    }
+
+    cJSON_Delete(client->kvs);
+    client->kvs = kvs;
+    return changes;
+}
+
+// Watches the directory of the snapshot file, the file itself is replaced
+// when written atomically
+static void snapshot_client_destroy(snapshot_client_t* client);
+
+static void* snapshot_watch_loop(void* arg) {
+    snapshot_client_t* client = (snapshot_client_t*) arg;
+    char buf[EVENTS_BUF_LEN] __attribute__((aligned(__alignof__(struct inotify_event))));
+    char* dir = NULL;
+    const char* name = NULL;
+    int wd = -1;
+
+    int inotify_fd = inotify_init1(IN_CLOEXEC);
+    if (inotify_fd < 0) {
+        LOG_ERROR("Failed to initialize inotify: %s", strerror(errno));
+        return NULL;
+    }
+    dir = copy_string(client->file);
+    if (dir == NULL) {
+        goto err;
+    }
+    char* sep = strrchr(dir, '/');
+    if (sep == NULL) {
+        name = client->file;
+        free(dir);
+        dir = copy_string(".");
+        if (dir == NULL) {
+            goto err;
+        }
+    } else {
+        name = client->file + (sep - dir) + 1;
+        // Keeping the root directory as is
+        sep[sep == dir ? 1 : 0] = '\0';
+    }
+    wd = inotify_add_watch(inotify_fd, dir, IN_CLOSE_WRITE | IN_MOVED_TO);
+    if (wd < 0) {
+        LOG_ERROR("Failed to watch directory %s: %s", dir, strerror(errno));
+        goto err;
+    }
+
+    struct pollfd fds[2];
+    fds[0].fd = inotify_fd;
+    fds[0].events = POLLIN;
+    fds[1].fd = client->stop_fds[0];
+    fds[1].events = POLLIN;
+    while (true) {
+        if (poll(fds, 2, -1) < 0) {
+            if (errno == EINTR) {
+                continue;
+            }
+            LOG_ERROR("Failed to poll snapshot file changes: %s", strerror(errno));
+            break;
+        }
+        if (fds[1].revents != 0) {
+            break;
+        }
+        ssize_t len = read(inotify_fd, buf, sizeof(buf));
+        if (len <= 0) {
+            continue;
+        }
+        bool changed = false;
+        for (char* ptr = buf; ptr < buf + len;) {
+            struct inotify_event* event = (struct inotify_event*) ptr;
+            if (event->len > 0 && strcmp(event->name, name) == 0) {
+                changed = true;
+            }
+            ptr += sizeof(struct inotify_event) + event->len;
+        }
+        if (!changed) {
+            continue;
+        }
+
+        LOG_DEBUG("Snapshot file %s changed, loading it again", client->file);
+        pthread_mutex_lock(&client->mutex);
+        snapshot_change_t* changes = reload_snapshot(client);
+        pthread_mutex_unlock(&client->mutex);
+
+        // Callbacks are called without holding the lock, so that they can
+        // read keys, register new watches or free the client. Watches are
+        // never freed before the client.
+        while (changes != NULL) {
+            snapshot_change_t* next = changes->next;
+            if (client->free_pending) {
+                config_destroy(changes->value);
+            } else {
+                changes->watch->cb(changes->key, changes->value, changes->watch->user_data);
+            }
+            free(changes->key);
+            free(changes);
+            changes = next;
+        }
+        if (client->free_pending) {
+            break;
+        }
+    }
+
+err:
+    if (dir != NULL) {
+        free(dir);
+    }
+    close(inotify_fd);
+    if (client->free_pending) {
+        pthread_detach(pthread_self());
+        snapshot_client_destroy(client);
+    }
+    return NULL;
+}
+
+static void snapshot_add_watch(void* handle, char* key, bool prefix,
+                               callback_t cb, void* user_data) {
+    snapshot_client_t* client = (snapshot_client_t*) handle;
+    snapshot_watch_t* watch = (snapshot_watch_t*)calloc(1, sizeof(snapshot_watch_t));
+    if (watch == NULL) {
+        LOG_ERROR_0("Failed to allocate memory for snapshot watch");
+        return;
+    }
+    watch->key = get_snapshot_key(key);
+    if (watch->key == NULL) {
+        free(watch);
+        return;
+    }
+    watch->prefix = prefix;
+    watch->cb = cb;
+    watch->user_data = user_data;
+
+    pthread_mutex_lock(&client->mutex);
+    watch->next = client->watches;
+    client->watches = watch;
+    if (!client->watch_thread_started) {
+        if (pthread_create(&client->watch_thread, NULL, snapshot_watch_loop, client) != 0) {
+            LOG_ERROR_0("Failed to start the snapshot watch thread");
+        } else {
+            client->watch_thread_started = true;
+        }
+    }
+    pthread_mutex_unlock(&client->mutex);
+    LOG_DEBUG("Watch registered on the key %s", watch->key);
+}
+
+void* snapshot_init(void* kv_store_client) {
+    kv_store_client_t* kv_client = (kv_store_client_t*) kv_store_client;
+    snapshot_config_t* snapshot_config = (snapshot_config_t*) kv_client->kv_store_config;
+
+    snapshot_client_t* client = (snapshot_client_t*)calloc(1, sizeof(snapshot_client_t));
+    if (client == NULL) {
+        LOG_ERROR_0("Snapshot client: Failed to allocate Memory");
+        return NULL;
+    }
+    client->stop_fds[0] = client->stop_fds[1] = -1;
+    client->file = copy_string(snapshot_config->file);
+    if (client->file == NULL) {
+        goto err;
+    }
+    client->kvs = load_snapshot(client->file);
+    if (client->kvs == NULL) {
+        goto err;
+    }
+    if (pipe(client->stop_fds) != 0) {
+        LOG_ERROR("Failed to create pipe: %s", strerror(errno));
+        goto err;
+    }
+    pthread_mutex_init(&client->mutex, NULL);
+    kv_client->handler = client;
+    LOG_INFO("Initialized snapshot kv store from %s", client->file);
+    return client;
+
+err:
+    if (client->kvs != NULL) {
+        cJSON_Delete(client->kvs);
+    }
+    if (client->file != NULL) {
+        free(client->file);
+    }
+    free(client);
+    return NULL;
+}
+
+char* snapshot_get(void* handle, char *key) {
+    snapshot_client_t* client = (snapshot_client_t*) handle;
+    char* value = NULL;
+    char* snapshot_key = get_snapshot_key(key);
+    if (snapshot_key == NULL) {
+        return NULL;
+    }
+
+    pthread_mutex_lock(&client->mutex);
+    cJSON* item = cJSON_GetObjectItemCaseSensitive(client->kvs, snapshot_key);
+    if (item == NULL) {
+        LOG_DEBUG("Value for the key %s is not found", snapshot_key);
+    } else {
+        value = value_to_char(item);
+    }
+    pthread_mutex_unlock(&client->mutex);
+
+    free(snapshot_key);
+    return value;
+}
+
+config_value_t* snapshot_get_prefix(void* handle, char *key) {
+    snapshot_client_t* client = (snapshot_client_t*) handle;
+    config_value_t* values = NULL;
+    char* snapshot_key = get_snapshot_key(key);
+    if (snapshot_key == NULL) {
+        return NULL;
+    }
+
+    cJSON* all_values = cJSON_CreateArray();
+    if (all_values == NULL) {
+        LOG_ERROR_0("Create new json array failed");
+        free(snapshot_key);
+        return NULL;
+    }
+    pthread_mutex_lock(&client->mutex);
+    cJSON* item = NULL;
+    cJSON_ArrayForEach(item, client->kvs) {
+        if (!has_prefix(item->string, snapshot_key)) {
+            continue;
+        }
+        char* value = value_to_char(item);
+        if (value != NULL) {
+            cJSON_AddItemToArray(all_values, cJSON_CreateString(value));
+            free(value);
+        }
+    }
+    pthread_mutex_unlock(&client->mutex);
+
+    if (cJSON_GetArraySize(all_values) == 0) {
+        LOG_ERROR("Key not found %s", snapshot_key);
+        cJSON_Delete(all_values);
+        free(snapshot_key);
+        return NULL;
+    }
+    free(snapshot_key);
+
+    values = config_value_new_array(
+                (void*) all_values, cJSON_GetArraySize(all_values), get_array_item, NULL);
+    if (values == NULL) {
+        LOG_ERROR_0("Failed to allocate memory for snapshot prefix");
+        cJSON_Delete(all_values);
+        return NULL;
+    }
+    return values;
+}
+
+int snapshot_prefetch(void* handle, char **prefixes, int num_prefixes) {
+    // All the keys are already in memory, only counting the ones of the
+    // prefixes
+    snapshot_client_t* client = (snapshot_client_t*) handle;
+    int num_keys = 0;
+    pthread_mutex_lock(&client->mutex);
+    cJSON* item = NULL;
+    cJSON_ArrayForEach(item, client->kvs) {
+        for (int i = 0; i < num_prefixes; i++) {
+            if (has_prefix(item->string, prefixes[i])) {
+                num_keys++;
+                break;
+            }
+        }
+    }
+    pthread_mutex_unlock(&client->mutex);
+    return num_keys;
+}
+
+int snapshot_put(void* handle, char *key, char *value) {
+    // The snapshot file is never written, the value is only kept in memory
+    // until the file changes
+    snapshot_client_t* client = (snapshot_client_t*) handle;
+    char* snapshot_key = get_snapshot_key(key);
+    if (snapshot_key == NULL) {
+        return -1;
+    }
+    cJSON* item = cJSON_CreateString(value);
+    if (item == NULL) {
+        LOG_ERROR_0("Failed to create json string");
+        free(snapshot_key);
+        return -1;
+    }
+    pthread_mutex_lock(&client->mutex);
+    if (cJSON_GetObjectItemCaseSensitive(client->kvs, snapshot_key) != NULL) {
+        cJSON_ReplaceItemInObjectCaseSensitive(client->kvs, snapshot_key, item);
+    } else {
+        cJSON_AddItemToObject(client->kvs, snapshot_key, item);
+    }
+    pthread_mutex_unlock(&client->mutex);
+    LOG_DEBUG("key:%s has been created/updated in the snapshot", snapshot_key);
+    free(snapshot_key);
+    return 0;
+}
+
+void snapshot_watch(void* handle, char *key, callback_t cb, void* user_data) {
+    snapshot_add_watch(handle, key, false, cb, user_data);
+}
+
+void snapshot_watch_prefix(void* handle, char *key, callback_t cb, void* user_data) {
+    snapshot_add_watch(handle, key, true, cb, user_data);
+}
+
+static void snapshot_client_free(snapshot_client_t* client) {
+    pthread_mutex_lock(&client->mutex);
+    bool watch_thread_started = client->watch_thread_started;
+    pthread_mutex_unlock(&client->mutex);
+    if (watch_thread_started) {
+        if (pthread_equal(pthread_self(), client->watch_thread)) {
+            // Freed from within a watch callback, the watch thread frees the
+            // client once the callback returns
+            client->free_pending = true;
+            return;
+        }
+        if (write(client->stop_fds[1], "", 1) != 1) {
+            // The watch thread still uses the client
+            LOG_ERROR_0("Failed to stop the snapshot watch thread, not freeing the client");
+            return;
+        }
+        pthread_join(client->watch_thread, NULL);
+    }
+    snapshot_client_destroy(client);
+}
+
+static void snapshot_client_destroy(snapshot_client_t* client) {
+    snapshot_watch_t* watch = client->watches;
+    while (watch != NULL) {
+        snapshot_watch_t* next = watch->next;
+        free(watch->key);
+        free(watch);
+        watch = next;
+    }
+    close(client->stop_fds[0]);
+    close(client->stop_fds[1]);
+    pthread_mutex_destroy(&client->mutex);
+    cJSON_Delete(client->kvs);
+    free(client->file);
+    free(client);
+}
+
+kv_store_client_t* create_snapshot_kv_client(config_t* config) {
+    kv_store_client_t* kv_store_client = NULL;
+    snapshot_config_t* snapshot_config = NULL;
+    config_value_t* conf_obj = NULL;
+    config_value_t* file = NULL;
+
+    conf_obj = config->get_config_value(config->cfg, SNAPSHOT_KV_STORE);
+    if (conf_obj == NULL) {
+        LOG_ERROR("Config missing key '%s'", SNAPSHOT_KV_STORE);
+        goto err;
+    } else if (conf_obj->type != CVT_OBJECT) {
+        LOG_ERROR("Configuration for '%s' must be an object", SNAPSHOT_KV_STORE);
+        goto err;
+    }
+    file = config_value_object_get(conf_obj, SNAPSHOT_FILE);
+    if (file == NULL) {
+        LOG_ERROR("Configuration for '%s' missing '%s'", SNAPSHOT_KV_STORE, SNAPSHOT_FILE);
+        goto err;
+    } else if (file->type != CVT_STRING) {
+        LOG_ERROR_0("Snapshot file must be string");
+        goto err;
+    }
+
+    snapshot_config = (snapshot_config_t*)malloc(sizeof(snapshot_config_t));
+    if (snapshot_config == NULL) {
+        LOG_ERROR_0("Snapshot config: Failed to allocate Memory");
+        goto err;
+    }
+    snapshot_config->file = copy_string(file->body.string);
+    if (snapshot_config->file == NULL) {
+        goto err;
+    }
+
+    kv_store_client = (kv_store_client_t*)calloc(1, sizeof(kv_store_client_t));
+    if (kv_store_client == NULL) {
+        LOG_ERROR_0("KV Store Client: Failed to allocate Memory");
+        goto err;
+    }
+    kv_store_client->kv_store_config = snapshot_config;
+    kv_store_client->get = snapshot_get;
+    kv_store_client->get_prefix = snapshot_get_prefix;
+    kv_store_client->prefetch = snapshot_prefetch;
+    kv_store_client->put = snapshot_put;
+    kv_store_client->watch = snapshot_watch;
+    kv_store_client->watch_prefix = snapshot_watch_prefix;
+    kv_store_client->init = snapshot_init;
+    kv_store_client->deinit = snapshot_values_destroy;
+
+    config_value_destroy(file);
+    config_value_destroy(conf_obj);
+    return kv_store_client;
+
+err:
+    if (file != NULL) {
+        config_value_destroy(file);
+    }
+    if (conf_obj != NULL) {
+        config_value_destroy(conf_obj);
+    }
+    if (snapshot_config != NULL) {
+        if (snapshot_config->file != NULL) {
+            free(snapshot_config->file);
+        }
+        free(snapshot_config);
+    }
+    return NULL;
+}
+
+void snapshot_values_destroy(kv_store_client_t* kv_store_client) {
+    LOG_DEBUG_0("snapshot_values_destroy function...");
+    snapshot_config_t* snapshot_config = (snapshot_config_t*)(kv_store_client->kv_store_config);
+    if (snapshot_config->file != NULL) {
+        free(snapshot_config->file);
+    }
+    if (kv_store_client->handler != NULL) {
+        snapshot_client_free((snapshot_client_t*) kv_store_client->handler);
+        kv_store_client->handler = NULL;
+    }
+}
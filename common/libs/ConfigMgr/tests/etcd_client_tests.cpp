@@ -0,0 +1,203 @@
+// Copyright (c) 2021 Intel Corporation.
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to
+// deal in the Software without restriction, including without limitation the
+// rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+// sell copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in
+// all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+// IN THE SOFTWARE.
+
+/**
+ * @brief EtcdClient GTests unit tests, run against an in-process stand-in of
+ * the etcd KV service
+ */
+
+#include <gtest/gtest.h>
+#include <atomic>
+#include <map>
+#include <mutex>
+#include <string>
+#include <grpcpp/grpcpp.h>
+
+#include "eii/config_manager/kv_store_plugin/etcd_client/etcd_client.h"
+
+using grpc::ServerContext;
+using etcdserverpb::RangeRequest;
+using etcdserverpb::RangeResponse;
+using etcdserverpb::PutRequest;
+using etcdserverpb::PutResponse;
+using etcdserverpb::TxnRequest;
+using etcdserverpb::TxnResponse;
+
+/**
+ * Minimal etcd KV service serving Range, Put and Txn of range requests from
+ * an in-memory map, counting the requests received
+ */
+class FakeEtcdKVService final : public etcdserverpb::KV::Service {
+    public:
+        std::atomic<int> ranges;
+        std::atomic<int> txns;
+        std::atomic<int> puts;
+
+        FakeEtcdKVService() : ranges(0), txns(0), puts(0) {}
+
+        void set(const std::string& key, const std::string& value) {
+            std::lock_guard<std::mutex> lk(m_mutex);
+            m_kvs[key] = value;
+        }
+
+        Status Range(ServerContext* context, const RangeRequest* request,
+                     RangeResponse* response) override {
+            ranges++;
+            range(*request, response);
+            return Status::OK;
+        }
+
+        Status Put(ServerContext* context, const PutRequest* request,
+                   PutResponse* response) override {
+            puts++;
+            set(request->key(), request->value());
+            return Status::OK;
+        }
+
+        Status Txn(ServerContext* context, const TxnRequest* request,
+                   TxnResponse* response) override {
+            txns++;
+            response->set_succeeded(true);
+            for (int i = 0; i < request->success_size(); i++) {
+                range(request->success(i).request_range(),
+                      response->add_responses()->mutable_response_range());
+            }
+            return Status::OK;
+        }
+
+    private:
+        std::mutex m_mutex;
+        std::map<std::string, std::string> m_kvs;
+
+        void range(const RangeRequest& request, RangeResponse* response) {
+            std::lock_guard<std::mutex> lk(m_mutex);
+            auto it = m_kvs.lower_bound(request.key());
+            auto end = request.range_end().empty() ?
+                m_kvs.upper_bound(request.key()) :
+                m_kvs.lower_bound(request.range_end());
+            for (; it != end; it++) {
+                mvccpb::KeyValue* kv = response->add_kvs();
+                kv->set_key(it->first);
+                kv->set_value(it->second);
+            }
+            response->set_count(response->kvs_size());
+        }
+};
+
+class EtcdClientTest : public ::testing::Test {
+    protected:
+        FakeEtcdKVService service;
+        std::unique_ptr<grpc::Server> server;
+        std::unique_ptr<EtcdClient> client;
+
+        void SetUp() override {
+            int port = 0;
+            unsetenv("ETCD_PREFIX");
+            grpc::ServerBuilder builder;
+            builder.AddListeningPort("127.0.0.1:0",
+                                     grpc::InsecureServerCredentials(), &port);
+            builder.RegisterService(&service);
+            server = builder.BuildAndStart();
+            ASSERT_NE(nullptr, server);
+            client.reset(new EtcdClient("127.0.0.1", std::to_string(port)));
+
+            service.set("/GlobalEnv/", "{\"PY_LOG_LEVEL\": \"INFO\"}");
+            service.set("/VideoIngestion/config", "{\"encoding\": {}}");
+            service.set("/VideoIngestion/interfaces", "{\"Publishers\": []}");
+            service.set("/VideoIngestion/private_key", "vi_private");
+            service.set("/VideoIngestionX/config", "{}");
+            service.set("/Publickeys/VideoAnalytics", "va_public");
+            service.set("/Publickeys/VideoIngestion", "vi_public");
+        }
+
+        void TearDown() override {
+            client.reset();
+            server->Shutdown(std::chrono::system_clock::now());
+        }
+
+        std::string get(const std::string& key) {
+            std::string str_key = key;
+            return client->get(str_key);
+        }
+};
+
+TEST_F(EtcdClientTest, prefetch_single_request) {
+    std::vector<std::string> prefixes = {"/GlobalEnv/", "/VideoIngestion/", "/Publickeys/"};
+    ASSERT_EQ(6, client->prefetch(prefixes));
+    ASSERT_EQ(1, service.txns.load());
+
+    ASSERT_EQ("{\"encoding\": {}}", get("/VideoIngestion/config"));
+    ASSERT_EQ("{\"Publishers\": []}", get("/VideoIngestion/interfaces"));
+    ASSERT_EQ("va_public", get("/Publickeys/VideoAnalytics"));
+    // Keys missing from the prefetched prefixes are known to be missing
+    ASSERT_EQ("(NULL)", get("/Publickeys/Visualizer"));
+
+    std::string prefix = "/Publickeys/";
+    std::vector<std::string> values = client->get_prefix(prefix);
+    ASSERT_EQ(2u, values.size());
+    ASSERT_EQ("va_public", values[0]);
+    ASSERT_EQ("vi_public", values[1]);
+    ASSERT_EQ(0, service.ranges.load());
+
+    // Keys outside of the prefetched prefixes are still read from etcd
+    ASSERT_EQ("{}", get("/VideoIngestionX/config"));
+    ASSERT_EQ(1, service.ranges.load());
+}
+
+TEST_F(EtcdClientTest, put_updates_snapshot) {
+    std::vector<std::string> prefixes = {"/VideoIngestion/"};
+    ASSERT_EQ(3, client->prefetch(prefixes));
+
+    std::string key = "/VideoIngestion/datastore";
+    std::string value = "{\"bucket\": 1}";
+    ASSERT_EQ(0, client->put(key, value));
+    ASSERT_EQ(1, service.puts.load());
+    ASSERT_EQ(value, get("/VideoIngestion/datastore"));
+    ASSERT_EQ(0, service.ranges.load());
+}
+
+TEST_F(EtcdClientTest, key_changed_after_prefetch) {
+    std::vector<std::string> prefixes = {"/GlobalEnv/", "/VideoIngestion/", "/Publickeys/"};
+    ASSERT_EQ(6, client->prefetch(prefixes));
+    service.set("/Publickeys/VideoAnalytics", "va_public_new");
+    service.set("/Publickeys/Visualizer", "vis_public");
+    service.set("/VideoIngestion/private_key", "vi_private_new");
+    ASSERT_EQ("va_public", get("/Publickeys/VideoAnalytics"));
+    ASSERT_EQ(0, service.ranges.load());
+
+    // Once the prefetch ends, the keys are read from etcd again
+    client->end_prefetch();
+    ASSERT_EQ("va_public_new", get("/Publickeys/VideoAnalytics"));
+    ASSERT_EQ("vis_public", get("/Publickeys/Visualizer"));
+    ASSERT_EQ("vi_private_new", get("/VideoIngestion/private_key"));
+    std::string prefix = "/Publickeys/";
+    ASSERT_EQ(3u, client->get_prefix(prefix).size());
+    ASSERT_EQ(4, service.ranges.load());
+}
+
+TEST_F(EtcdClientTest, etcd_prefix) {
+    service.set("/edge1/VideoIngestion/config", "{\"edge\": 1}");
+    setenv("ETCD_PREFIX", "/edge1", 1);
+    std::vector<std::string> prefixes = {"/VideoIngestion/"};
+    ASSERT_EQ(1, client->prefetch(prefixes));
+    ASSERT_EQ("{\"edge\": 1}", get("/VideoIngestion/config"));
+    ASSERT_EQ(0, service.ranges.load());
+    unsetenv("ETCD_PREFIX");
+}
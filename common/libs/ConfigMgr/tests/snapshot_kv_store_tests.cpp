@@ -0,0 +1,204 @@
+// Copyright (c) 2021 Intel Corporation.
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to
+// deal in the Software without restriction, including without limitation the
+// rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+// sell copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in
+// all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+// FROM,OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+// IN THE SOFTWARE.
+
+/**
+ * @brief Snapshot kv store GTests unit tests
+ */
+
+#include <gtest/gtest.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <unistd.h>
+#include <atomic>
+#include <chrono>
+#include <fstream>
+#include <string>
+#include <thread>
+
+#include "eii/config_manager/kv_store_plugin/kv_store_plugin.h"
+#include "eii/utils/json_config.h"
+
+#define SNAPSHOT_FILE "./snapshot_kv_store_unittest.json"
+
+static std::atomic<int> watch_cb(0);
+static std::atomic<int> watch_prefix_cb(0);
+
+void snapshot_watch_callback(const char* key, config_t* value, void *user_data) {
+    watch_cb++;
+    config_destroy(value);
+}
+
+void snapshot_watch_prefix_callback(const char* key, config_t* value, void *user_data) {
+    watch_prefix_cb++;
+    config_destroy(value);
+}
+
+// Frees the client from within the watch callback
+void snapshot_freeing_callback(const char* key, config_t* value, void *user_data) {
+    watch_cb++;
+    config_destroy(value);
+    kv_client_free((kv_store_client_t*) user_data);
+}
+
+// Writes the snapshot atomically, like the tools generating them should
+static void write_snapshot(const std::string& content) {
+    std::string tmp = std::string(SNAPSHOT_FILE) + ".tmp";
+    {
+        std::ofstream out(tmp);
+        out << content;
+    }
+    ASSERT_EQ(0, rename(tmp.c_str(), SNAPSHOT_FILE));
+}
+
+static kv_store_client_t* get_snapshot_kv_client() {
+    cJSON* json = cJSON_Parse(
+        "{\"type\": \"snapshot\", "
+        "\"snapshot_kv_store\": {\"file\": \"" SNAPSHOT_FILE "\"}}");
+    config_t* config = config_new(json, free_json, get_config_value);
+    kv_store_client_t* kv_store_client = create_kv_client(config);
+    config_destroy(config);
+    return kv_store_client;
+}
+
+class SnapshotKVStoreTest : public ::testing::Test {
+    protected:
+        void SetUp() override {
+            unsetenv("ETCD_PREFIX");
+            write_snapshot(
+                "{\"/VideoIngestion/config\": {\"encoding\": \"jpeg\"},"
+                " \"/VideoIngestion/interfaces\": {\"Publishers\": []},"
+                " \"/GlobalEnv/\": {\"PY_LOG_LEVEL\": \"INFO\"},"
+                " \"/Publickeys/VideoIngestion\": \"pub_key\"}");
+        }
+
+        void TearDown() override {
+            unlink(SNAPSHOT_FILE);
+        }
+};
+
+TEST_F(SnapshotKVStoreTest, get) {
+    kv_store_client_t* kv_store_client = get_snapshot_kv_client();
+    ASSERT_NE(nullptr, kv_store_client);
+    void* handle = kv_store_client->init(kv_store_client);
+    ASSERT_NE(nullptr, handle);
+
+    char* value = kv_store_client->get(handle, "/Publickeys/VideoIngestion");
+    ASSERT_STREQ("pub_key", value);
+    free(value);
+
+    value = kv_store_client->get(handle, "/VideoIngestion/config");
+    ASSERT_STREQ("{\"encoding\":\"jpeg\"}", value);
+    free(value);
+
+    ASSERT_EQ(nullptr, kv_store_client->get(handle, "/VideoIngestion/missing"));
+    kv_client_free(kv_store_client);
+}
+
+TEST_F(SnapshotKVStoreTest, get_prefix) {
+    kv_store_client_t* kv_store_client = get_snapshot_kv_client();
+    ASSERT_NE(nullptr, kv_store_client);
+    void* handle = kv_store_client->init(kv_store_client);
+    ASSERT_NE(nullptr, handle);
+
+    config_value_t* values = (config_value_t*) kv_store_client->get_prefix(
+        handle, "/VideoIngestion/");
+    ASSERT_NE(nullptr, values);
+    ASSERT_EQ(CVT_ARRAY, values->type);
+    ASSERT_EQ(2, (int) config_value_array_len(values));
+    config_value_destroy(values);
+
+    char* prefixes[] = {(char*) "/VideoIngestion/", (char*) "/GlobalEnv/"};
+    ASSERT_EQ(3, kv_store_client->prefetch(handle, prefixes, 2));
+    kv_client_free(kv_store_client);
+}
+
+TEST_F(SnapshotKVStoreTest, put) {
+    kv_store_client_t* kv_store_client = get_snapshot_kv_client();
+    ASSERT_NE(nullptr, kv_store_client);
+    void* handle = kv_store_client->init(kv_store_client);
+    ASSERT_NE(nullptr, handle);
+
+    ASSERT_EQ(0, kv_store_client->put(handle, "/VideoIngestion/config", "{}"));
+    char* value = kv_store_client->get(handle, "/VideoIngestion/config");
+    ASSERT_STREQ("{}", value);
+    free(value);
+    kv_client_free(kv_store_client);
+}
+
+TEST_F(SnapshotKVStoreTest, watch) {
+    kv_store_client_t* kv_store_client = get_snapshot_kv_client();
+    ASSERT_NE(nullptr, kv_store_client);
+    void* handle = kv_store_client->init(kv_store_client);
+    ASSERT_NE(nullptr, handle);
+    watch_cb = 0;
+    watch_prefix_cb = 0;
+
+    kv_store_client->watch(handle, "/VideoIngestion/config",
+                           snapshot_watch_callback, NULL);
+    kv_store_client->watch_prefix(handle, "/VideoIngestion/",
+                                  snapshot_watch_prefix_callback, NULL);
+    // Letting the watch thread register on the directory
+    std::this_thread::sleep_for(std::chrono::milliseconds(200));
+
+    // Only the config key changes
+    write_snapshot(
+        "{\"/VideoIngestion/config\": {\"encoding\": \"png\"},"
+        " \"/VideoIngestion/interfaces\": {\"Publishers\": []},"
+        " \"/GlobalEnv/\": {\"PY_LOG_LEVEL\": \"INFO\"},"
+        " \"/Publickeys/VideoIngestion\": \"pub_key\"}");
+    for (int i = 0; i < 50 && (watch_cb < 1 || watch_prefix_cb < 1); i++) {
+        std::this_thread::sleep_for(std::chrono::milliseconds(100));
+    }
+    ASSERT_EQ(1, watch_cb);
+    ASSERT_EQ(1, watch_prefix_cb);
+
+    char* value = kv_store_client->get(handle, "/VideoIngestion/config");
+    ASSERT_STREQ("{\"encoding\":\"png\"}", value);
+    free(value);
+    kv_client_free(kv_store_client);
+}
+
+TEST_F(SnapshotKVStoreTest, free_from_callback) {
+    kv_store_client_t* kv_store_client = get_snapshot_kv_client();
+    ASSERT_NE(nullptr, kv_store_client);
+    void* handle = kv_store_client->init(kv_store_client);
+    ASSERT_NE(nullptr, handle);
+    watch_cb = 0;
+
+    // Both watches are notified of the same change
+    kv_store_client->watch(handle, "/VideoIngestion/config",
+                           snapshot_freeing_callback, kv_store_client);
+    kv_store_client->watch_prefix(handle, "/VideoIngestion/",
+                                  snapshot_freeing_callback, kv_store_client);
+    std::this_thread::sleep_for(std::chrono::milliseconds(200));
+
+    write_snapshot(
+        "{\"/VideoIngestion/config\": {\"encoding\": \"png\"},"
+        " \"/VideoIngestion/interfaces\": {\"Publishers\": []},"
+        " \"/GlobalEnv/\": {\"PY_LOG_LEVEL\": \"INFO\"},"
+        " \"/Publickeys/VideoIngestion\": \"pub_key\"}");
+    for (int i = 0; i < 50 && watch_cb < 1; i++) {
+        std::this_thread::sleep_for(std::chrono::milliseconds(100));
+    }
+    // The watch thread frees the client after the first callback, without
+    // calling the freed watches
+    std::this_thread::sleep_for(std::chrono::milliseconds(200));
+    ASSERT_EQ(1, watch_cb);
+}
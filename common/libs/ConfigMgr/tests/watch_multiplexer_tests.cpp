@@ -0,0 +1,295 @@
+// Copyright (c) 2021 Intel Corporation.
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to
+// deal in the Software without restriction, including without limitation the
+// rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+// sell copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in
+// all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+// IN THE SOFTWARE.
+
+/**
+ * @brief WatchMultiplexer GTests unit tests, run against an in-process
+ * stand-in of the etcd Watch service
+ */
+
+#include <gtest/gtest.h>
+#include <atomic>
+#include <chrono>
+#include <functional>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+#include <grpcpp/grpcpp.h>
+
+#include "eii/config_manager/kv_store_plugin/etcd_client/watch_multiplexer.h"
+
+#define WAIT_TIMEOUT_MS 5000
+
+using grpc::ServerContext;
+using grpc::ServerReaderWriter;
+using grpc::Status;
+using etcdserverpb::WatchCreateRequest;
+using etcdserverpb::WatchRequest;
+using etcdserverpb::WatchResponse;
+
+/**
+ * Minimal etcd Watch service: assigns watch IDs per stream in creation order
+ * and sends the puts of publish() to the matching watches
+ */
+class FakeEtcdWatchService final : public etcdserverpb::Watch::Service {
+    public:
+        std::atomic<int> streams;
+        std::atomic<int> created;
+
+        FakeEtcdWatchService() : streams(0), created(0), m_revision(1) {}
+
+        Status Watch(ServerContext* context,
+                     ServerReaderWriter<WatchResponse, WatchRequest>* stream) override {
+            streams++;
+            std::shared_ptr<stream_state_t> state(new stream_state_t);
+            state->context = context;
+            state->stream = stream;
+            state->next_id = 0;
+            {
+                std::lock_guard<std::mutex> lk(m_mutex);
+                m_streams.push_back(state);
+            }
+
+            WatchRequest req;
+            while (stream->Read(&req)) {
+                if (!req.has_create_request()) {
+                    continue;
+                }
+                std::lock_guard<std::mutex> lk(m_mutex);
+                watch_t watch;
+                watch.id = state->next_id++;
+                watch.key = req.create_request().key();
+                watch.range_end = req.create_request().range_end();
+                state->watches.push_back(watch);
+
+                WatchResponse reply;
+                reply.set_watch_id(watch.id);
+                reply.set_created(true);
+                reply.mutable_header()->set_revision(m_revision);
+                stream->Write(reply);
+                created++;
+            }
+
+            std::lock_guard<std::mutex> lk(m_mutex);
+            for (auto it = m_streams.begin(); it != m_streams.end(); it++) {
+                if (*it == state) {
+                    m_streams.erase(it);
+                    break;
+                }
+            }
+            return Status::OK;
+        }
+
+        void publish(const std::string& key, const std::string& value) {
+            std::lock_guard<std::mutex> lk(m_mutex);
+            m_revision++;
+            for (auto& state : m_streams) {
+                for (auto& watch : state->watches) {
+                    bool match = watch.range_end.empty() ? key == watch.key :
+                        (key >= watch.key && key < watch.range_end);
+                    if (!match) {
+                        continue;
+                    }
+                    WatchResponse reply;
+                    reply.set_watch_id(watch.id);
+                    mvccpb::Event* event = reply.add_events();
+                    event->set_type(mvccpb::Event::PUT);
+                    event->mutable_kv()->set_key(key);
+                    event->mutable_kv()->set_value(value);
+                    event->mutable_kv()->set_mod_revision(m_revision);
+                    state->stream->Write(reply);
+                }
+            }
+        }
+
+        void drop_streams() {
+            std::lock_guard<std::mutex> lk(m_mutex);
+            for (auto& state : m_streams) {
+                state->context->TryCancel();
+            }
+        }
+
+    private:
+        struct watch_t {
+            int64_t id;
+            std::string key;
+            std::string range_end;
+        };
+        struct stream_state_t {
+            ServerContext* context;
+            ServerReaderWriter<WatchResponse, WatchRequest>* stream;
+            int64_t next_id;
+            std::vector<watch_t> watches;
+        };
+
+        std::mutex m_mutex;
+        std::vector<std::shared_ptr<stream_state_t>> m_streams;
+        int64_t m_revision;
+};
+
+struct received_t {
+    std::mutex mutex;
+    std::vector<std::string> keys;
+};
+
+static void record_callback(const char* key, config_t* value, void* user_data) {
+    received_t* received = static_cast<received_t*>(user_data);
+    {
+        std::lock_guard<std::mutex> lk(received->mutex);
+        received->keys.push_back(key);
+    }
+    config_destroy(value);
+}
+
+static size_t received_count(received_t* received) {
+    std::lock_guard<std::mutex> lk(received->mutex);
+    return received->keys.size();
+}
+
+static bool wait_for(std::function<bool()> cond) {
+    auto deadline = std::chrono::steady_clock::now() +
+                    std::chrono::milliseconds(WAIT_TIMEOUT_MS);
+    while (!cond()) {
+        if (std::chrono::steady_clock::now() > deadline) {
+            return false;
+        }
+        std::this_thread::sleep_for(std::chrono::milliseconds(10));
+    }
+    return true;
+}
+
+static WatchCreateRequest key_request(const std::string& key) {
+    WatchCreateRequest req;
+    req.set_key(key);
+    return req;
+}
+
+struct freeing_t {
+    WatchMultiplexer* mux;
+    std::atomic<int> calls;
+};
+
+static void freeing_callback(const char* key, config_t* value, void* user_data) {
+    freeing_t* freeing = static_cast<freeing_t*>(user_data);
+    config_destroy(value);
+    freeing->calls++;
+    // Frees the client from within its callback
+    delete freeing->mux;
+    freeing->mux = NULL;
+}
+
+class WatchMultiplexerTest : public ::testing::Test {
+    protected:
+        FakeEtcdWatchService service;
+        std::unique_ptr<grpc::Server> server;
+        std::shared_ptr<grpc::Channel> channel;
+
+        void SetUp() override {
+            int port = 0;
+            grpc::ServerBuilder builder;
+            builder.AddListeningPort("127.0.0.1:0",
+                                     grpc::InsecureServerCredentials(), &port);
+            builder.RegisterService(&service);
+            server = builder.BuildAndStart();
+            ASSERT_NE(nullptr, server);
+            channel = grpc::CreateChannel("127.0.0.1:" + std::to_string(port),
+                                          grpc::InsecureChannelCredentials());
+        }
+
+        void TearDown() override {
+            server->Shutdown(std::chrono::system_clock::now());
+        }
+};
+
+TEST_F(WatchMultiplexerTest, watches_share_one_stream) {
+    const size_t num_watches = 32;
+    std::vector<received_t> received(num_watches);
+    {
+        WatchMultiplexer mux(channel);
+        for (size_t i = 0; i < num_watches; i++) {
+            mux.add_watch(key_request("/App" + std::to_string(i) + "/config"),
+                          record_callback, &received[i]);
+        }
+        ASSERT_TRUE(wait_for([&] {
+            return mux.active_watch_count() == num_watches; }));
+
+        for (size_t i = 0; i < num_watches; i++) {
+            service.publish("/App" + std::to_string(i) + "/config", "{}");
+        }
+        for (size_t i = 0; i < num_watches; i++) {
+            ASSERT_TRUE(wait_for([&] { return received_count(&received[i]) == 1; }));
+            ASSERT_EQ("/App" + std::to_string(i) + "/config", received[i].keys[0]);
+        }
+        ASSERT_EQ(1, service.streams.load());
+        ASSERT_EQ(1u, mux.streams_opened());
+    }
+}
+
+TEST_F(WatchMultiplexerTest, dispatch_by_watch_id) {
+    received_t prefix_received;
+    received_t key_received;
+    WatchMultiplexer mux(channel);
+
+    WatchCreateRequest prefix_req = key_request("/App/");
+    prefix_req.set_range_end("/App0");
+    mux.add_watch(prefix_req, record_callback, &prefix_received);
+    mux.add_watch(key_request("/GlobalEnv/"), record_callback, &key_received);
+    ASSERT_TRUE(wait_for([&] { return mux.active_watch_count() == 2; }));
+
+    service.publish("/App/interfaces", "{\"Publishers\": []}");
+    service.publish("/GlobalEnv/", "{\"PY_LOG_LEVEL\": \"INFO\"}");
+    service.publish("/Other/config", "{}");
+    ASSERT_TRUE(wait_for([&] { return received_count(&key_received) == 1; }));
+    ASSERT_EQ(1u, received_count(&prefix_received));
+    ASSERT_EQ("/App/interfaces", prefix_received.keys[0]);
+    ASSERT_EQ("/GlobalEnv/", key_received.keys[0]);
+}
+
+TEST_F(WatchMultiplexerTest, reopen_stream) {
+    received_t received;
+    WatchMultiplexer mux(channel);
+    mux.add_watch(key_request("/App/config"), record_callback, &received);
+    ASSERT_TRUE(wait_for([&] { return service.created.load() == 1; }));
+
+    service.drop_streams();
+    ASSERT_TRUE(wait_for([&] { return service.created.load() == 2; }));
+    ASSERT_TRUE(wait_for([&] { return mux.active_watch_count() == 1; }));
+
+    service.publish("/App/config", "{}");
+    ASSERT_TRUE(wait_for([&] { return received_count(&received) == 1; }));
+    ASSERT_EQ(2u, mux.streams_opened());
+    ASSERT_EQ(1u, mux.watch_count());
+}
+
+TEST_F(WatchMultiplexerTest, free_from_callback) {
+    freeing_t freeing;
+    freeing.calls = 0;
+    freeing.mux = new WatchMultiplexer(channel);
+    freeing.mux->add_watch(key_request("/App/config"), freeing_callback,
+                           &freeing);
+    ASSERT_TRUE(wait_for([&] { return service.created.load() == 1; }));
+
+    service.publish("/App/config", "{}");
+    ASSERT_TRUE(wait_for([&] { return freeing.calls.load() == 1; }));
+    // The reader thread ends without calling the freed watches again
+    service.publish("/App/config", "{}");
+    std::this_thread::sleep_for(std::chrono::milliseconds(100));
+    ASSERT_EQ(1, freeing.calls.load());
+}
@@ -0,0 +1,133 @@
+# Copyright (c) 2020 Intel Corporation.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Benchmark of the per-frame rendering of Visualizer.draw_defect, on
+   synthetic frames with gva_meta detections & defects, comparing with
+   drawing every box & label with individual cv2 calls.
+
+   Eg: python3 benchmarks/draw_defect_benchmark.py --detections 10 100 500
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+from common import Visualizer  # noqa: E402
+
+BAD_COLOR = (0, 0, 255)
+
+
+def make_results(num_detections, width, height, num_labels, seed=0):
+    """Metadata with num_detections gva_meta detections & as many defects
+    """
+    rng = np.random.default_rng(seed)
+    boxes = rng.integers(0, [width - 100, height - 100, 100, 100],
+                         size=(num_detections, 4))
+    gva_meta = [{'x': int(x), 'y': int(y), 'width': int(w), 'height': int(h),
+                 'tensor': [{'label_id': int(i % num_labels)}]}
+                for i, (x, y, w, h) in enumerate(boxes)]
+    defects = [{'type': int(i % num_labels), 'tl': [int(x), int(y)],
+                'br': [int(x + w), int(y + h)]}
+               for i, (x, y, w, h) in enumerate(boxes)]
+    return {'Fps': 30.0, 'gva_meta': gva_meta, 'defects': defects,
+            'display_info': [{'priority': 2, 'info': 'Defects found'}]}
+
+
+def reference_draw(results, frame, stream_label):
+    """Draws every box & label with individual cv2 calls
+    """
+    count = 0
+    for defect in results['gva_meta']:
+        x_1, y_1 = defect['x'], defect['y']
+        cv2.rectangle(frame, (x_1, y_1), (x_1 + defect['width'],
+                      y_1 + defect['height']), BAD_COLOR, 2)
+        for label_list in defect['tensor']:
+            cv2.putText(frame, stream_label[str(label_list['label_id'])],
+                        (x_1, y_1 - count), cv2.FONT_HERSHEY_DUPLEX, 0.5,
+                        BAD_COLOR, 2, cv2.LINE_AA)
+            count += 10
+    for defect in results['defects']:
+        top_left = tuple(defect['tl'])
+        bottom_right = tuple(defect['br'])
+        cv2.rectangle(frame, top_left, bottom_right, BAD_COLOR, 2)
+        cv2.putText(frame, stream_label[str(defect['type'])],
+                    (top_left[0], bottom_right[1] + 20),
+                    cv2.FONT_HERSHEY_DUPLEX, 0.5, BAD_COLOR, 2, cv2.LINE_AA)
+    return cv2.copyMakeBorder(frame, 5, 5, 5, 5, cv2.BORDER_CONSTANT,
+                              value=BAD_COLOR)
+
+
+def time_per_frame(draw, frame, frames):
+    """Average time in ms to draw on a frame
+    """
+    start = time.perf_counter()
+    for _ in range(frames):
+        draw(frame)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def parse_args():
+    """Parse command line arguments.
+    """
+    arg_parse = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parse.add_argument('--detections', nargs='+', type=int,
+                           default=[10, 100, 500],
+                           help='Number of detections & defects per frame')
+    arg_parse.add_argument('--frames', type=int, default=200,
+                           help='Number of frames drawn per run')
+    arg_parse.add_argument('--resolution', default='1920x1080',
+                           help='Resolution of the frames')
+    arg_parse.add_argument('--labels', type=int, default=10,
+                           help='Number of distinct labels')
+    return arg_parse.parse_args()
+
+
+def main():
+    """main function
+    """
+    args = parse_args()
+    width, height = (int(x) for x in args.resolution.split('x'))
+    stream_label = {str(i): 'label_{}'.format(i) for i in range(args.labels)}
+    logger = logging.getLogger('draw_defect_benchmark')
+    logger.setLevel(logging.ERROR)
+    visualizer = Visualizer({}, logger, 'True', bad_color=BAD_COLOR)
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+
+    print("{:>10} {:>16} {:>16}".format(
+          "detections", "reference (ms)", "draw_defect (ms)"))
+    for num_detections in args.detections:
+        results = make_results(num_detections, width, height, args.labels)
+        reference = time_per_frame(
+            lambda f: reference_draw(results, f, stream_label), frame,
+            args.frames)
+        batched = time_per_frame(
+            lambda f: visualizer.draw_defect(results, f, stream_label), frame,
+            args.frames)
+        print("{:>10} {:>16.3f} {:>16.3f}".format(
+              num_detections, reference, batched))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# Copyright (c) 2020 Intel Corporation.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Benchmark of the line protocol conversion of format_converter.py, in
+   points/sec, on time-series payloads like the ones of telegraf. Compares
+   converting point by point with the previous lf_to_json_converter, the
+   current one & the batch conversions to dicts, json & column arrays.
+
+   Eg: python3 benchmarks/format_converter_benchmark.py --points 10000
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..'))
+from util import format_converter, columnar_converter  # noqa: E402
+
+
+def previous_lf_to_json_converter(data):
+    '''lf_to_json_converter before the single pass parser, replacing over
+    the whole point once per field key & per integer value
+    '''
+    final_data = "Measurement="
+    jbuf = data.split(" ")
+    tagsValue = jbuf[0].split(",")
+    tagsValue[0] = "\"" + tagsValue[0] + "\""
+    tags_value_list = [tagsValue[0]]
+    matchString = re.match(r'([a-zA-Z0-9_]+)([,])([a-zA-Z0-9_]*)', jbuf[0])
+    if matchString:
+        for i in range(1, len(tagsValue)):
+            tag_key_value = tagsValue[i].split("=")
+            tag_value = "\"" + tag_key_value[1] + "\""
+            quoted_key_value_tag = tag_key_value[0] + "=" + tag_value
+            tags_value_list.append(quoted_key_value_tag)
+        jbuf[0] = ",".join(tags_value_list)
+        final_data += jbuf[0] + ","
+    else:
+        final_data += "\"" + jbuf[0] + "\"" + ","
+    for i in range(2, len(jbuf)):
+        jbuf[1] += " " + jbuf[i]
+    influxTS = ",influx_ts=" + jbuf[len(jbuf)-1]
+    jbuf[1] = jbuf[1].replace(jbuf[len(jbuf)-1], influxTS)
+    final_data = final_data + jbuf[1]
+    key_value_buf = final_data.split("=")
+    quoted_key = "\"" + key_value_buf[0] + "\""
+    final_data = final_data.replace(key_value_buf[0], quoted_key)
+    final_data = final_data.replace(" ", "")
+    for j in range(1, len(key_value_buf)-1):
+        key_buf = key_value_buf[j].split(",")
+        key = "," + key_buf[len(key_buf)-1] + "="
+        new_key = ",\"" + key_buf[len(key_buf)-1] + "\"="
+        final_data = final_data.replace(key, new_key)
+    final_data = final_data.replace("=", ":")
+    variable = re.findall(r'[0-9]+i', final_data)
+    for intValue in variable:
+        stripped_i = intValue.strip("i")
+        final_data = final_data.replace(intValue, stripped_i)
+    final_data = "{" + final_data + "}"
+    return final_data
+
+
+def make_points(num_points, num_fields):
+    """Points of a sensor measurement with a few tags, float & integer
+       fields, one nanosecond timestamp each second
+    """
+    lines = []
+    for index in range(num_points):
+        fields = ",".join(
+            "field_{}={}".format(i, "{}i".format(index % 1000 + i)
+                                 if i % 4 == 0 else
+                                 "{:.3f}".format(index * 0.37 + i))
+            for i in range(num_fields))
+        lines.append("point_data,host=ia_telegraf,topic=sensor_{},unit=si "
+                     "{} {}".format(index % 8, fields,
+                                    1600000000000000000 + index * 10**9))
+    return lines
+
+
+def points_per_sec(convert, lines):
+    start = time.perf_counter()
+    convert(lines)
+    return len(lines) / (time.perf_counter() - start)
+
+
+def parse_args():
+    """Parse command line arguments.
+    """
+    arg_parse = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parse.add_argument('--points', type=int, default=20000,
+                           help='Number of points converted per run')
+    arg_parse.add_argument('--fields', nargs='+', type=int,
+                           default=[4, 16, 64],
+                           help='Number of fields per point')
+    return arg_parse.parse_args()
+
+
+def main():
+    """main function
+    """
+    args = parse_args()
+    runs = [
+        ('previous', lambda lines: [previous_lf_to_json_converter(line)
+                                    for line in lines]),
+        ('per point', lambda lines: [
+            format_converter.lf_to_json_converter(line) for line in lines]),
+        ('dicts', format_converter.lf_to_dicts),
+        ('json bytes', lambda lines: format_converter.lf_to_json_bytes(
+            "\n".join(lines))),
+        ('columns', columnar_converter.lf_to_columns),
+    ]
+    print("{:>7} ".format("fields") + " ".join(
+          "{:>12}".format(name) for name, _ in runs) + "   (points/sec)")
+    for num_fields in args.fields:
+        lines = make_points(args.points, num_fields)
+        print("{:>7} ".format(num_fields) + " ".join(
+              "{:>12.0f}".format(points_per_sec(convert, lines))
+              for _, convert in runs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+
+"""
+Copyright (c) 2021 Intel Corporation.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import operator
+import numpy as np
+
+from .format_converter import _split_line, _UNESCAPE_STRING
+
+# Values of the boolean fields read as true
+_TRUE = ['t', 'T', 'true', 'True', 'TRUE']
+# Integer field value without its i or u suffix
+_INTEGER = operator.itemgetter(slice(None, -1))
+
+
+def _value_type(value):
+    '''Returns the type of a field value as written in the lines
+    '''
+    if value[0] == '"':
+        return str
+    if value[-1] in 'iu':
+        return int
+    if value[0] in 'tTfF':
+        return bool
+    return float
+
+
+def _field_column(num_points, rows, values):
+    '''Converts the values of a field, as written in the lines, to an array
+    Argument:
+        num_points: number of points of the batch.
+        rows: indices of the points having the field.
+        values: values of the field in these points.
+    '''
+    types = set(map(_value_type, values))
+    if types == {int, float}:
+        # Integers mixed with floats are widened to float
+        values = [_INTEGER(value) if value[-1] in 'iu' else value
+                  for value in values]
+        types = {float}
+    elif len(types) > 1:
+        raise ValueError("Field values of types {} in the batch".format(
+            " & ".join(sorted(value_type.__name__ for value_type in types))))
+    value_type = types.pop()
+
+    if value_type is str:
+        column = np.full(num_points, None, dtype=object)
+        column[rows] = [_UNESCAPE_STRING.sub(r'\1', value[1:-1])
+                        for value in values]
+        return column
+
+    # Parsing with the python int & float, numpy parsing strings slower
+    if value_type is int:
+        values = np.fromiter(map(int, map(_INTEGER, values)), np.int64,
+                             len(values))
+    elif value_type is bool:
+        values = np.isin(np.array(values), _TRUE)
+    else:
+        values = np.fromiter(map(float, values), np.float64, len(values))
+    if len(rows) == num_points:
+        return values
+    # Points missing the field are NaN, promoting integers & booleans
+    column = np.full(num_points, np.nan)
+    column[rows] = values
+    return column
+
+
+def _tag_column(num_points, rows, values):
+    '''Dictionary encodes the values of a tag
+    Argument:
+        num_points: number of points of the batch.
+        rows: indices of the points having the tag.
+        values: values of the tag in these points.
+    '''
+    uniques, codes = np.unique(np.array(values), return_inverse=True)
+    if len(rows) < num_points:
+        # Points missing the tag have the code -1
+        all_codes = np.full(num_points, -1, dtype=np.int32)
+        all_codes[rows] = codes
+        codes = all_codes
+    return {"codes": codes.astype(np.int32), "values": uniques}
+
+
+def lf_to_columns(data, measurement=None):
+    '''Converts a batch of line protocol points of a measurement to column
+    arrays, with no dict per point. Returns a dict of:
+        Measurement: name of the measurement.
+        influx_ts: int64 array of the timestamps.
+        fields: array per field, of int64, float64, bool or str objects.
+            Points missing a numeric or boolean field are NaN in a float64
+            array, those missing a string field are None. Fields having
+            integer & float values are float64, other mixed types of values
+            are an error.
+        tags: per tag, the sorted distinct "values" and the int32 "codes"
+            of the points in these values, -1 for the points missing it.
+    Argument:
+        data: block of line protocol points (str or bytes) or iterable of
+              lines, having timestamps.
+        measurement: measurement of the points converted, points of other
+                     measurements are skipped. Defaults to the measurement
+                     of the first point, other measurements being an error.
+    '''
+    if isinstance(data, (str, bytes)):
+        data = data.splitlines()
+    strict = measurement is None
+    timestamps = []
+    # Consecutive points having the same tags & fields, mostly all the
+    # points of a batch, as the keys, the first row & the values per point
+    blocks = []
+    keys = None
+    for line in data:
+        split = _split_line(line)
+        if split is None:
+            continue
+        name, point_tags, point_fields, timestamp = split
+        if measurement is None:
+            measurement = name
+        elif name != measurement:
+            if strict:
+                raise ValueError("Points of measurements {} & {} in the "
+                                 "batch".format(measurement, name))
+            continue
+        if timestamp is None:
+            raise ValueError("Missing timestamp in '{}'".format(line))
+        try:
+            tag_keys, tag_values = zip(*point_tags) if point_tags \
+                else ((), ())
+            field_keys, field_values = zip(*point_fields)
+        except ValueError as ex:
+            raise ValueError("Invalid line protocol '{}': {}".format(line,
+                                                                    ex))
+        if keys != (tag_keys, field_keys):
+            keys = (tag_keys, field_keys)
+            values = []
+            blocks.append((tag_keys, field_keys, len(timestamps), values))
+        values.append((tag_values, field_values))
+        timestamps.append(timestamp)
+
+    # Rows & values per tag & per field
+    tags = {}
+    fields = {}
+    for tag_keys, field_keys, first_row, values in blocks:
+        rows = range(first_row, first_row + len(values))
+        tag_values, field_values = zip(*values)
+        for columns, column_keys, column_values in (
+                (tags, tag_keys, tag_values),
+                (fields, field_keys, field_values)):
+            for key, key_values in zip(column_keys, zip(*column_values)):
+                column = columns.get(key)
+                if column is None:
+                    column = columns[key] = ([], [])
+                column[0].extend(rows)
+                column[1].extend(key_values)
+
+    num_points = len(timestamps)
+    try:
+        return {
+            "Measurement": measurement,
+            "influx_ts": np.fromiter(map(int, timestamps), np.int64,
+                                     num_points),
+            "fields": {key: _field_column(num_points, *column)
+                       for key, column in fields.items()},
+            "tags": {key: _tag_column(num_points, *column)
+                     for key, column in tags.items()},
+        }
+    except (ValueError, IndexError) as ex:
+        raise ValueError("Invalid line protocol values: {}".format(ex))
@@ -19,13 +19,90 @@
 # SOFTWARE.
 
 import os
+import sys
 import json
+import time
 import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from distutils.util import strtobool
 import cv2
 import numpy as np
 import eii.msgbus as mb
 
+# Font of the text drawn on the frames
+FONT = cv2.FONT_HERSHEY_DUPLEX
+FONT_SCALE = 0.5
+# Width of the border drawn around the frames having defects metadata
+BORDER_WIDTH = 5
+# Colors of the display_info text per priority: LOW, MEDIUM & HIGH
+PRIORITY_COLORS = {0: (0, 255, 0), 1: (0, 150, 170), 2: (0, 0, 255)}
+
+
+def _imdecode_dst():
+    """Whether cv2.imdecode decodes into a given destination array, which
+    the python bindings of most OpenCV versions don't expose
+    """
+    image = np.zeros((2, 2, 3), dtype=np.uint8)
+    _, encoded = cv2.imencode('.png', image)
+    dst = np.empty_like(image)
+    try:
+        return cv2.imdecode(encoded, cv2.IMREAD_COLOR, dst) is dst
+    except (TypeError, cv2.error):
+        return False
+
+
+# Checked once on import with a real decode, not from the docstring
+IMDECODE_DST = _imdecode_dst()
+
+
+def _refcount(buffers, index):
+    """Number of references to a buffer of the pool list
+    """
+    return sys.getrefcount(buffers[index])
+
+
+class FramePool:
+    """Pool of writable frames per (height, width, channels) shape. A frame
+    is recycled once nothing else references it or a view of it, so that
+    frames queued for the display are never overwritten.
+    """
+
+    def __init__(self, max_frames=32):
+        """Constructor
+
+        :param max_frames: Maximum number of frames pooled per shape
+        :type: int
+        """
+        self.max_frames = max_frames
+        self.allocations = 0
+        self.reuses = 0
+        self._frames = {}
+        self._lock = threading.Lock()
+        # References to a frame held by the pool only
+        self._free_refs = _refcount([object()], 0)
+
+    def acquire(self, shape):
+        """Get a free frame of the given shape, allocating it if all the
+        pooled frames are in use
+
+        :param shape: (height, width, channels) of the frame
+        :type: tuple
+        :return: Frame, content undefined
+        :rtype: numpy.ndarray
+        """
+        with self._lock:
+            frames = self._frames.setdefault(shape, [])
+            for index in range(len(frames)):
+                if _refcount(frames, index) <= self._free_refs:
+                    self.reuses += 1
+                    return frames[index]
+            self.allocations += 1
+            frame = np.empty(shape, dtype=np.uint8)
+            if len(frames) < self.max_frames:
+                frames.append(frame)
+            return frame
+
 
 class Visualizer:
     """Object for the databus callback to wrap needed state variables for the
@@ -34,7 +111,8 @@ class Visualizer:
 
     def __init__(self, topic_queue_dict, logger, draw_results,
                  good_color=(0, 255, 0), bad_color=(0, 0, 255), dir_name=None,
-                 save_image="False", labels=None):
+                 save_image="False", labels=None, frame_pool_size=32,
+                 workers=None, max_in_flight=8, save_queue_size=30):
         """Constructor
 
         :param topic_queue_dict: Dictionary to maintain multiple queues.
@@ -49,6 +127,18 @@ class Visualizer:
         :type: tuple
         :param draw_results: For enabling bounding box in visualizer
         :type: string
+        :param frame_pool_size: (Optional) Maximum number of frames recycled
+            per frame shape, frames queued for the display included
+        :type: int
+        :param workers: (Optional) Number of threads decoding & drawing the
+            frames of all the topics, defaults to the number of CPUs
+        :type: int
+        :param max_in_flight: (Optional) Maximum number of frames of a topic
+            being decoded & drawn, frames received beyond are dropped
+        :type: int
+        :param save_queue_size: (Optional) Maximum number of frames waiting to
+            be saved, frames beyond are not saved
+        :type: int
 
         """
         self.topic_queue_dict = topic_queue_dict
@@ -60,6 +150,24 @@ class Visualizer:
         self.labels = labels
         self.msg_frame_queue = queue.Queue(maxsize=15)
         self.draw_results = bool(strtobool(draw_results))
+        self.frame_pool = FramePool(frame_pool_size)
+        # Decode counters: frames decoded, frames used without copy &
+        # decode latency
+        self.decode_stats = {'frames': 0, 'zero_copy': 0,
+                             'total_time': 0.0, 'max_time': 0.0}
+        self._stats_lock = threading.Lock()
+        self.max_in_flight = max_in_flight
+        self._workers = ThreadPoolExecutor(
+            max_workers=workers or os.cpu_count())
+        self._save_queue = queue.Queue(maxsize=save_queue_size)
+        self._saver = None
+        # Latency per pipeline stage & dropped frames per topic
+        self._stage_stats = {stage: {'count': 0, 'total_time': 0.0,
+                                     'max_time': 0.0}
+                             for stage in ('draw', 'save', 'frame')}
+        self._drops = {}
+        # Rendered label glyphs, per text, color, thickness & channels
+        self._glyphs = {}
 
     def queue_publish(self, topic, frame):
         """queue_publish called after defects bounding box is drawn
@@ -76,10 +184,12 @@ class Visualizer:
                     self.topic_queue_dict[key].put_nowait(frame)
                     del frame
                 else:
+                    self._drop(topic, 'display')
                     self.logger.debug("Dropping frames as the queue is full")
 
     def decode_frame(self, results, blob):
-        """Identify the defects on the frames
+        """Identify the defects on the frames. The frames returned are
+        writable, decoded into frames recycled from the frame pool.
 
         :param results: Metadata of frame received from message bus.
         :type: dict
@@ -88,6 +198,7 @@ class Visualizer:
         :return: Return classified results(metadata and frame)
         :rtype: dict and numpy array
         """
+        start = time.perf_counter()
         height = int(results['height'])
         width = int(results['width'])
         channels = int(results['channels'])
@@ -98,20 +209,157 @@ class Visualizer:
                         "level": results['encoding_level']}
         # Convert to Numpy array and reshape to frame
         frame = np.frombuffer(blob, dtype=np.uint8)
+        zero_copy = False
         if encoding is not None:
-            frame = np.reshape(frame, (frame.shape))
             try:
-                frame = cv2.imdecode(frame, 1)
+                if IMDECODE_DST:
+                    dst = self.frame_pool.acquire((height, width, 3))
+                    frame = cv2.imdecode(frame, cv2.IMREAD_COLOR, dst)
+                else:
+                    frame = cv2.imdecode(frame, cv2.IMREAD_COLOR)
             except cv2.error as ex:
                 self.logger.error("frame: {}, exception: {}".format(frame, ex))
         else:
             self.logger.debug("Encoding not enabled...")
             frame = np.reshape(frame, (height, width, channels))
-
+            zero_copy = frame.flags.writeable
+            if not zero_copy:
+                # Blobs are read-only, copying once into a writable frame
+                # rather than cv2 copying on every drawing
+                dst = self.frame_pool.acquire((height, width, channels))
+                np.copyto(dst, frame)
+                frame = dst
+
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            stats = self.decode_stats
+            stats['frames'] += 1
+            stats['zero_copy'] += int(zero_copy)
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
         return frame
 
+    def get_decode_stats(self):
+        """Counters of the frames decoded: number of frames, frames used
+        without copy, frames allocated & recycled by the frame pool and
+        decode latency in seconds
+
+        :return: Decode counters
+        :rtype: dict
+        """
+        with self._stats_lock:
+            stats = dict(self.decode_stats)
+        stats['allocations'] = self.frame_pool.allocations
+        stats['reuses'] = self.frame_pool.reuses
+        stats['avg_time'] = stats['total_time'] / max(stats['frames'], 1)
+        return stats
+
+    def _label_glyph(self, text, color, thickness, channels):
+        """Label rendered once and cached, labels being drawn on every frame
+
+        :param text: Label text
+        :type: str
+        :param color: Color of the text
+        :type: tuple
+        :param thickness: Thickness of the text
+        :type: int
+        :param channels: Number of channels of the frames
+        :type: int
+        :return: Inverted alpha, label premultiplied by its alpha and offset
+            of the glyph from the text origin
+        :rtype: tuple
+        """
+        key = (text, color, thickness, channels)
+        glyph = self._glyphs.get(key)
+        if glyph is None:
+            (t_w, t_h), baseline = cv2.getTextSize(text, FONT, FONT_SCALE,
+                                                   thickness)
+            # Margin for the anti-aliased edges
+            pad = thickness + 1
+            shape = (t_h + baseline + 2 * pad, t_w + 2 * pad, channels)
+            alpha = np.zeros(shape[:2], dtype=np.uint8)
+            cv2.putText(alpha, text, (pad, pad + t_h), FONT, FONT_SCALE, 255,
+                        thickness, cv2.LINE_AA)
+            alpha = np.repeat(alpha[..., np.newaxis], channels, axis=2)
+            label = np.empty(shape, dtype=np.uint8)
+            label[:] = color[:channels]
+            glyph = (255 - alpha, cv2.multiply(label, alpha, scale=1 / 255),
+                     (-pad, -pad - t_h))
+            self._glyphs[key] = glyph
+        return glyph
+
+    def _draw_labels(self, frame, labels):
+        """Draw labels like cv2.putText does, blending their cached glyphs
+        in the frame
+
+        :param frame: Frame to draw on
+        :type: numpy.ndarray
+        :param labels: Labels as text, bottom-left corner of the text, color
+            and thickness
+        :type: list
+        """
+        if frame.ndim == 2:
+            frame = frame[..., np.newaxis]
+        f_h, f_w, channels = frame.shape
+        for text, (o_x, o_y), color, thickness in labels:
+            key = (text, tuple(color), thickness, channels)
+            inv_alpha, label, (off_x, off_y) = \
+                self._glyphs.get(key) or self._label_glyph(*key)
+            x, y = o_x + off_x, o_y + off_y
+            g_h, g_w = label.shape[:2]
+            if x >= 0 and y >= 0 and x + g_w <= f_w and y + g_h <= f_h:
+                roi = frame[y:y + g_h, x:x + g_w]
+            else:
+                # Clip the glyph to the frame
+                x_0, y_0 = max(x, 0), max(y, 0)
+                x_1, y_1 = min(x + g_w, f_w), min(y + g_h, f_h)
+                if x_0 >= x_1 or y_0 >= y_1:
+                    continue
+                roi = frame[y_0:y_1, x_0:x_1]
+                crop = (slice(y_0 - y, y_1 - y), slice(x_0 - x, x_1 - x))
+                inv_alpha, label = inv_alpha[crop], label[crop]
+            # In place in the frame, cv2 writing to the view
+            cv2.multiply(roi, inv_alpha, dst=roi, scale=1 / 255)
+            cv2.add(roi, label, dst=roi)
+
+    @staticmethod
+    def _draw_boxes(frame, boxes, color):
+        """Draw all the bounding boxes with a single cv2 call
+
+        :param frame: Frame to draw on
+        :type: numpy.ndarray
+        :param boxes: Boxes as rows of x1, y1, x2, y2
+        :type: numpy.ndarray
+        :param color: Color of the boxes
+        :type: tuple
+        """
+        if len(boxes) == 0:
+            return
+        corners = boxes[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2)
+        cv2.polylines(frame, list(corners), True, color, 2)
+
+    @staticmethod
+    def _draw_border(frame, color):
+        """Draw the border in place over the edges of the frame, without
+        reallocating it
+
+        :param frame: Frame to draw on
+        :type: numpy.ndarray
+        :param color: Color of the border
+        :type: tuple
+        """
+        if frame.ndim == 3:
+            color = color[:frame.shape[2]]
+        else:
+            color = color[0]
+        frame[:BORDER_WIDTH] = color
+        frame[-BORDER_WIDTH:] = color
+        frame[:, :BORDER_WIDTH] = color
+        frame[:, -BORDER_WIDTH:] = color
+
     def draw_defect(self, results, frame, stream_label=None):
-        """Draw boxes on the frames
+        """Draw boxes on the frames, in place. The metadata is left as
+        received.
 
         :param results: Metadata of frame received from message bus.
         :type: dict
@@ -128,27 +376,23 @@ class Visualizer:
                 fps_str = "{} : {}".format(str(res), str(results[res]))
                 self.logger.info(fps_str)
                 cv2.putText(frame, fps_str, (x_cord, y_cord),
-                            cv2.FONT_HERSHEY_DUPLEX, 0.5,
+                            FONT, FONT_SCALE,
                             self.good_color, 1, cv2.LINE_AA)
                 y_cord = y_cord + 20
 
         # Draw defects for Gva
-        if 'gva_meta' in results:
+        if 'gva_meta' in results and results['gva_meta']:
+            gva_meta = results['gva_meta']
+            boxes = np.array([(defect['x'], defect['y'], defect['width'],
+                               defect['height']) for defect in gva_meta],
+                             dtype=np.int32)
+            boxes[:, 2:] += boxes[:, :2]
+            self._draw_boxes(frame, boxes, self.bad_color)
+
+            # Draw labels
+            labels = []
             count = 0
-            for defect in results['gva_meta']:
-                x_1 = defect['x']
-                y_1 = defect['y']
-                x_2 = x_1 + defect['width']
-                y_2 = y_1 + defect['height']
-
-                top_left = tuple([x_1, y_1])
-                bottom_right = tuple([x_2, y_2])
-
-                # Draw bounding box
-                cv2.rectangle(frame, top_left,
-                              bottom_right, self.bad_color, 2)
-
-                # Draw labels
+            for defect, (x_1, y_1) in zip(gva_meta, boxes[:, :2].tolist()):
                 for label_list in defect['tensor']:
                     if label_list['label_id'] is not None:
                         pos = (x_1, y_1 - count)
@@ -156,57 +400,44 @@ class Visualizer:
                         if stream_label is not None and \
                            str(label_list['label_id']) in stream_label:
                             label = stream_label[str(label_list['label_id'])]
-                            cv2.putText(frame, label, pos,
-                                        cv2.FONT_HERSHEY_DUPLEX,
-                                        0.5, self.bad_color, 2,
-                                        cv2.LINE_AA)
+                            labels.append((label, pos, self.bad_color, 2))
                         else:
                             self.logger.error("Label id:{}\
                                               not found".format(
                                 label_list['label_id']))
+            self._draw_labels(frame, labels)
 
         # Draw defects
         if 'defects' in results:
-            for defect in results['defects']:
-                defect['tl'][0] = int(defect['tl'][0])
-                defect['tl'][1] = int(defect['tl'][1])
-                defect['br'][0] = int(defect['br'][0])
-                defect['br'][1] = int(defect['br'][1])
-
-                # Get tuples for top-left and bottom-right coordinates
-                top_left = tuple(defect['tl'])
-                bottom_right = tuple(defect['br'])
-
-                # Draw bounding box
-                cv2.rectangle(frame, top_left,
-                              bottom_right, self.bad_color, 2)
+            defects = results['defects']
+            if defects:
+                # Coordinates may be floats, truncated like int() does
+                boxes = np.array([(defect['tl'][0], defect['tl'][1],
+                                   defect['br'][0], defect['br'][1])
+                                  for defect in defects]).astype(np.int32)
+                self._draw_boxes(frame, boxes, self.bad_color)
 
                 # Draw labels for defects if given the mapping
                 if stream_label is not None:
                     # Position of the text below the bounding box
-                    pos = (top_left[0], bottom_right[1] + 20)
-
-                    # The label is the "type" key of the defect, which
-                    #  is converted to a string for getting from the labels
-                    if str(defect['type']) in stream_label:
-                        label = stream_label[str(defect['type'])]
-                        cv2.putText(frame, label, pos,
-                                    cv2.FONT_HERSHEY_DUPLEX,
-                                    0.5, self.bad_color, 2, cv2.LINE_AA)
-                    else:
-                        cv2.putText(frame, str(defect['type']), pos,
-                                    cv2.FONT_HERSHEY_DUPLEX,
-                                    0.5, self.bad_color, 2, cv2.LINE_AA)
+                    positions = boxes[:, [0, 3]]
+                    positions[:, 1] += 20
+                    labels = []
+                    for defect, pos in zip(defects, positions.tolist()):
+                        # The label is the "type" key of the defect, which
+                        #  is converted to a string for getting from the
+                        #  labels
+                        label = str(defect['type'])
+                        labels.append((stream_label.get(label, label), pos,
+                                       self.bad_color, 2))
+                    self._draw_labels(frame, labels)
 
             # Draw border around frame if has defects or no defects
-            if results['defects']:
+            if defects:
                 outline_color = self.bad_color
             else:
                 outline_color = self.good_color
-
-            frame = cv2.copyMakeBorder(frame, 5, 5, 5, 5, cv2.BORDER_CONSTANT,
-                                       value=outline_color)
-
+            self._draw_border(frame, outline_color)
 
         # Display information about frame
         (d_x, d_y) = (20, 50)
@@ -214,24 +445,12 @@ class Visualizer:
             for d_i in results['display_info']:
                 # Get priority
                 priority = d_i['priority']
-                info = d_i['info']
                 d_y = d_y + 10
 
-                #  LOW
-                if priority == 0:
-                    cv2.putText(frame, info, (d_x, d_y),
-                                cv2.FONT_HERSHEY_DUPLEX,
-                                0.5, (0, 255, 0), 1, cv2.LINE_AA)
-                #  MEDIUM
-                if priority == 1:
-                    cv2.putText(frame, info, (d_x, d_y),
-                                cv2.FONT_HERSHEY_DUPLEX,
-                                0.5, (0, 150, 170), 1, cv2.LINE_AA)
-                #  HIGH
-                if priority == 2:
-                    cv2.putText(frame, info, (d_x, d_y),
-                                cv2.FONT_HERSHEY_DUPLEX,
-                                0.5, (0, 0, 255), 1, cv2.LINE_AA)
+                if priority in PRIORITY_COLORS:
+                    cv2.putText(frame, d_i['info'], (d_x, d_y),
+                                FONT, FONT_SCALE,
+                                PRIORITY_COLORS[priority], 1, cv2.LINE_AA)
 
     def save_images(self, msg, frame):
         """Save_images save the image to a directory based
@@ -254,8 +473,115 @@ class Visualizer:
                     frame,
                     [cv2.IMWRITE_PNG_COMPRESSION, 3])
 
+    def _record(self, stage, elapsed):
+        """Record the latency of a pipeline stage
+
+        :param stage: Pipeline stage
+        :type: str
+        :param elapsed: Time spent in the stage, in seconds
+        :type: float
+        """
+        with self._stats_lock:
+            stats = self._stage_stats[stage]
+            stats['count'] += 1
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
+
+    def _drop(self, topic, stage):
+        """Count a frame of a topic dropped by a pipeline stage
+
+        :param topic: Topic the message was published on
+        :type: str
+        :param stage: Stage dropping the frame: pipeline, display or save
+        :type: str
+        """
+        with self._stats_lock:
+            drops = self._drops.setdefault(
+                topic, {'pipeline': 0, 'display': 0, 'save': 0})
+            drops[stage] += 1
+
+    def get_pipeline_stats(self):
+        """Latency of the draw, save & whole frame stages in seconds and
+        dropped frames per topic, along with the decode counters
+
+        :return: Pipeline counters
+        :rtype: dict
+        """
+        stats = {'decode': self.get_decode_stats()}
+        with self._stats_lock:
+            for stage, stage_stats in self._stage_stats.items():
+                stats[stage] = dict(stage_stats)
+                stats[stage]['avg_time'] = \
+                    stage_stats['total_time'] / max(stage_stats['count'], 1)
+            stats['drops'] = {topic: dict(drops)
+                              for topic, drops in self._drops.items()}
+        return stats
+
+    def _process(self, metadata, blob, stream_label):
+        """Decode & draw a frame, run by the worker threads. cv2 releases
+        the GIL while decoding & drawing.
+
+        :param metadata: Metadata of frame received from message bus.
+        :type: dict
+        :param blob: Actual frame received from message bus.
+        :type: bytes
+        :param stream_label: Labels of the topic
+        :type: dict
+        :return: Frame
+        :rtype: numpy.ndarray
+        """
+        frame = self.decode_frame(metadata, blob)
+        if self.draw_results:
+            start = time.perf_counter()
+            self.draw_defect(metadata, frame, stream_label)
+            self._record('draw', time.perf_counter() - start)
+        return frame
+
+    def _publish_loop(self, topic, pending):
+        """Publish the frames of a topic once processed, in the order they
+        were received
+
+        :param topic: Topic the message was published on
+        :type: str
+        :param pending: Frames of the topic being processed
+        :type: queue.Queue
+        """
+        while True:
+            metadata, future, received = pending.get()
+            try:
+                frame = future.result()
+            except Exception as ex:
+                self.logger.exception(f'Failed to process frame: {ex}')
+                continue
+
+            if self.save_image:
+                try:
+                    self._save_queue.put_nowait((metadata, frame))
+                except queue.Full:
+                    self._drop(topic, 'save')
+                    self.logger.debug("Not saving frame as the save queue "
+                                      "is full")
+
+            self.queue_publish(topic, frame)
+            self._record('frame', time.perf_counter() - received)
+
+    def _save_loop(self):
+        """Save the frames queued, off the reception of the frames
+        """
+        while True:
+            metadata, frame = self._save_queue.get()
+            start = time.perf_counter()
+            try:
+                self.save_images(metadata, frame)
+            except cv2.error as ex:
+                self.logger.error(f'Failed to save frame: {ex}')
+            del frame
+            self._record('save', time.perf_counter() - start)
+
     def callback(self, msgbus_cfg, topic):
-        """Callback called when the databus has a new message.
+        """Callback called when the databus has a new message. Receives the
+        frames of the topic, decoded & drawn by the worker threads shared by
+        all the topics, then published & saved in order by other threads.
 
         :param msgbus_cfg: config for the context creation in EIIMessagebus
         :type: str
@@ -276,21 +602,33 @@ class Visualizer:
                 stream_label = self.labels[key]
                 break
 
+        with self._stats_lock:
+            if self.save_image and self._saver is None:
+                self._saver = threading.Thread(target=self._save_loop,
+                                               daemon=True)
+                self._saver.start()
+        pending = queue.Queue(maxsize=self.max_in_flight)
+        threading.Thread(target=self._publish_loop, args=(topic, pending),
+                         daemon=True).start()
+
         while True:
             metadata, blob = subscriber.recv()
 
             if metadata is not None and blob is not None:
-                frame = self.decode_frame(metadata, blob)
-
+                received = time.perf_counter()
                 self.logger.debug(f'Metadata is : {metadata}')
 
-                if(self.draw_results):
-                    self.draw_defect(metadata, frame, stream_label)
-
-                if self.save_image:
-                    self.save_images(metadata, frame)
-
-                self.queue_publish(topic, frame)
+                # Dropping rather than stalling the reception when the
+                # workers can't keep up
+                if pending.full():
+                    self._drop(topic, 'pipeline')
+                    self.logger.debug("Dropping frame as the workers are "
+                                      "busy")
+                    continue
+
+                future = self._workers.submit(self._process, metadata, blob,
+                                              stream_label)
+                pending.put_nowait((metadata, future, received))
             else:
                 self.logger.debug(f'Non Image Data Subscription\
                                  : Classifier_results: {metadata}')
@@ -22,6 +22,167 @@ SOFTWARE.
 """
 
 import re
+import json
+
+# Series key of the line: the measurement & the tags, up to the first
+# unescaped space
+_SERIES = re.compile(r'(?:[^ \\]|\\.)+')
+# Items of the series key, separated by unescaped commas
+_SERIES_ITEM = re.compile(r'(?:[^,\\]|\\.)+')
+_TAG = re.compile(r'((?:[^=\\]|\\.)+)=(.*)', re.S)
+# Field key, value (quoted strings may hold spaces, commas & escaped quotes)
+# & separator to the next field or to the timestamp
+_FIELD = re.compile(
+    r'((?:[^=,\\ ]|\\.)+)=("(?:[^"\\]|\\.)*"|[^", ][^, ]*)([, ]?)')
+_UNESCAPE_KEY = re.compile(r'\\([,= ])')
+_UNESCAPE_STRING = re.compile(r'\\(["\\])')
+# Compact json, created once as json.dumps creates an encoder per call when
+# given separators
+_JSON_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+
+def _field_value(value):
+    '''Converts a field value of the line protocol to the python value
+    Argument:
+        value: field value as written in the line.
+    '''
+    first = value[0]
+    if first == '"':
+        return _UNESCAPE_STRING.sub(r'\1', value[1:-1])
+    last = value[-1]
+    if last == 'i' or last == 'u':
+        return int(value[:-1])
+    if first in 'tT':
+        return True
+    if first in 'fF':
+        return False
+    # Numbers without decimals are kept as integers, as they were in json
+    if '.' in value or 'e' in value or 'E' in value:
+        return float(value)
+    return int(value)
+
+
+def _split_escaped_line(line):
+    '''Splits a line having escaped characters or string fields
+    Argument:
+        line: line protocol point.
+    '''
+    match = _SERIES.match(line)
+    if match is None:
+        raise ValueError("Missing measurement")
+    items = _SERIES_ITEM.findall(match.group())
+    tags = []
+    for item in items[1:]:
+        tag = _TAG.match(item)
+        if tag is None:
+            raise ValueError("Invalid tag {}".format(item))
+        tags.append((_UNESCAPE_KEY.sub(r'\1', tag.group(1)),
+                     _UNESCAPE_KEY.sub(r'\1', tag.group(2))))
+
+    fields = []
+    pos = match.end() + 1
+    while True:
+        field = _FIELD.match(line, pos)
+        if field is None:
+            raise ValueError("Invalid field at {}".format(pos))
+        key, value, sep = field.groups()
+        fields.append((_UNESCAPE_KEY.sub(r'\1', key), value))
+        pos = field.end()
+        if sep != ',':
+            break
+
+    timestamp = line[pos:].strip()
+    return (_UNESCAPE_KEY.sub(r'\1', items[0]), tags, fields,
+            timestamp or None)
+
+
+def _split_line(line):
+    '''Splits a line protocol point in a single pass to the measurement,
+    the tags & the fields as key, value pairs, the field values as written,
+    and the timestamp. Returns None for empty & comment lines.
+    Argument:
+        line: line protocol point, str or bytes.
+    '''
+    if isinstance(line, bytes):
+        line = line.decode('utf-8')
+    line = line.strip()
+    if not line or line[0] == '#':
+        return None
+    try:
+        if '\\' in line or '"' in line:
+            return _split_escaped_line(line)
+
+        parts = line.split(' ')
+        if len(parts) == 3:
+            series, fields, timestamp = parts
+        elif len(parts) == 2:
+            series, fields = parts
+            timestamp = None
+        else:
+            raise ValueError("Expected measurement, fields & timestamp")
+        series = series.split(',')
+        tags = [tag.split('=', 1) for tag in series[1:]]
+        # Pairs missing the '=' fail to unpack when used
+        fields = [field.split('=', 1) for field in fields.split(',')]
+        return series[0], tags, fields, timestamp
+    except ValueError as ex:
+        raise ValueError("Invalid line protocol '{}': {}".format(line, ex))
+
+
+def lf_parse_line(line):
+    '''Parses a line protocol point in a single pass to a dict of the
+    measurement, the tags, the fields & the timestamp, keyed like the json
+    of lf_to_json_converter. Returns None for empty & comment lines.
+    Argument:
+        line: line protocol point, str or bytes.
+    '''
+    split = _split_line(line)
+    if split is None:
+        return None
+    measurement, tags, fields, timestamp = split
+    point = {"Measurement": measurement}
+    try:
+        point.update(tags)
+        for key, value in fields:
+            point[key] = _field_value(value)
+        if timestamp is not None:
+            point["influx_ts"] = int(timestamp)
+    except (ValueError, IndexError) as ex:
+        raise ValueError("Invalid line protocol '{}': {}".format(line, ex))
+    return point
+
+
+def lf_iter_points(data):
+    '''Generator parsing line protocol points one at a time, for streaming
+    large exports
+    Argument:
+        data: block of line protocol points (str or bytes) or iterable of
+              lines, such as a file.
+    '''
+    if isinstance(data, (str, bytes)):
+        data = data.splitlines()
+    for line in data:
+        point = lf_parse_line(line)
+        if point is not None:
+            yield point
+
+
+def lf_to_dicts(data):
+    '''Converts a batch of line protocol points to a list of dicts
+    Argument:
+        data: block of line protocol points (str or bytes) or iterable of
+              lines.
+    '''
+    return list(lf_iter_points(data))
+
+
+def lf_to_json_bytes(data):
+    '''Converts a batch of line protocol points to a json array, as bytes
+    Argument:
+        data: block of line protocol points (str or bytes) or iterable of
+              lines.
+    '''
+    return _JSON_ENCODER.encode(lf_to_dicts(data)).encode()
 
 
 def lf_to_json_converter(data):
@@ -29,55 +190,4 @@ def lf_to_json_converter(data):
     Argument:
         data: line protocol data.
     '''
-    final_data = "Measurement="
-    jbuf = data.split(" ")
-    tagsValue = jbuf[0].split(",")
-    # To handle json if tags are given in the line protocol
-    tagsValue[0] = "\"" + tagsValue[0] + "\""
-    tags_value_list = [tagsValue[0]]
-
-    # To identify the datapoints with the TAGS.
-    matchString = re.match(r'([a-zA-Z0-9_]+)([,])([a-zA-Z0-9_]*)', jbuf[0])
-
-    # To Replace the values with the quoted values.
-    if matchString:
-        for i in range(1, len(tagsValue)):
-            tag_key_value = tagsValue[i].split("=")
-            tag_value = "\"" + tag_key_value[1] + "\""
-            quoted_key_value_tag = tag_key_value[0] + "=" + tag_value
-            tags_value_list.append(quoted_key_value_tag)
-        jbuf[0] = ",".join(tags_value_list)
-        final_data += jbuf[0] + ","
-    else:
-        final_data += "\"" + jbuf[0] + "\"" + ","
-
-    for i in range(2, len(jbuf)):
-        jbuf[1] += " " + jbuf[i]
-
-    influxTS = ",influx_ts=" + jbuf[len(jbuf)-1]
-    jbuf[1] = jbuf[1].replace(jbuf[len(jbuf)-1], influxTS)
-    final_data = final_data + jbuf[1]
-
-    key_value_buf = final_data.split("=")
-    quoted_key = "\"" + key_value_buf[0] + "\""
-    final_data = final_data.replace(key_value_buf[0], quoted_key)
-
-    # Trimming white space
-    final_data = final_data.replace(" ", "")
-
-    # Replacing the Keys field with the quoted Keys.
-    for j in range(1, len(key_value_buf)-1):
-        key_buf = key_value_buf[j].split(",")
-        key = "," + key_buf[len(key_buf)-1] + "="
-        new_key = ",\"" + key_buf[len(key_buf)-1] + "\"="
-        final_data = final_data.replace(key, new_key)
-
-    final_data = final_data.replace("=", ":")
-
-    # Removal of "i" added by influx,from the integer value
-    variable = re.findall(r'[0-9]+i', final_data)
-    for intValue in variable:
-        stripped_i = intValue.strip("i")
-        final_data = final_data.replace(intValue, stripped_i)
-    final_data = "{" + final_data + "}"
-    return final_data
+    return _JSON_ENCODER.encode(lf_parse_line(data))
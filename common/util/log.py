@@ -22,6 +22,12 @@ import os
 import logging
 import logging.handlers
 import sys
+import json
+import time
+import queue
+import atexit
+import threading
+from collections import Counter
 
 LOG_LEVELS = {
     'DEBUG': logging.DEBUG,
@@ -30,8 +36,144 @@ LOG_LEVELS = {
     'WARN': logging.WARN
 }
 
+# Minimum seconds between two summaries of the records dropped in async mode
+SUMMARY_INTERVAL = 5
 
-def configure_logging(log_level, module_name, dev_mode):
+# Listener writing the records of the async mode, stopped when reconfiguring
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats the records as single line json objects
+    """
+    def __init__(self, mode=None):
+        super().__init__()
+        self.mode = mode
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'name': record.name,
+            'file': record.filename,
+            'function': record.funcName,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        if self.mode is not None:
+            entry['mode'] = self.mode
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class _DropCounter:
+    """Thread safe count of the records dropped by level and reason
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dropped = Counter()
+
+    def add(self, reason, levelname):
+        with self._lock:
+            self._dropped[(reason, levelname)] += 1
+
+    def pop(self):
+        with self._lock:
+            dropped, self._dropped = self._dropped, Counter()
+        return dropped
+
+
+class _RateLimitFilter(logging.Filter):
+    """Token bucket per level, letting through at most the given records per
+    second of each level with bursts of one second worth of records
+    """
+    def __init__(self, rate_limits, drops):
+        super().__init__()
+        self.drops = drops
+        self.buckets = {}
+        for level, rate in rate_limits.items():
+            if level not in LOG_LEVELS:
+                raise Exception('Unknown log level: {}'.format(level))
+            # [rate, tokens, last refill]
+            self.buckets[LOG_LEVELS[level]] = [rate, rate, time.monotonic()]
+
+    def filter(self, record):
+        bucket = self.buckets.get(record.levelno)
+        if bucket is None:
+            return True
+        rate, tokens, last = bucket
+        now = time.monotonic()
+        tokens = min(rate, tokens + (now - last) * rate)
+        bucket[2] = now
+        if tokens < 1:
+            bucket[1] = tokens
+            self.drops.add('rate limit', record.levelname)
+            return False
+        bucket[1] = tokens - 1
+        return True
+
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues the records without formatting them, dropping them when the
+    queue is full
+    """
+    def __init__(self, log_queue, drops):
+        super().__init__(log_queue)
+        self.drops = drops
+
+    def prepare(self, record):
+        # Formatting is left to the writer thread, records stay in process
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.drops.add('overload', record.levelname)
+
+
+class _SummaryQueueListener(logging.handlers.QueueListener):
+    """Writes the queued records, preceded at most every SUMMARY_INTERVAL
+    seconds by a summary of the records dropped meanwhile
+    """
+    def __init__(self, log_queue, handler, drops):
+        super().__init__(log_queue, handler)
+        self.drops = drops
+        self.last_summary = 0
+
+    def summarize(self):
+        dropped = self.drops.pop()
+        if not dropped:
+            return
+        self.last_summary = time.monotonic()
+        counts = ', '.join('{} {} ({})'.format(count, level, reason)
+                           for (reason, level), count in
+                           sorted(dropped.items()))
+        record = logging.LogRecord(
+            __name__, logging.WARN, __file__, 0,
+            'Dropped {} log records: {}'.format(sum(dropped.values()),
+                                                counts),
+            None, None, 'summarize')
+        super().handle(record)
+
+    def handle(self, record):
+        if time.monotonic() - self.last_summary >= SUMMARY_INTERVAL:
+            self.summarize()
+        super().handle(record)
+
+    def enqueue_sentinel(self):
+        # Blocking, the queue may be full
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+            self.summarize()
+
+
+def configure_logging(log_level, module_name, dev_mode, async_mode=False,
+                      queue_size=10000, json_format=False, rate_limits=None):
     """Configure logging to log to stdout.
 
     The log string will be formatted as follows:
@@ -40,11 +182,29 @@ def configure_logging(log_level, module_name, dev_mode):
 
     This function should only ever be called once in a the Python runtime.
 
+    In async mode the log calls only enqueue the records, which a background
+    thread formats and writes to stdout. Records are dropped when the queue
+    is full or when their level exceeds its rate limit, and the writer logs
+    a summary of the dropped records. Records are formatted when written, so
+    the arguments of the log calls must not be modified after the call.
+
     :param log_level: Logging level to use, must be one of the following:
            DEBUG, INFO, ERROR or WARN
     :type log_level: str
     :param module_name: Module running logging
     :type module_name: str
+    :param dev_mode: Whether running in dev mode (insecure mode)
+    :type dev_mode: bool
+    :param async_mode: Whether to write the logs from a background thread
+    :type async_mode: bool
+    :param queue_size: Maximum number of records waiting to be written in
+                       async mode
+    :type queue_size: int
+    :param json_format: Whether to log single line json objects
+    :type json_format: bool
+    :param rate_limits: Maximum records per second by log level in async
+                        mode, Eg: {'DEBUG': 100}
+    :type rate_limits: dict
     :raises Exception: If the given log level is unknown, or if max_bytes
                        and file_count are both 0, or if the log file directory
                        does not exist.
@@ -72,9 +232,29 @@ def configure_logging(log_level, module_name, dev_mode):
     logger = logging.getLogger()
     logger.setLevel(log_lvl)
     handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter(fmt_str)
+    if json_format:
+        formatter = JsonFormatter("Insecure Mode" if dev_mode else None)
+    else:
+        formatter = logging.Formatter(fmt_str)
     handler.setFormatter(formatter)
 
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        atexit.unregister(_listener.stop)
+        _listener = None
+
+    if async_mode:
+        drops = _DropCounter()
+        log_queue = queue.Queue(maxsize=queue_size)
+        _listener = _SummaryQueueListener(log_queue, handler, drops)
+        handler = _BoundedQueueHandler(log_queue, drops)
+        if rate_limits:
+            handler.addFilter(_RateLimitFilter(rate_limits, drops))
+        _listener.start()
+        # Writing the records still queued at exit
+        atexit.register(_listener.stop)
+
     # Removing the default handler added by getLogger to avoid duplicate logs
     if(logger.hasHandlers()):
         logger.handlers.clear()
@@ -0,0 +1,70 @@
+
+"""
+Copyright (c) 2021 Intel Corporation.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""Unit tests of the field types of util.columnar_converter
+
+   Eg: python3 -m unittest discover -s common/util/test
+"""
+
+import os
+import sys
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..'))
+from util.columnar_converter import lf_to_columns
+
+
+class TestFieldTypes(unittest.TestCase):
+
+    def test_single_types(self):
+        fields = lf_to_columns('m a=1i,b=1.5,c=t,d="x" 1\n'
+                               'm a=2i,b=2,c=F,d="y" 2')["fields"]
+        self.assertEqual(fields["a"].dtype, np.int64)
+        self.assertEqual(fields["b"].dtype, np.float64)
+        self.assertEqual(fields["c"].tolist(), [True, False])
+        self.assertEqual(fields["d"].tolist(), ["x", "y"])
+
+    def test_int_and_float(self):
+        fields = lf_to_columns('m a=1i 1\nm a=2.5 2\n'
+                               'm b=1 3\nm a=3u 4')["fields"]
+        self.assertEqual(fields["a"].dtype, np.float64)
+        np.testing.assert_array_equal(fields["a"],
+                                      [1.0, 2.5, np.nan, 3.0])
+
+    def test_bool_and_number(self):
+        with self.assertRaisesRegex(ValueError, "bool & float"):
+            lf_to_columns('m a=t 1\nm a=2 2')
+        with self.assertRaisesRegex(ValueError, "bool & int"):
+            lf_to_columns('m a=2i 1\nm a=false 2')
+
+    def test_string_and_number(self):
+        with self.assertRaisesRegex(ValueError, "float & str"):
+            lf_to_columns('m a="x" 1\nm a=2 2')
+        with self.assertRaisesRegex(ValueError, "int & str"):
+            lf_to_columns('m a=1i 1\nm a="2" 2')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# Copyright (c) 2019 Intel Corporation.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Unit tests of the port checks of util.util
+
+   Eg: python3 -m unittest discover -s common/util/test
+"""
+
+import os
+import sys
+import socket
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..'))
+from util.util import Util
+
+
+def closed_port():
+    """Returns a port of localhost with nothing listening on it
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestPortAvailability(unittest.TestCase):
+
+    def setUp(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(8)
+        self.port = self.server.getsockname()[1]
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_listening_port(self):
+        self.assertTrue(Util.check_port_availability('127.0.0.1',
+                                                     str(self.port)))
+
+    def test_closed_port(self):
+        self.assertFalse(Util.check_port_availability(
+            '127.0.0.1', str(closed_port()), timeout=0.5))
+
+    def test_endpoints(self):
+        up = ('127.0.0.1', self.port)
+        down = ('127.0.0.1', closed_port())
+        latencies = Util.wait_for_endpoints([up, down], deadline=0.5)
+        self.assertIsNotNone(latencies[up])
+        self.assertLess(latencies[up], 0.5)
+        self.assertIsNone(latencies[down])
+
+
+if __name__ == '__main__':
+    unittest.main()
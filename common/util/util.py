@@ -18,9 +18,9 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import socket
 import logging as log
-import time
+import random
+import asyncio
 import base64
 import os
 import json
@@ -30,31 +30,105 @@ from distutils.util import strtobool
 class Util:
 
     @staticmethod
-    def check_port_availability(hostname, port):
+    def check_port_availability(hostname, port, timeout=100):
         """Verifies port availability on hostname for accepting connection
 
         :param hostname: hostname of the machine
         :type hostname: str
         :param port: port
         :type port: str
+        :param timeout: Time in seconds to wait for the port
+        :type timeout: float
         :return: portUp (whether port is up or not)
         :rtype: Boolean
         """
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         log.debug("Attempting to connect to {}:{}".format(hostname, port))
-        numRetries = 1000
-        retryCount = 0
-        portUp = False
-        while(retryCount < numRetries):
-            if(sock.connect_ex((hostname, int(port)))):
-                log.debug("{} port is up on {}".format(port, hostname))
-                portUp = True
-                break
-            retryCount += 1
-            time.sleep(0.1)
+        latencies = Util.wait_for_endpoints([(hostname, port)],
+                                            deadline=timeout)
+        portUp = latencies[(hostname, port)] is not None
+        if portUp:
+            log.debug("{} port is up on {}".format(port, hostname))
         return portUp
 
+    @staticmethod
+    def wait_for_endpoints(endpoints, deadline=100, connect_timeout=1,
+                           initial_backoff=0.05, max_backoff=2):
+        """Waits for all the endpoints to accept connections, checking them
+        concurrently
+
+        :param endpoints: (hostname, port) of the endpoints
+        :type endpoints: list
+        :param deadline: Time in seconds to wait for all the endpoints
+        :type deadline: float
+        :param connect_timeout: Timeout in seconds of each connection
+        :type connect_timeout: float
+        :param initial_backoff: Maximum wait in seconds before the second
+                                attempt, doubled for each later attempt
+        :type initial_backoff: float
+        :param max_backoff: Maximum wait in seconds between attempts
+        :type max_backoff: float
+        :return: Seconds until each endpoint accepted a connection, None for
+                 the endpoints not up before the deadline
+        :rtype: dict
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(Util.wait_for_endpoints_async(
+                endpoints, deadline, connect_timeout, initial_backoff,
+                max_backoff))
+        finally:
+            loop.close()
 
+    @staticmethod
+    async def wait_for_endpoints_async(endpoints, deadline=100,
+                                       connect_timeout=1,
+                                       initial_backoff=0.05, max_backoff=2):
+        """Coroutine of wait_for_endpoints, for services running an event
+        loop
+
+        :return: Seconds until each endpoint accepted a connection, None for
+                 the endpoints not up before the deadline
+        :rtype: dict
+        """
+        # Running loop, asyncio.get_running_loop needs python 3.7
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        end = start + deadline
+
+        async def wait_for_endpoint(hostname, port):
+            backoff = initial_backoff
+            attempts = 0
+            while True:
+                attempts += 1
+                remaining = end - loop.time()
+                try:
+                    _, writer = await asyncio.wait_for(
+                        asyncio.open_connection(hostname, int(port)),
+                        max(min(connect_timeout, remaining), 0))
+                    writer.close()
+                    latency = loop.time() - start
+                    log.debug("{}:{} is up after {:.3f}s and {} "
+                              "attempts".format(hostname, port, latency,
+                                                attempts))
+                    return latency
+                except (OSError, asyncio.TimeoutError):
+                    pass
+                # Full jitter, spreading the attempts of the services
+                # starting together
+                remaining = end - loop.time()
+                if remaining <= 0:
+                    log.error("{}:{} is not up after {} attempts".format(
+                        hostname, port, attempts))
+                    return None
+                await asyncio.sleep(min(random.uniform(0, backoff),
+                                        remaining))
+                backoff = min(backoff * 2, max_backoff)
+
+        endpoints = list(endpoints)
+        latencies = await asyncio.gather(
+            *(wait_for_endpoint(hostname, port)
+              for hostname, port in endpoints))
+        return dict(zip(endpoints, latencies))
 
     @staticmethod
     def delete_certs(file_list):